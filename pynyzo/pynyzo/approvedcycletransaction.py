@@ -1,19 +1,18 @@
 
 
-from pynyzo.messageobject import MessageObject
+from pynyzo.messageobject import MessageRecord
 from pynyzo.fieldbytesize import FieldByteSize
+from pynyzo import codec
 import json
-import struct
 
 
-class ApprovedCycleTransaction(MessageObject):
-    """Transaction message"""
+class ApprovedCycleTransaction(MessageRecord):
+    """Transaction message. app_log is ignored, kept for compatibility: records share the module logger."""
 
 
-    __slots__ = ('_initiator_identifier', '_receiver_indentifier', '_approval_height', '_amount')
+    __slots__ = ('_initiator_identifier', '_receiver_identifier', '_approval_height', '_amount')
 
     def __init__(self, buffer: bytes=None, initiator_identifier: bytes=None, receiver_identifier: bytes=None, approval_height: int=0, amount: int=0, app_log=None):
-        super().__init__(app_log=app_log)
         if buffer is None:
             self._approval_height = approval_height
             self._amount = amount
@@ -22,18 +21,9 @@ class ApprovedCycleTransaction(MessageObject):
         else:
             # fromByteBuffer constructor
             # These are the fields contained in all transactions.
-            offset = 0
-            self._initiator_identifier = buffer[offset:offset + FieldByteSize.identifier]
-            offset += FieldByteSize.identifier
-            
-            self._receiver_identifier = buffer[offset:offset + FieldByteSize.identifier]
-            offset += FieldByteSize.identifier
-            
-            self._approval_height = struct.unpack(">Q", buffer[offset:offset +8])[0]  # Long, 8
-            offset += 8
-            
-            self._amount = struct.unpack(">Q", buffer[offset:offset +8])[0]  # Long, 8
-            offset += 8
+            # identifier, identifier, Long, Long
+            self._initiator_identifier, self._receiver_identifier, self._approval_height, self._amount = \
+                codec.APPROVED_CYCLE_TRANSACTION.unpack_from(buffer, 0)
             
 
     def get_amount(self):
@@ -53,8 +43,15 @@ class ApprovedCycleTransaction(MessageObject):
         return FieldByteSize.identifier * 2 + FieldByteSize.blockHeight + FieldByteSize.transactionAmount
 
     def get_bytes(self, for_signing: bool=False):
-        # TODO
-        self.app_log.error('TODO: Transaction.get_bytes')
+        buffer = bytearray(self.get_byte_size())
+        self.write_into(buffer, 0)
+        return bytes(buffer)
+
+    def write_into(self, buffer: bytearray, offset: int=0) -> int:
+        """Serializes into a preallocated buffer, returns the offset past the end."""
+        codec.APPROVED_CYCLE_TRANSACTION.pack_into(buffer, offset, self._initiator_identifier,
+                                                   self._receiver_identifier, self._approval_height, self._amount)
+        return offset + codec.APPROVED_CYCLE_TRANSACTION.size
 
     def to_json(self) -> str:
         return json.dumps({"message_type": "Transaction", 'value': {'amount': self._amount, 'receiver_identifier': self._receiver_identifier.hex(), 'initiator_identifier': self._initiator_identifier.hex(), "approval_height": self._approval_height}})
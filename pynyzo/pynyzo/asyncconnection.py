@@ -0,0 +1,210 @@
+"""
+Nyzo connection layer, asyncio version.
+Same framing as Connection - raw bytes with 4 bytes len prefix - without a thread per socket.
+
+Requests to a peer are queued: they are written in call order and responses are matched in FIFO order.
+pipeline_depth is how many may be in flight on the socket at once. Nyzo verifiers answer one message per
+connection, so the default of 1 waits for each response; a socket closed by the peer is transparently reopened.
+"""
+
+import asyncio
+import struct
+from collections import deque
+from time import time
+
+from pynyzo.helpers import base_app_log
+from pynyzo.message import Message
+from pynyzo.messageobject import MessageObject
+from pynyzo.metrics import metrics
+
+# Default per request timeout, seconds
+REQUEST_TIMEOUT = 10
+
+# Reconnect backoff, seconds: base * 2 ** (failures - 1), capped
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30
+
+
+class AsyncConnection(object):
+    """Asyncio connection to a Nyzo Node. Many fetch() calls may run concurrently, reconnects with backoff."""
+
+    __slots__ = ('app_log', 'ip', 'port', 'verbose', 'timeout', 'pipeline_depth', 'last_activity', 'failures',
+                 '_reader', '_writer', '_pending', '_read_task', '_slots', '_connect_lock', '_next_attempt')
+
+    def __init__(self, ip: str, port: int=9444, timeout: float=REQUEST_TIMEOUT, pipeline_depth: int=1,
+                 verbose: bool=False, app_log: object=None):
+        """Nothing happens until the first fetch() or connect(), the object can be created outside of a loop."""
+        self.app_log = base_app_log(app_log)
+        self.ip = ip
+        self.port = port
+        self.verbose = verbose
+        self.timeout = timeout
+        self.pipeline_depth = pipeline_depth
+        self.last_activity = 0
+        self.failures = 0  # Consecutive failed connection attempts
+        self._reader = None
+        self._writer = None
+        self._pending = deque()  # Futures of the requests written and waiting for their response, FIFO
+        self._read_task = None
+        self._slots = None
+        self._connect_lock = None
+        self._next_attempt = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def is_connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing() and not self._reader.at_eof()
+
+    async def connect(self) -> None:
+        """Opens the socket if needed. After a failure, waits for the backoff delay before trying again."""
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.is_connected():
+                return
+            delay = self._next_attempt - time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                if self.verbose:
+                    self.app_log.info(f"Connecting to {self.ip}:{self.port}")
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.ip, self.port), self.timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                self.failures += 1
+                self._next_attempt = time() + min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self.failures - 1))
+                raise RuntimeError(f"Connections: {e}")
+            self.failures = 0
+            self._next_attempt = 0
+            self.last_activity = time()
+
+    def _reset(self, error: Exception) -> None:
+        """Drops the socket and fails every request still waiting on it: once a response is missing,
+        the next ones could not be matched anymore."""
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+        if self._read_task is not None and self._read_task is not asyncio.current_task():
+            self._read_task.cancel()
+        self._read_task = None
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    async def _read_responses(self) -> None:
+        """Reads responses while requests are pending, hands them over in order."""
+        reader = self._reader
+        try:
+            while self._pending:
+                header = await reader.readexactly(4)
+                # Header is len of full message, including header
+                length = struct.unpack('>I', header)[0] - 4
+                if length < 0 or length > Message.maximumMessageLength:
+                    raise RuntimeError(f"Connections: invalid message length {length}")
+                buffer = await reader.readexactly(length)
+                self.last_activity = time()
+                if self.verbose:
+                    self.app_log.info(f"Received {length} bytes from {self.ip}")
+                future = self._pending.popleft()
+                if not future.done():
+                    future.set_result(buffer)
+            self._read_task = None
+        except asyncio.CancelledError:
+            raise
+        except (asyncio.IncompleteReadError, OSError, RuntimeError) as e:
+            self._reset(ConnectionResetError(f"Connections: {e}"))
+
+    async def _request(self, data: bytes, timeout: float) -> bytes:
+        if timeout <= 0:
+            raise asyncio.TimeoutError()
+        await self.connect()
+        writer = self._writer
+        future = asyncio.get_running_loop().create_future()
+        # No await between queuing and writing: the write order is the response order.
+        self._pending.append(future)
+        # Send buffer in one packet - Do not make 2 calls.
+        writer.write(struct.pack(">I", len(data) + 4) + data)
+        if self._read_task is None:
+            self._read_task = asyncio.ensure_future(self._read_responses())
+        try:
+            await writer.drain()
+        except ConnectionResetError:
+            # Failed by a reset: the socket is already gone, maybe replaced
+            future.cancel()
+            raise
+        except OSError as e:
+            future.cancel()
+            if self._writer is writer:
+                self._reset(ConnectionResetError(f"Connections: {e}"))
+            raise ConnectionResetError(f"Connections: {e}")
+        try:
+            # A ConnectionResetError set by _reset is raised as is: that socket is reset already
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            if self._writer is writer:
+                self._reset(ConnectionResetError("Connections: reset after a request timeout"))
+            raise
+
+    async def fetch_buffer(self, message: Message, timeout: float=None) -> bytes:
+        """Sends a message, returns the raw response buffer. timeout defaults to the connection one, and includes
+        the wait for a free pipeline slot."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pipeline_depth)
+        timeout = self.timeout if timeout is None else timeout
+        data = message.get_bytes_for_transmission()
+        if not metrics.enabled:
+            return await self._fetch_buffer(data, timeout)
+        start = metrics.clock()
+        try:
+            buffer = await self._fetch_buffer(data, timeout)
+        except (OSError, RuntimeError, asyncio.TimeoutError):
+            metrics.count_error(message.get_type().name, f"{self.ip}:{self.port}")
+            raise
+        metrics.observe_request(message.get_type().name, f"{self.ip}:{self.port}", metrics.clock() - start,
+                                len(data) + 4, len(buffer) + 4)
+        return buffer
+
+    async def _fetch_buffer(self, data: bytes, timeout: float) -> bytes:
+        """timeout counts from the call: the wait for a pipeline slot is included"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        await asyncio.wait_for(self._slots.acquire(), timeout)
+        try:
+            reused = self.is_connected()
+            try:
+                return await self._request(data, deadline - loop.time())
+            except ConnectionResetError:
+                if not reused:
+                    raise
+                # The peer closed an idle socket, one more try on a fresh one.
+                if self.verbose:
+                    self.app_log.warning(f"Connection to {self.ip} was closed, reconnecting")
+                if metrics.enabled:
+                    metrics.count_reconnect(f"{self.ip}:{self.port}")
+                return await self._request(data, deadline - loop.time())
+        finally:
+            self._slots.release()
+
+    async def fetch(self, message: Message, timeout: float=None) -> MessageObject:
+        """Fetch then decode"""
+        buffer = await self.fetch_buffer(message, timeout)
+        return Message.from_bytes(buffer, b'').get_content()
+
+    async def close(self) -> None:
+        """Closes the socket, pending requests fail"""
+        writer = self._writer
+        self._reset(ConnectionResetError("Connections: closed"))
+        if writer is not None:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
@@ -7,60 +7,74 @@ from pynyzo.fieldbytesize import FieldByteSize
 from pynyzo.hashutil import HashUtil
 from pynyzo.transaction import Transaction
 from pynyzo.approvedcycletransaction import ApprovedCycleTransaction
+from pynyzo import codec
 import json
-import struct
 import sys
 
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+# Wire layout of one balance list item. V32 rather than S32 so identifiers ending with 0 are kept verbatim.
+BALANCE_ITEM_DTYPE = [('id', 'V32'), ('balance', '>u8'), ('until_fee', '>u2')]
+
 
 class BalanceList(MessageObject):
     """BalanceList message"""
 
-    __slots__ = ('_block_height', '_rollover_fees', '_previous_verifiers', '_items', '_blockchain_version', '_pending_cycle_transactions', '_recently_approved_cycle_transactions', '_unlock_threshold', '_unlock_transfer_sum')
+    __slots__ = ('_block_height', '_rollover_fees', '_previous_verifiers', '_items', '_pairs', '_blockchain_version', '_pending_cycle_transactions', '_recently_approved_cycle_transactions', '_unlock_threshold', '_unlock_transfer_sum')
 
     def __init__(self, block_height: int=0, rollover_fees: int=0, previous_verifiers: list=None, items: list=None,
-                 buffer: bytes=None, app_log=None):
+                 buffer: bytes=None, blockchain_version: int=0, unlock_threshold: int=0, unlock_transfer_sum: int=0,
+                 pending_cycle_transactions: list=None, recently_approved_cycle_transactions: list=None,
+                 app_log=None):
         # This replaces the various constructors from java, depending on the params
         super().__init__(app_log=app_log)
         if buffer:
             # buffer is the full buffer with timestamp and type, why the 10 offset.
             offset = 0
-            self._block_height = struct.unpack(">Q", buffer[offset:offset + 8])[0]  # long, 8
-            self._blockchain_version, self._block_height = (0xffff000000000000 & self._block_height) >> (6 * 8), 0x0000ffffffffffff & self._block_height
+            height, self._rollover_fees = codec.BALANCE_LIST_HEADER.unpack_from(buffer, offset)  # long, byte
+            self._blockchain_version, self._block_height = codec.split_height(height)
             balance_list_cycle_transaction = True if self._blockchain_version > 1 else False
-            offset += 8
-            self._rollover_fees = struct.unpack(">B", buffer[offset:offset + 1])[0]  # byte
-            offset += 1
+            offset += codec.BALANCE_LIST_HEADER.size
             number_of_previous_verifiers = min(self._block_height, 9)
-            self.app_log.debug(f"BalanceList({self._block_height}, {self._rollover_fees}, {number_of_previous_verifiers})")
+            if codec.TRACE:
+                codec.trace(self.app_log, "BalanceList(%s, %s, %s)", self._block_height, self._rollover_fees,
+                            number_of_previous_verifiers)
             self._previous_verifiers = []
             for i in range(number_of_previous_verifiers):
                 # We could use a memoryview if perf /ram was an issue
                 self._previous_verifiers.append(buffer[offset:offset + FieldByteSize.identifier])
                 offset += FieldByteSize.identifier
-            number_of_pairs = struct.unpack(">I", buffer[offset:offset + 4])[0]  # int, 4
+            number_of_pairs = codec.INT.unpack_from(buffer, offset)[0]  # int, 4
             offset += 4
             # print("number_of_pairs", number_of_pairs)
-            self._items = []
-            for i in range(number_of_pairs):
-                identifier = buffer[offset:offset + FieldByteSize.identifier]
-                offset += FieldByteSize.identifier
-                balance = struct.unpack(">Q", buffer[offset:offset + 8])[0]  # long, 8
-                offset += 8
-                blocks_until_fee = struct.unpack(">H", buffer[offset:offset + 2])[0]  # Short, 2 bytes
-                offset += 2
-                item = BalanceListItem(identifier, balance, blocks_until_fee)
-                # print(item.to_json())
-                self._items.append(item)
+            if np is not None:
+                # Fast path: the whole pairs region in one call, items are only built by get_items()
+                self._pairs = np.frombuffer(buffer, dtype=BALANCE_ITEM_DTYPE, count=number_of_pairs, offset=offset)
+                self._items = None
+                offset += number_of_pairs * (FieldByteSize.identifier + 8 + 2)
+            else:
+                self._pairs = None
+                # identifier, balance, blocks until fee: one iter_unpack over the pairs region
+                end = offset + number_of_pairs * codec.BALANCE_LIST_ITEM.size
+                self._items = [BalanceListItem(identifier, balance, blocks_until_fee) for
+                               identifier, balance, blocks_until_fee
+                               in codec.BALANCE_LIST_ITEM.iter_unpack(memoryview(buffer)[offset:end])]
+                offset = end
+            self._unlock_threshold = 0
+            self._unlock_transfer_sum = 0
             if self._blockchain_version > 0:
-                self._unlock_threshold = struct.unpack(">Q", buffer[offset:offset + 8])[0]  # long, 8
-                offset += 8
-                self._unlock_transfer_sum = struct.unpack(">Q", buffer[offset:offset + 8])[0]  # long, 8
-                offset += 8
+                self._unlock_threshold, self._unlock_transfer_sum = \
+                    codec.BALANCE_LIST_UNLOCK.unpack_from(buffer, offset)  # long, long
+                offset += codec.BALANCE_LIST_UNLOCK.size
             
             
             self._pending_cycle_transactions = []
             if self._blockchain_version > 1:
-                number_of_transactions = struct.unpack(">I", buffer[offset:offset + 4])[0]  # int, 4
+                number_of_transactions = codec.INT.unpack_from(buffer, offset)[0]  # int, 4
                 offset += 4
                 #print("bltx nb 1", number_of_transactions)
                 mv = memoryview(buffer)
@@ -72,7 +86,7 @@ class BalanceList(MessageObject):
 
             self._recently_approved_cycle_transactions = []
             if self._blockchain_version > 1:
-                number_of_transactions = struct.unpack(">I", buffer[offset:offset + 4])[0]  # int, 4
+                number_of_transactions = codec.INT.unpack_from(buffer, offset)[0]  # int, 4
                 offset += 4
                 #print("bltx nb 2", number_of_transactions)
                 for i in range(number_of_transactions):
@@ -88,6 +102,13 @@ class BalanceList(MessageObject):
             self._rollover_fees = rollover_fees
             self._previous_verifiers = previous_verifiers
             self._items = items
+            self._pairs = None
+            self._blockchain_version = blockchain_version
+            self._unlock_threshold = unlock_threshold
+            self._unlock_transfer_sum = unlock_transfer_sum
+            self._pending_cycle_transactions = pending_cycle_transactions if pending_cycle_transactions else []
+            self._recently_approved_cycle_transactions = recently_approved_cycle_transactions \
+                if recently_approved_cycle_transactions else []
 
     def get_block_height(self) -> int:
         return self._block_height
@@ -98,16 +119,48 @@ class BalanceList(MessageObject):
     def get_previous_verifiers(self) -> list:
         return self._previous_verifiers.copy()  # shallow copy is enough for that type.
 
+    def get_blockchain_version(self) -> int:
+        return self._blockchain_version
+
+    def get_unlock_threshold(self) -> int:
+        return self._unlock_threshold
+
+    def get_unlock_transfer_sum(self) -> int:
+        return self._unlock_transfer_sum
+
+    def get_pending_cycle_transactions(self) -> list:
+        return self._pending_cycle_transactions
+
+    def get_recently_approved_cycle_transactions(self) -> list:
+        return self._recently_approved_cycle_transactions
+
     def get_items(self) -> list:
+        if self._items is None:
+            # From then on, the items list is the reference (callers may edit it).
+            self._items = [BalanceListItem(identifier, balance, blocks_until_fee)
+                           for identifier, balance, blocks_until_fee in self._pairs.tolist()]
+            self._pairs = None
         return self._items
 
+    def get_pairs(self):
+        """Items as a BALANCE_ITEM_DTYPE numpy array, without building any item object."""
+        if self._pairs is None:
+            if np is None:
+                raise RuntimeError("numpy is required for BalanceList.get_pairs, pip install numpy")
+            return np.array([(bytes(item.get_identifier()), item.get_balance(), item.get_blocks_until_fee())
+                             for item in self._items], dtype=BALANCE_ITEM_DTYPE)
+        return self._pairs
+
+    def get_number_of_items(self) -> int:
+        return len(self._pairs) if self._items is None else len(self._items)
+
     def get_byte_size(self) -> int:
         number_of_previous_verifiers = min(self._block_height, 9)
         bytes_per_item = FieldByteSize.identifier + FieldByteSize.transactionAmount + FieldByteSize.blocksUntilFee
 
         size = FieldByteSize.blockHeight + FieldByteSize.rolloverTransactionFees \
                + FieldByteSize.identifier * number_of_previous_verifiers + FieldByteSize.balanceListLength \
-               + bytes_per_item * len(self._items)
+               + bytes_per_item * self.get_number_of_items()
                
         if self._blockchain_version > 0:
              size += FieldByteSize.transactionAmount * 2
@@ -126,28 +179,83 @@ class BalanceList(MessageObject):
         
         return size
 
+    @staticmethod
+    def byte_size_from_buffer(buffer: memoryview, offset: int=0) -> int:
+        """Size of the serialized balance list starting at offset, without decoding its items.
+        Used to skip over balance lists."""
+        start = offset
+        blockchain_version, block_height = codec.split_height(codec.LONG.unpack_from(buffer, offset)[0])  # long, 8
+        offset += FieldByteSize.blockHeight + FieldByteSize.rolloverTransactionFees \
+            + FieldByteSize.identifier * min(block_height, 9)
+        number_of_pairs = codec.INT.unpack_from(buffer, offset)[0]  # int, 4
+        offset += FieldByteSize.balanceListLength \
+            + number_of_pairs * (FieldByteSize.identifier + FieldByteSize.transactionAmount
+                                 + FieldByteSize.blocksUntilFee)
+        if blockchain_version > 0:
+            offset += FieldByteSize.transactionAmount * 2
+        if blockchain_version > 1:
+            number_of_transactions = codec.INT.unpack_from(buffer, offset)[0]  # int, 4
+            offset += FieldByteSize.unnamedInteger
+            for i in range(number_of_transactions):
+                offset += Transaction.byte_size_from_buffer(buffer, offset, balance_list_cycle_transaction=True)
+            number_of_transactions = codec.INT.unpack_from(buffer, offset)[0]  # int, 4
+            offset += FieldByteSize.unnamedInteger
+            offset += number_of_transactions * (FieldByteSize.identifier * 2 + FieldByteSize.blockHeight
+                                                + FieldByteSize.transactionAmount)
+        return offset - start
+
     def get_bytes(self) -> bytes:
-        result = []
-        result.append(struct.pack(">Q", self._block_height))  # Long
-        result.append(struct.pack(">B", self._rollover_fees))  # byte
+        buffer = bytearray(self.get_byte_size())
+        if self.write_into(buffer, 0) != len(buffer):
+            raise ValueError(f"BalanceList fields do not match its size: {self.to_string()}")
+        return bytes(buffer)
+
+    def write_into(self, buffer: bytearray, offset: int=0) -> int:
+        """Serializes into a preallocated buffer, returns the offset past the end."""
+        codec.BALANCE_LIST_HEADER.pack_into(buffer, offset, (self._blockchain_version << codec.VERSION_SHIFT)
+                                            | self._block_height, self._rollover_fees)  # Long, byte
+        offset += codec.BALANCE_LIST_HEADER.size
         for verifier in self._previous_verifiers:
-            result.append(verifier)
-        result.append(struct.pack(">I", len(self._items)))  # int, 4
-        for item in self._items:
-            result.append(item.get_identifier())
-            result.append(struct.pack(">Q", item.get_balance()))  # Long
-            result.append(struct.pack(">H", item.get_blocks_until_fee()))  # short
-        return b''.join(result)
+            buffer[offset:offset + FieldByteSize.identifier] = verifier
+            offset += FieldByteSize.identifier
+        codec.INT.pack_into(buffer, offset, self.get_number_of_items())  # int, 4
+        offset += FieldByteSize.balanceListLength
+        if self._items is None:
+            # already in wire format
+            size = self._pairs.nbytes
+            buffer[offset:offset + size] = self._pairs.tobytes()
+            offset += size
+        else:
+            for item in self._items:
+                codec.BALANCE_LIST_ITEM.pack_into(buffer, offset, item.get_identifier(), item.get_balance(),
+                                                  item.get_blocks_until_fee())  # identifier, Long, short
+                offset += codec.BALANCE_LIST_ITEM.size
+        if self._blockchain_version > 0:
+            codec.BALANCE_LIST_UNLOCK.pack_into(buffer, offset, self._unlock_threshold,
+                                                self._unlock_transfer_sum)  # Long, Long
+            offset += codec.BALANCE_LIST_UNLOCK.size
+        if self._blockchain_version > 1:
+            codec.INT.pack_into(buffer, offset, len(self._pending_cycle_transactions))  # int, 4
+            offset += FieldByteSize.unnamedInteger
+            for transaction in self._pending_cycle_transactions:
+                offset = transaction.write_into(buffer, offset)
+            codec.INT.pack_into(buffer, offset, len(self._recently_approved_cycle_transactions))  # int, 4
+            offset += FieldByteSize.unnamedInteger
+            for transaction in self._recently_approved_cycle_transactions:
+                offset = transaction.write_into(buffer, offset)
+        return offset
 
     def get_hash(self) -> bytes:
         return HashUtil.double_sha256(self.get_bytes())
 
     def to_string(self) -> str:
-        return f"[BalanceList: height={self._block_height}, count={len(self._items)} hash={self.get_hash().hex()}]"
+        return f"[BalanceList: height={self._block_height}, count={self.get_number_of_items()} " \
+               f"hash={self.get_hash().hex()}]"
 
     def to_json(self) -> str:
         # Do not add explicit keys for balance items, too verbose.
-        items = {item.get_identifier().hex(): [item.get_balance(), item.get_blocks_until_fee()] for item in self._items}
+        items = {item.get_identifier().hex(): [item.get_balance(), item.get_blocks_until_fee()]
+                 for item in self.get_items()}
         previous_verifiers = [verifier.hex() for verifier in self._previous_verifiers]
         pending_cycle_transactions = [json.loads(tx.to_json()) for tx in self._pending_cycle_transactions]
         approved_cycle_transactions = [json.loads(tx.to_json()) for tx in self._recently_approved_cycle_transactions]
@@ -1,23 +1,22 @@
 
 
-from pynyzo.messageobject import MessageObject
+from pynyzo.messageobject import MessageRecord
 from pynyzo.fieldbytesize import FieldByteSize
 import json
-import struct
 
 
-class BalanceListItem(MessageObject):
-    """BalanceListItem message"""
+class BalanceListItem(MessageRecord):
+    """BalanceListItem message. app_log is ignored, kept for compatibility: records share the module logger."""
 
     transfer_identifier = bytes.fromhex("0000000000000000000000000000000000000000000000000000000000000001")
 
-    __slots__ = ('_blocks_betweenfee', '_identifier', '_balance', '_blocks_until_fee')
+    _blocks_betweenfee = 500
+
+    __slots__ = ('_identifier', '_balance', '_blocks_until_fee')
 
     def __init__(self, identifier: bytes=None, balance: int=0, blocks_until_fee: int=None, buffer: bytes = None,
                  app_log=None):
         # This replaces the various constructors from java, depending on the params
-        super().__init__(app_log=app_log)
-        self._blocks_betweenfee = 500
         if buffer is None:
             self._identifier = identifier
             self._balance = balance
@@ -6,9 +6,13 @@ from pynyzo.transaction import Transaction
 from pynyzo.byteutil import ByteUtil
 from pynyzo.balancelist import BalanceList
 from pynyzo.hashutil import HashUtil
+from pynyzo.keyutil import KeyUtil
+from pynyzo import codec
+from pynyzo.lazyblock import LazyBlock
 
 import json
-import struct
+import mmap
+import os
 # import sys
 # from bs4 import BeautifulSoup
 
@@ -53,7 +57,7 @@ class Block(MessageObject):
     def __init__(self, height: int=0, previous_block_hash: bytes=None, start_timestamp: int=0,
                  verification_timestamp: int=0, transactions: list=None, balance_list_hash: bytes=None,
                  verifier_identifier: bytes=None, verifier_signature: bytes=None,
-                 buffer: bytes=None, offset=0, app_log=None):
+                 buffer: bytes=None, offset=0, blockchain_version: int=0, app_log=None):
         super().__init__(app_log=app_log)
         if buffer is None:
             # TODO
@@ -65,22 +69,17 @@ class Block(MessageObject):
             self._balance_list_hash = balance_list_hash
             self._verifier_identifier = verifier_identifier
             self._verifier_signature = verifier_signature
+            self._blockchain_version = blockchain_version
         else:
             # Same as original fromByteBuffer constructor
-            self._height =  struct.unpack(">Q", buffer[offset:offset +8])[0]  # Long, 8
-            self._blockchain_version, self._height = (0xffff000000000000 & self._height) >> (6 * 8), 0x0000ffffffffffff & self._height
-            offset += 8
-            self._previous_block_hash = buffer[offset:offset +32]
-            offset += 32
-            self._start_timestamp = struct.unpack(">Q", buffer[offset:offset +8])[0]  # Long, 8
-            offset += 8
-            self._verification_timestamp = struct.unpack(">Q", buffer[offset:offset +8])[0]  # Long, 8
-            offset += 8
-            number_of_transactions = struct.unpack(">I", buffer[offset:offset +4])[0]  # Int, 4
-            offset += 4
+            height, self._previous_block_hash, self._start_timestamp, self._verification_timestamp, \
+                number_of_transactions = codec.BLOCK_HEADER.unpack_from(buffer, offset)
+            self._blockchain_version, self._height = codec.split_height(height)
+            offset += codec.BLOCK_HEADER.size
             self._transactions = []
-            self.app_log.debug(f"Block {self._height}, {self._previous_block_hash.hex()}, {self._start_timestamp}, "
-                               f"{self._verification_timestamp}, {number_of_transactions}")
+            if codec.TRACE:
+                codec.trace(self.app_log, "Block %s, %s, %s, %s, %s", self._height, self._previous_block_hash,
+                            self._start_timestamp, self._verification_timestamp, number_of_transactions)
             mv = memoryview(buffer)
             balance_list_cycle_transaction = True if self._blockchain_version > 1 else False
             #print("chain version", self._blockchain_version)
@@ -89,39 +88,68 @@ class Block(MessageObject):
                 added = transaction.get_byte_size()
                 offset += added
                 self._transactions.append(transaction)
-            self._balance_list_hash = buffer[offset:offset + FieldByteSize.hash]
-            offset += FieldByteSize.hash
-            self._verifier_identifier = buffer[offset:offset + FieldByteSize.identifier]
-            offset += FieldByteSize.identifier
-            self._verifier_signature = buffer[offset:offset + FieldByteSize.signature]
-            offset += FieldByteSize.signature
+            self._balance_list_hash, self._verifier_identifier, self._verifier_signature = \
+                codec.BLOCK_FOOTER.unpack_from(buffer, offset)
+            offset += codec.BLOCK_FOOTER.size
         #exit()
 
+    def get_height(self) -> int:
+        return self._height
+
+    def get_blockchain_version(self) -> int:
+        return self._blockchain_version
+
+    def get_previous_block_hash(self) -> bytes:
+        return self._previous_block_hash
+
+    def get_start_timestamp(self) -> int:
+        return self._start_timestamp
+
+    def get_verification_timestamp(self) -> int:
+        return self._verification_timestamp
+
+    def get_number_of_transactions(self) -> int:
+        return len(self._transactions)
+
+    def get_transactions(self) -> list:
+        return self._transactions
+
+    def get_balance_list_hash(self) -> bytes:
+        return self._balance_list_hash
+
+    def get_verifier_identifier(self) -> bytes:
+        return self._verifier_identifier
+
+    def get_verifier_signature(self) -> bytes:
+        return self._verifier_signature
+
     def get_bytes(self, include_signature: bool=False) -> bytes:
-        # TODO
-        self.app_log.error('TODO: Block.get_bytes')
-        """
-        int size = getByteSize();
-
-        // Assemble the buffer.
-        byte[] array = new byte[size];
-        ByteBuffer buffer = ByteBuffer.wrap(array);
-        buffer.putLong(height);
-        buffer.put(previousBlockHash);
-        buffer.putLong(startTimestamp);
-        buffer.putLong(verificationTimestamp);
-        buffer.putInt(transactions.size());
-        for (Transaction transaction : transactions) {
-            buffer.put(transaction.getBytes());
-        }
-        buffer.put(balanceListHash);
-        if (includeSignature) {
-            buffer.put(verifierIdentifier);
-            buffer.put(verifierSignature);
-        }
-
-        return array;
-        """
+        buffer = bytearray(self.get_byte_size(include_signature=include_signature))
+        if self.write_into(buffer, 0, include_signature=include_signature) != len(buffer):
+            raise ValueError(f"Block fields do not match its size: {self.to_string()}")
+        return bytes(buffer)
+
+    def write_into(self, buffer: bytearray, offset: int=0, include_signature: bool=False) -> int:
+        """Serializes the block into a preallocated buffer, returns the offset past its end."""
+        codec.BLOCK_HEADER.pack_into(buffer, offset, (self._blockchain_version << codec.VERSION_SHIFT) | self._height,
+                                     self._previous_block_hash, self._start_timestamp, self._verification_timestamp,
+                                     len(self._transactions))
+        offset += codec.BLOCK_HEADER.size
+        for transaction in self._transactions:
+            offset = transaction.write_into(buffer, offset)
+        buffer[offset:offset + FieldByteSize.hash] = self._balance_list_hash
+        offset += FieldByteSize.hash
+        if include_signature:
+            buffer[offset:offset + FieldByteSize.identifier] = self._verifier_identifier
+            offset += FieldByteSize.identifier
+            buffer[offset:offset + FieldByteSize.signature] = self._verifier_signature
+            offset += FieldByteSize.signature
+        return offset
+
+    def signature_is_valid(self) -> bool:
+        """Verifier signature, over the block bytes without the signature"""
+        return KeyUtil.signature_is_valid(self._verifier_signature, self.get_bytes(include_signature=False),
+                                          self._verifier_identifier)
 
     def get_byte_size(self, include_signature: bool=False) -> int:
         size = FieldByteSize.blockHeight + FieldByteSize.hash + FieldByteSize.timestamp  + FieldByteSize.timestamp \
@@ -201,30 +229,56 @@ class Block(MessageObject):
         """
 
     @staticmethod
-    def from_nyzoblock(filename: str, verbose=False) -> list:
-        """Read a nyzoblock and returns a list of blocks"""
-        result = []
+    def from_nyzoblock(filename: str, verbose=False, lazy: bool=False) -> list:
+        """Read a nyzoblock and returns a list of blocks
+        lazy=True returns LazyBlock views over the file buffer instead of fully decoded blocks."""
+        return list(Block.iter_nyzoblock(filename, verbose=verbose, lazy=lazy))
+
+    @staticmethod
+    def iter_nyzoblock(filename: str, with_balance_lists: bool=False, lazy: bool=False, verbose=False):
+        """Memory maps a nyzoblock and yields its blocks one at a time.
+        Balance lists are skipped without being decoded, unless with_balance_lists is set: then
+        (block, balance_list) tuples are yielded, balance_list being None when the file has none after that block.
+        lazy=True yields LazyBlock views over the mapped file."""
         with open(filename, 'rb') as file:
-            buffer = memoryview(file.read())
-        offset = 0
-        num_blocks = struct.unpack(">H", buffer[offset:offset + 2])[0]  # Short, 2 bytes
-        offset += 2
-        if verbose:
-            print(f"Num blocks {num_blocks}")
-        last_block_height = None
-        for i in range(num_blocks):
-            block = Block(buffer=buffer[offset:])
-            result.append(block)
-            if last_block_height is None:
-                last_block_height = block._height
-            offset += block.get_byte_size(include_signature=True)
+            if os.fstat(file.fileno()).st_size == 0:
+                return
+            # The map keeps its own handle, the file can be closed right away.
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(mapped)
+        try:
+            offset = 0
+            num_blocks = codec.UNSIGNED_SHORT.unpack_from(buffer, offset)[0]  # Short, 2 bytes
+            offset += 2
             if verbose:
-                print(block.to_string())
-            if i == 0 or last_block_height != block._height - 1:
-                # We have a balance
-                balance = BalanceList(buffer=buffer[offset:])
-                offset += balance.get_byte_size()
+                print(f"Num blocks {num_blocks}")
+            last_block_height = None
+            for i in range(num_blocks):
+                block = LazyBlock(buffer, offset) if lazy else Block(buffer=buffer[offset:])
+                if last_block_height is None:
+                    last_block_height = block.get_height()
+                offset += block.get_byte_size(include_signature=True)
                 if verbose:
-                    print(f"Balance {balance.to_string()}")
-            last_block_height = block._height
-        return result
+                    print(block.to_string())
+                balance = None
+                if i == 0 or last_block_height != block.get_height() - 1:
+                    # We have a balance
+                    if with_balance_lists or verbose:
+                        balance = BalanceList(buffer=buffer[offset:])
+                        offset += balance.get_byte_size()
+                        if verbose:
+                            print(f"Balance {balance.to_string()}")
+                    else:
+                        offset += BalanceList.byte_size_from_buffer(buffer, offset)
+                last_block_height = block.get_height()
+                if with_balance_lists:
+                    yield block, balance
+                else:
+                    yield block
+        finally:
+            buffer.release()
+            try:
+                mapped.close()
+            except BufferError:
+                # Yielded blocks still hold views on the map, it will be unmapped once they are all gone.
+                pass
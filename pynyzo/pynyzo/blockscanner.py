@@ -0,0 +1,77 @@
+"""
+Parallel scanner for directories of .nyzoblock files.
+
+Files are spread over a process pool, each worker streams its file with Block.iter_nyzoblock and runs a user
+supplied reducer on it. Only the reducer result travels back to the caller, never the Block objects.
+
+The reducer is called as reducer(filename, blocks) where blocks is the block iterator of that file,
+and must return something small and picklable (per height tuples, counters...).
+It has to be a module level function so it can be sent to the workers.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from os import path, walk
+
+from pynyzo.block import Block
+from pynyzo.helpers import base_app_log
+
+
+def _scan_file(filename: str, reducer, lazy: bool):
+    """Worker side: decode one file and reduce it"""
+    return filename, reducer(filename, Block.iter_nyzoblock(filename, lazy=lazy))
+
+
+def _scan_files(filenames: list, reducer, lazy: bool) -> list:
+    """Worker side: reduce a batch of files, saves one round trip per file"""
+    return [_scan_file(filename, reducer, lazy) for filename in filenames]
+
+
+class BlockScanner:
+    """Runs a reducer over many nyzoblock files, one process per core by default."""
+
+    __slots__ = ('app_log', 'max_workers', 'lazy', 'batch_size')
+
+    def __init__(self, max_workers: int=None, lazy: bool=True, batch_size: int=16, app_log: object=None):
+        """lazy: reducers get LazyBlock views, way cheaper when only a few fields are needed.
+        batch_size: number of files sent to a worker at once."""
+        self.app_log = base_app_log(app_log)
+        self.max_workers = max_workers
+        self.lazy = lazy
+        self.batch_size = batch_size
+
+    @staticmethod
+    def list_files(root: str, extension: str='.nyzoblock') -> list:
+        """Recursively lists the block files under root, sorted by name"""
+        result = []
+        for directory, _, files in walk(root):
+            result.extend(path.join(directory, name) for name in files if name.endswith(extension))
+        return sorted(result)
+
+    def scan(self, filenames, reducer):
+        """Yields (filename, result) tuples, in completion order.
+        filenames may be a list of files or a root directory to scan."""
+        if isinstance(filenames, str):
+            filenames = self.list_files(filenames)
+        batches = [filenames[i:i + self.batch_size] for i in range(0, len(filenames), self.batch_size)]
+        executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        futures = [executor.submit(_scan_files, batch, reducer, self.lazy) for batch in batches]
+        try:
+            for future in as_completed(futures):
+                try:
+                    yield from future.result()
+                except Exception as e:
+                    self.app_log.error(f"BlockScanner: batch failed ({e})")
+                    raise
+        finally:
+            # On error or early close of the generator, batches not started yet are dropped,
+            # shutdown only waits for the running ones.
+            for pending in futures:
+                pending.cancel()
+            executor.shutdown(wait=True)
+
+    def reduce(self, filenames, reducer, combine, initial=None):
+        """Folds every file result into a single value with combine(accumulator, result), in the caller process."""
+        accumulator = initial
+        for _, result in self.scan(filenames, reducer):
+            accumulator = combine(accumulator, result)
+        return accumulator
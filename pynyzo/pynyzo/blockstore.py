@@ -0,0 +1,267 @@
+"""
+Local, append only block store with a height index.
+
+Serialized blocks (signature included) are appended to segment files, a new segment is started once the
+current one reaches segment_size. A fixed width index maps each height to (segment, offset, length):
+a lookup is one index read plus one slice of the memory mapped segment, whatever the store size.
+
+Layout of the store directory:
+- index.bin: 16 bytes header (magic, version, first height) then 16 bytes per height from the first one.
+  A zero length marks a missing height.
+- 000000.blocks, 000001.blocks...: raw blocks, back to back.
+
+One writer per store. Readers of the same instance see appended blocks immediately.
+On open, index records that point past the end of their segment - a crash between the data and the index
+reaching the disk - are dropped, so the store ends at its last complete block.
+"""
+
+import mmap
+import os
+import struct
+
+from pynyzo.block import Block
+from pynyzo.helpers import base_app_log
+from pynyzo.lazyblock import LazyBlock
+
+# Default max size of a segment file, bytes
+SEGMENT_SIZE = 1 << 30
+
+
+class MappedFile:
+    """Read only map of a file that may grow, remapped when a read goes past the mapped size"""
+
+    __slots__ = ('filename', '_map', '_view')
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._map = None
+        self._view = None
+
+    def get_view(self, end: int) -> memoryview:
+        """View covering at least [0, end)"""
+        if self._view is None or len(self._view) < end:
+            self.close()
+            with open(self.filename, 'rb') as file:
+                if os.fstat(file.fileno()).st_size < end:
+                    raise ValueError(f"{self.filename} is shorter than {end} bytes")
+                self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+        return self._view
+
+    def close(self) -> None:
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Blocks handed out still hold views on the map, it will be unmapped once they are all gone.
+                pass
+            self._map = None
+
+
+class BlockStore:
+    """Segment files plus a height index, see module doc"""
+
+    index_header = struct.Struct(">4sHHQ")  # magic, version, reserved, first height
+    index_record = struct.Struct(">IQI")  # segment, offset, length
+    magic = b'NYZI'
+    version = 1
+
+    __slots__ = ('app_log', 'root', 'segment_size', '_start_height', '_count', '_segment', '_segment_length',
+                 '_index_file', '_segment_file', '_dirty', '_index_map', '_segment_maps')
+
+    def __init__(self, root: str, segment_size: int=SEGMENT_SIZE, app_log: object=None):
+        """Opens the store in the root directory, created if needed."""
+        self.app_log = base_app_log(app_log)
+        self.root = root
+        self.segment_size = segment_size
+        os.makedirs(root, exist_ok=True)
+        self._start_height = None
+        self._count = 0
+        self._segment = 0
+        self._segment_length = 0
+        self._index_file = None
+        self._segment_file = None
+        self._dirty = False
+        self._index_map = MappedFile(self._index_filename())
+        self._segment_maps = {}
+        index_size = os.path.getsize(self._index_filename()) if os.path.exists(self._index_filename()) else 0
+        if index_size >= self.index_header.size:
+            with open(self._index_filename(), 'rb') as file:
+                magic, version, _, self._start_height = self.index_header.unpack(
+                    file.read(self.index_header.size))
+            if magic != self.magic or version != self.version:
+                raise ValueError(f"{self._index_filename()} is not a version {self.version} block store index")
+            # A record cut by a crash is ignored, and overwritten by the next append
+            self._count = (index_size - self.index_header.size) // self.index_record.size
+            self._recover()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _index_filename(self) -> str:
+        return os.path.join(self.root, 'index.bin')
+
+    def _segment_filename(self, segment: int) -> str:
+        return os.path.join(self.root, f"{segment:06d}.blocks")
+
+    def _recover(self) -> None:
+        """Drops the last index records whose block is not complete in its segment, then sets the current segment
+        and its useful length from the last complete block."""
+        sizes = {}
+        count = self._count
+        for position in range(self._count - 1, -1, -1):
+            segment, offset, length = self._read_record(position)
+            if not length:
+                continue
+            if segment not in sizes:
+                filename = self._segment_filename(segment)
+                sizes[segment] = os.path.getsize(filename) if os.path.exists(filename) else 0
+            if offset + length <= sizes[segment]:
+                self._segment = segment
+                self._segment_length = offset + length
+                break
+            # Gaps recorded just before an incomplete block go with it
+            count = position
+        else:
+            count = 0
+        if count < self._count:
+            self.app_log.warning(f"BlockStore: {self._count - count} index records past the end of the data "
+                                 f"dropped, store now ends at {self._start_height + count - 1}")
+            self._count = count
+
+    def _read_record(self, position: int) -> tuple:
+        offset = self.index_header.size + position * self.index_record.size
+        view = self._index_map.get_view(offset + self.index_record.size)
+        return self.index_record.unpack_from(view, offset)
+
+    def get_start_height(self) -> int:
+        """First height of the store, None if empty"""
+        return self._start_height
+
+    def get_end_height(self) -> int:
+        """Last height of the store, None if empty"""
+        return None if self._start_height is None else self._start_height + self._count - 1
+
+    def __len__(self) -> int:
+        """Number of heights covered, including missing ones"""
+        return self._count
+
+    def __contains__(self, height: int) -> bool:
+        return self.get_buffer(height) is not None
+
+    def flush(self, sync: bool=False) -> None:
+        """Writes pending appends to the OS. Blocks first, then the index.
+        sync=True also fsyncs both files in that order, so that the index never points past the data on disk."""
+        if self._dirty:
+            self._segment_file.flush()
+            self._index_file.flush()
+            self._dirty = False
+        if sync:
+            for file in (self._segment_file, self._index_file):
+                if file is not None:
+                    os.fsync(file.fileno())
+
+    def get_buffer(self, height: int) -> memoryview:
+        """Raw serialized block - no copy - or None if the height is not stored"""
+        if self._start_height is None or not 0 <= height - self._start_height < self._count:
+            return None
+        self.flush()
+        segment, offset, length = self._read_record(height - self._start_height)
+        if not length:
+            return None
+        segment_map = self._segment_maps.get(segment)
+        if segment_map is None:
+            segment_map = self._segment_maps[segment] = MappedFile(self._segment_filename(segment))
+        return segment_map.get_view(offset + length)[offset:offset + length]
+
+    def get(self, height: int) -> LazyBlock:
+        """Lazily decoded block, or None if the height is not stored"""
+        buffer = self.get_buffer(height)
+        return None if buffer is None else LazyBlock(buffer)
+
+    def range(self, start_height: int, end_height: int):
+        """Yields the stored blocks from start_height to end_height included, missing heights are skipped"""
+        if self._start_height is None:
+            return
+        start_height = max(start_height, self._start_height)
+        end_height = min(end_height, self.get_end_height())
+        for height in range(start_height, end_height + 1):
+            block = self.get(height)
+            if block is not None:
+                yield block
+
+    def _open_for_append(self) -> None:
+        if self._index_file is None:
+            self._index_file = open(self._index_filename(), 'r+b' if self._start_height is not None else 'wb')
+            # Drops a partial record, if any
+            self._index_file.truncate(self.index_header.size + self._count * self.index_record.size
+                                      if self._start_height is not None else 0)
+            self._index_file.seek(0, os.SEEK_END)
+        if self._segment_file is None or self._segment_length >= self.segment_size:
+            if self._segment_file is not None:
+                self._segment_file.flush()
+                os.fsync(self._segment_file.fileno())
+                self._segment_file.close()
+            if self._segment_length >= self.segment_size:
+                self._segment += 1
+                self._segment_length = 0
+            filename = self._segment_filename(self._segment)
+            self._segment_file = open(filename, 'r+b' if os.path.exists(filename) else 'wb')
+            # Anything past the last indexed block was never indexed
+            self._segment_file.truncate(self._segment_length)
+            self._segment_file.seek(self._segment_length)
+
+    def append_buffer(self, height: int, buffer: bytes) -> None:
+        """Appends a serialized block - with signature - at height.
+        Heights have to grow, gaps are allowed and recorded as missing heights."""
+        if self._start_height is None:
+            self._open_for_append()
+            self._start_height = height
+            self._index_file.write(self.index_header.pack(self.magic, self.version, 0, height))
+        elif height <= self.get_end_height():
+            raise ValueError(f"Height {height} is not past the end of the store ({self.get_end_height()})")
+        else:
+            self._open_for_append()
+        missing = height - self._start_height - self._count
+        if missing:
+            self._index_file.write(self.index_record.pack(0, 0, 0) * missing)
+        self._segment_file.write(buffer)
+        self._index_file.write(self.index_record.pack(self._segment, self._segment_length, len(buffer)))
+        self._segment_length += len(buffer)
+        self._count += missing + 1
+        self._dirty = True
+
+    def append(self, block) -> None:
+        """Appends a Block or LazyBlock"""
+        self.append_buffer(block.get_height(), block.get_bytes(include_signature=True))
+
+    def append_nyzoblock(self, filename: str) -> int:
+        """Appends the blocks of a nyzoblock file past the end of the store, returns how many were added"""
+        added = 0
+        end_height = self.get_end_height()
+        for block in Block.iter_nyzoblock(filename, lazy=True):
+            if end_height is None or block.get_height() > end_height:
+                self.append_buffer(block.get_height(), block.get_buffer(include_signature=True))
+                added += 1
+        return added
+
+    def close(self) -> None:
+        self.flush(sync=True)
+        for file in (self._index_file, self._segment_file):
+            if file is not None:
+                file.close()
+        self._index_file = self._segment_file = None
+        self._index_map.close()
+        for segment_map in self._segment_maps.values():
+            segment_map.close()
+        self._segment_maps = {}
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
@@ -0,0 +1,255 @@
+"""
+Bulk block range downloader.
+
+The range is split in chunks, each peer of the pool runs a worker that takes the next chunk and sends its
+BlockRequest, so several peers download concurrently. Blocks are handed out in height order whatever the
+order the chunks complete in.
+
+Chunk size is adapted per peer: doubled while responses come back fast, halved on slow or failed ones,
+and always kept so a response stays well under Message.maximumMessageLength.
+Peers may answer with less blocks than requested, the remainder is queued again.
+A failed chunk goes to another peer, up to max_retries times.
+"""
+
+import asyncio
+from collections import deque
+
+from pynyzo.connectionpool import ConnectionPool
+from pynyzo.helpers import base_app_log
+from pynyzo.message import Message
+from pynyzo.messagetype import MessageType
+from pynyzo.messages.blockrequest import BlockRequest
+from pynyzo.messages.blockresponse import BlockResponse
+from pynyzo.metrics import metrics
+
+
+class _Chunk:
+    """Height range still to fetch, and the peers that failed it"""
+
+    __slots__ = ('start', 'end', 'attempts', 'tried')
+
+    def __init__(self, start: int, end: int):
+        self.start = start
+        self.end = end
+        self.attempts = 0
+        self.tried = set()
+
+
+class BlockSync:
+    """Downloads block ranges from the peers of a ConnectionPool.
+    Chunk sizes and the block size estimate are kept from one range to the next."""
+
+    __slots__ = ('app_log', 'pool', 'peers', 'lazy', 'chunk_size', 'min_chunk_size', 'max_chunk_size',
+                 'target_latency', 'timeout', 'max_retries', 'max_peer_failures', 'max_buffered', 'verbose',
+                 '_chunk_sizes', '_block_size')
+
+    # Fraction of the max message length a response may use, leaves room for a larger than average block.
+    message_usage = 0.5
+
+    def __init__(self, pool: ConnectionPool, peers: list=None, lazy: bool=True, chunk_size: int=10,
+                 min_chunk_size: int=1, max_chunk_size: int=1000, target_latency: float=2.0, timeout: float=None,
+                 max_retries: int=5, max_peer_failures: int=3, max_buffered: int=10000, verbose: bool=False,
+                 app_log: object=None):
+        """peers: defaults to all the pool peers.
+        lazy: blocks are LazyBlock views, Block instances otherwise.
+        target_latency: seconds, chunks grow while responses are faster than that.
+        max_peer_failures: consecutive failures before a peer is dropped for the current range.
+        max_buffered: how far ahead of the next block to hand out workers may go."""
+        self.app_log = base_app_log(app_log)
+        self.pool = pool
+        self.peers = [pool.add_peer(peer) for peer in peers] if peers else None
+        self.lazy = lazy
+        self.chunk_size = chunk_size
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.target_latency = target_latency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_peer_failures = max_peer_failures
+        self.max_buffered = max_buffered
+        self.verbose = verbose
+        self._chunk_sizes = {}
+        self._block_size = 0  # Moving average of the serialized block size, 0 until known
+
+    def get_chunk_size(self, peer: tuple) -> int:
+        """Current chunk size for a peer, capped by the expected response size"""
+        size = self._chunk_sizes.get(peer, self.chunk_size)
+        if self._block_size:
+            size = min(size, int(Message.maximumMessageLength * self.message_usage / self._block_size))
+        return max(self.min_chunk_size, min(size, self.max_chunk_size))
+
+    def _adapt(self, peer: tuple, latency: float=None, buffer_size: int=0, count: int=0) -> None:
+        """latency None means a failure"""
+        size = self.get_chunk_size(peer)
+        if latency is None or latency > self.target_latency:
+            size //= 2
+        elif latency < self.target_latency / 2 and count >= size:
+            size *= 2
+        self._chunk_sizes[peer] = max(self.min_chunk_size, min(size, self.max_chunk_size))
+        if count:
+            block_size = buffer_size / count
+            self._block_size = block_size if not self._block_size else 0.8 * self._block_size + 0.2 * block_size
+
+    def decode(self, buffer: bytes, start_height: int, end_height: int) -> list:
+        """Blocks of a response, keeps the consecutive ones from start_height up to end_height"""
+        blocks = []
+        height = start_height
+        start = metrics.clock() if metrics.enabled else 0
+        response = BlockResponse(buffer=buffer, lazy=self.lazy)
+        if start:
+            metrics.observe_decode(response.__class__.__name__, metrics.clock() - start)
+        for block in response.get_blocks():
+            if height > end_height or block.get_height() != height:
+                break
+            blocks.append(block)
+            height += 1
+        return blocks
+
+    async def iter_blocks(self, start_height: int, end_height: int):
+        """Async generator of the blocks from start_height to end_height included, in height order.
+        Raises RuntimeError if a chunk can't be fetched from any peer."""
+        job = _SyncJob(self, start_height, end_height)
+        async for block in job.run():
+            yield block
+
+    async def sync(self, start_height: int, end_height: int, sink) -> int:
+        """Calls sink(block) - a function or a coroutine function - for each block in height order.
+        Returns the number of blocks."""
+        count = 0
+        async for block in self.iter_blocks(start_height, end_height):
+            result = sink(block)
+            if asyncio.iscoroutine(result):
+                await result
+            count += 1
+        return count
+
+
+class _SyncJob:
+    """State of one iter_blocks call"""
+
+    __slots__ = ('sync', 'queue', 'blocks', 'next_height', 'end_height', 'peers', 'condition', 'error')
+
+    def __init__(self, sync: BlockSync, start_height: int, end_height: int):
+        self.sync = sync
+        self.queue = deque([_Chunk(start_height, end_height)]) if end_height >= start_height else deque()
+        self.blocks = {}  # height -> block, received but not handed out yet
+        self.next_height = start_height
+        self.end_height = end_height
+        self.peers = set(sync.peers if sync.peers else sync.pool.get_peers())
+        self.condition = None
+        self.error = None
+
+    def is_done(self) -> bool:
+        return self.error is not None or self.next_height > self.end_height
+
+    def _take(self, peer: tuple) -> _Chunk:
+        """Next chunk this peer did not fail, split to the peer chunk size"""
+        for chunk in self.queue:
+            if chunk.start > self.next_height + self.sync.max_buffered:
+                # Wait for the consumer to catch up
+                return None
+            if peer in chunk.tried:
+                continue
+            size = self.sync.get_chunk_size(peer)
+            if chunk.end - chunk.start + 1 > size:
+                taken = _Chunk(chunk.start, chunk.start + size - 1)
+                taken.attempts, taken.tried = chunk.attempts, set(chunk.tried)
+                chunk.start += size
+                return taken
+            self.queue.remove(chunk)
+            return chunk
+        return None
+
+    def _requeue(self, chunk: _Chunk) -> None:
+        """Back in front of the queue, in height order"""
+        index = 0
+        while index < len(self.queue) and self.queue[index].start < chunk.start:
+            index += 1
+        self.queue.insert(index, chunk)
+
+    async def _worker(self, peer: tuple) -> None:
+        sync = self.sync
+        loop = asyncio.get_running_loop()
+        failures = 0
+        while True:
+            async with self.condition:
+                while True:
+                    if self.is_done():
+                        return
+                    chunk = self._take(peer)
+                    if chunk:
+                        break
+                    await self.condition.wait()
+            message = Message(MessageType.BlockRequest11, BlockRequest(start_height=chunk.start,
+                                                                       end_height=chunk.end))
+            start = loop.time()
+            try:
+                buffer = await sync.pool.fetch_buffer(peer, message, sync.timeout)
+                blocks = sync.decode(buffer, chunk.start, chunk.end)
+                if not blocks:
+                    raise RuntimeError(f"No block in [{chunk.start}, {chunk.end}]")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                if sync.verbose:
+                    sync.app_log.warning(f"BlockSync: [{chunk.start}, {chunk.end}] failed on {peer}: {e}")
+                async with self.condition:
+                    sync._adapt(peer)
+                    chunk.attempts += 1
+                    chunk.tried.add(peer)
+                    if failures >= sync.max_peer_failures:
+                        self.peers.discard(peer)
+                    if chunk.attempts > sync.max_retries or not self.peers:
+                        self.error = RuntimeError(f"BlockSync: [{chunk.start}, {chunk.end}] failed "
+                                                  f"{chunk.attempts} times, last error {e}")
+                    elif self.peers <= chunk.tried:
+                        # Every peer failed it once, let them all try again
+                        chunk.tried.clear()
+                    self._requeue(chunk)
+                    self.condition.notify_all()
+                    if peer not in self.peers:
+                        return
+                continue
+            failures = 0
+            async with self.condition:
+                sync._adapt(peer, loop.time() - start, len(buffer), len(blocks))
+                for block in blocks:
+                    self.blocks[block.get_height()] = block
+                last_height = chunk.start + len(blocks) - 1
+                if last_height < chunk.end:
+                    # Partial response, the rest is a new chunk
+                    self._requeue(_Chunk(last_height + 1, chunk.end))
+                self.condition.notify_all()
+
+    async def run(self):
+        self.condition = asyncio.Condition()
+        workers = [asyncio.ensure_future(self._worker(peer)) for peer in self.peers]
+        if not workers and self.queue:
+            raise RuntimeError("BlockSync: no peer")
+        try:
+            while True:
+                async with self.condition:
+                    while self.error is None and self.next_height <= self.end_height \
+                            and self.next_height not in self.blocks:
+                        await self.condition.wait()
+                    if self.error is not None:
+                        raise self.error
+                    ready = []
+                    while self.next_height in self.blocks:
+                        ready.append(self.blocks.pop(self.next_height))
+                        self.next_height += 1
+                    # Workers may be waiting for the consumer to catch up
+                    self.condition.notify_all()
+                for block in ready:
+                    yield block
+                if self.next_height > self.end_height:
+                    return
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
@@ -5,92 +5,199 @@ Defaults to client.nyzo.co
 Most dupped from Nyzocli since it's likely to be required by more apps.
 """
 
-from requests import get
+import asyncio
 import re
-from time import time, sleep
 from asyncio import sleep as async_sleep
+from concurrent.futures import ThreadPoolExecutor
+from time import time, sleep
 from typing import Union, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
 from nyzostrings.nyzostringencoder import NyzoStringEncoder
 from nyzostrings.nyzostringtransaction import NyzoStringTransaction
 from nyzostrings.nyzostringpublicidentifier import NyzoStringPublicIdentifier
+from pynyzo.blocksync import BlockSync
+from pynyzo.clienthtml import parse_frozen, parse_table
+from pynyzo.confirmationtracker import ConfirmationTracker
+from pynyzo.connectionpool import ConnectionPool
+from pynyzo.frozenedgefollower import BLOCK_TIME, FrozenEdgeFollower
+from pynyzo.frozenedgeprovider import FrozenEdgeProvider
 from pynyzo.keyutil import KeyUtil
 from pynyzo.transaction import Transaction
 
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+# HTTP timeout, seconds
+HTTP_TIMEOUT = 30
+
+# Keep-alive connections kept per host, also the max concurrent async requests
+POOL_SIZE = 100
+
+# Max wait on a ConfirmationTracker, seconds
+CONFIRM_TIMEOUT = 20 * BLOCK_TIME
+
+# Max transactions signed against one frozen edge snapshot. Their timestamps are 1 ms apart after the 10 s
+# inclusion delay: a larger batch would reach blocks far past its snapshot.
+BATCH_SIZE = 1000
+
+
+def inclusion_timestamp() -> int:
+    """Timestamp of a transaction to be sent now, ms. Fixed 10 sec delay for inclusion."""
+    return int(time() * 10) * 100 + 10000
+
 
 class NyzoClient:
+    """Nyzo web client API. Every call has a sync and an async_ version.
+
+    Sync calls share a requests.Session: connections are kept alive and reused.
+    Async calls use aiohttp if installed (pip install pynyzo[aiohttp]), otherwise the sync session runs in a
+    thread pool of pool_size workers. Either way the event loop never waits on a socket.
+    The thread pool fallback shares that one requests.Session across its threads: requests does not guarantee
+    Session thread safety, a session passed in should not carry per request state (cookies, auth hooks).
+
+    With frozen_ttl or a shared FrozenEdgeProvider, get_frozen serves a cached frozen edge and concurrent
+    callers share a single request."""
 
-    def __init__(self, client: str="https://client.nyzo.co"):
+    def __init__(self, client: str="https://client.nyzo.co", timeout: float=HTTP_TIMEOUT, pool_size: int=POOL_SIZE,
+                 session: requests.Session=None, use_aiohttp: bool=True, frozen_ttl: float=0,
+                 frozen_edge: FrozenEdgeProvider=None):
+        """session: a requests.Session to use instead of our own.
+        use_aiohttp: False forces the thread pool backend for async calls.
+        frozen_ttl: seconds the frozen edge is cached, BLOCK_TIME is a good value. 0 fetches it on every call.
+        frozen_edge: a provider shared with other clients or fed by a verifier, takes precedence over frozen_ttl."""
         self.client = client
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.use_aiohttp = use_aiohttp and aiohttp is not None
+        self._session = session
+        self._async_session = None
+        self._async_loop = None
+        self._executor = None
+        if frozen_edge is None and frozen_ttl > 0:
+            frozen_edge = FrozenEdgeProvider(client=self, ttl=frozen_ttl)
+        self.frozen_edge = frozen_edge
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.async_close()
+
+    def get_session(self) -> requests.Session:
+        """The pooled session of sync calls, created on first use"""
+        if self._session is None:
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+        return self._session
+
+    def _get(self, url: str) -> str:
+        res = self.get_session().get(url, timeout=self.timeout)
+        return res.text
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_size)
+        return self._executor
+
+    async def _async_get(self, url: str) -> str:
+        if self.use_aiohttp:
+            loop = asyncio.get_running_loop()
+            if self._async_session is None or self._async_session.closed or self._async_loop is not loop:
+                # aiohttp sessions are bound to their loop, the one of a previous loop is closed first
+                self._discard_async_session()
+                self._async_session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit_per_host=self.pool_size),
+                    timeout=aiohttp.ClientTimeout(total=self.timeout))
+                self._async_loop = loop
+            async with self._async_session.get(url) as res:
+                return await res.text()
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(), self._get, url)
+
+    def _discard_async_session(self) -> None:
+        """Closes the aiohttp session without awaiting: on its loop if it still runs, right away otherwise"""
+        session, loop = self._async_session, self._async_loop
+        self._async_session = self._async_loop = None
+        if session is None or session.closed:
+            return
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+        else:
+            try:
+                # The loop is gone, only the pooled connections are left to close
+                session.connector.close()
+            except RuntimeError:
+                # Transports of a closed loop, freed with the session
+                pass
+
+    def close(self) -> None:
+        """Closes the sync session, the aiohttp session and the thread pool"""
+        self._discard_async_session()
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def async_close(self) -> None:
+        """close(), awaits the aiohttp session closing if it belongs to the running loop"""
+        if self._async_session is not None and self._async_loop is asyncio.get_running_loop():
+            await self._async_session.close()
+            self._async_session = self._async_loop = None
+        self.close()
 
     def get_frozen(self):
+        """Frozen edge, from the frozen edge provider if any"""
+        if self.frozen_edge is not None:
+            return self.frozen_edge.get_frozen()
+        return self.fetch_frozen()
+
+    async def async_get_frozen(self):
+        """get_frozen, async version"""
+        if self.frozen_edge is not None:
+            return await self.frozen_edge.async_get_frozen()
+        return await self.async_fetch_frozen()
+
+    def fetch_frozen(self):
         """Helper to fetch frozen edge from a client"""
         data = {}
         try:
-            url = "{}/frozenEdge".format(self.client)
-            res = get(url)
-            data = self.fake_table_frozen_to_dict(res.text)
+            data = self.fake_table_frozen_to_dict(self._get("{}/frozenEdge".format(self.client)))
+        except Exception as e:
+            print(f"get_frozen, exception {e}")
+        return data
+
+    async def async_fetch_frozen(self):
+        """fetch_frozen, async version"""
+        data = {}
+        try:
+            data = self.fake_table_frozen_to_dict(await self._async_get("{}/frozenEdge".format(self.client)))
         except Exception as e:
             print(f"get_frozen, exception {e}")
         return data
 
     @staticmethod
     def fake_table_to_list(html: str):
-        #
-        test_header = re.search(r'<div class="header-row">([^"]*)</div><div class="data-row">', html)
-        headers = []
-        if test_header:
-            headers = test_header.groups()[0].replace('<div>', '').split("</div>")[:-1]  # closing /div
-        test_content = re.search(r'<div class="data-row">(.*)</div></div></div>', html)
-        try:
-            error_content = re.search(r'<p class="error">(.*)</p>', html).groups()[0]
-        except Exception:
-            error_content = None
-        try:
-            notice_content = re.search(r'<p class="notice">([^"]*)</p>', html).groups()
-        except Exception:
-            notice_content = []
-        values = []
-        if test_content:
-            content = test_content.groups()[0].replace('<div>', '')\
-                .replace('<div class="extra-wrap">', '') \
-                .replace('<div class="data-row">', '') \
-                .split("</div>")
-            while len(content) >= len(headers):
-                part = content[0:len(headers)]
-                content = content[len(headers)+1:]
-                temp = dict(zip(headers, part))
-                if error_content:
-                    temp["error"] = error_content
-                temp["notice"] = notice_content
-                values.append(temp)
-        else:
-            values = [{"notice": notice_content}]
-            if error_content:
-                values[0]["error"] = error_content
-        return values
+        """Rows of a client table as dicts of strings, see clienthtml.parse_table for typed values"""
+        return parse_table(html, typed_fields=False)
 
     @staticmethod
     def fake_table_frozen_to_dict(html: str):
-        """Neither clean nor future proof, but that's the way client sends back the data"""
-        try:
-            height = re.search(r'<div>height</div><div>([^<]*)</div>', html).groups()[0]
-        except Exception:
-            height = 0
-        try:
-            the_hash = re.search(r'<div>hash</div><div[^>]*>([^<]*)</div>', html).groups()[0]
-        except Exception:
-            the_hash = b''
-        try:
-            timestamp = re.search(r'<div>verification timestamp \(ms\)</div><div>([^<]*)</div>', html).groups()[0]
-        except Exception:
-            timestamp = 0
-        try:
-            distance = re.search(r'<div>distance from open edge</div><div>([^<]*)</div>', html).groups()[0]
-        except Exception:
-            distance = 0
-        values = {"height": int(height), "hash": the_hash.replace('-', ''),
-                  "timestamp": timestamp, "distance": distance}
-        return values
+        """Neither clean nor future proof, but that's the way client sends back the data.
+        See clienthtml.parse_frozen for typed values."""
+        return parse_frozen(html, typed_fields=False)
 
     @staticmethod
     def normalize_address(address: str, as_hex: bool = False) -> Union[Tuple[str, str], Tuple[str, bytes]]:
@@ -119,46 +226,249 @@ class NyzoClient:
         """
         if key_ == "":
             raise ValueError("Need a key_")
-        seed = NyzoStringEncoder.decode(key_).get_bytes()
-        # convert key to address
-        address = KeyUtil.private_to_public(seed.hex())
-        recipient, recipient_raw = self.normalize_address(recipient, as_hex=True)
         if frozen is None:
             frozen = self.get_frozen()
-        # print (f"Sending {amount} to {recipient} since balance of {address} is > {above}.")
-        # print(f"Frozen edge is at {frozen['height']}")
-        # Create a tx
-        timestamp = int(time() * 10) * 100 + 10000  # Fixed 10 sec delay for inclusion
-        # print(timestamp, hex(timestamp))
+        tx__ = self.build_transaction(recipient, amount, data, key_, frozen)
+        return self.forward_result(self._get(self.forward_url(tx__)), tx__)
+
+    async def async_send(self, recipient: str, amount: float = 0, data: str = "", key_: str = "",
+                         frozen: dict=None):
+        """send, async version"""
+        if key_ == "":
+            raise ValueError("Need a key_")
+        if frozen is None:
+            frozen = await self.async_get_frozen()
+        tx__ = self.build_transaction(recipient, amount, data, key_, frozen)
+        return self.forward_result(await self._async_get(self.forward_url(tx__)), tx__)
+
+    def build_transaction(self, recipient: str, amount: float, data: str, key_: str, frozen: dict) -> str:
+        """Signed transaction, as a tx__ nyzostring"""
+        seed = NyzoStringEncoder.decode(key_).get_bytes()
+        key, verifying_key = KeyUtil.get_from_private_seed(seed.hex())
+        tx__, _ = self._sign(key, verifying_key.to_bytes(), recipient, amount, data, frozen['height'],
+                             bytes.fromhex(frozen["hash"]), inclusion_timestamp())
+        return tx__
+
+    def build_transactions(self, entries: list, key_: str, frozen: dict, timestamp: int=0) -> list:
+        """Signed transactions of (recipient, amount, data) entries, as (tx__, signature) tuples.
+        The key is decoded once and every transaction refers to the same frozen edge snapshot.
+        Timestamps are 1 ms apart from timestamp - inclusion_timestamp() at least - so that two payouts to the same
+        recipient are distinct transactions. Keep entries under BATCH_SIZE, send_batch splits larger batches."""
+        seed = NyzoStringEncoder.decode(key_).get_bytes()
+        key, verifying_key = KeyUtil.get_from_private_seed(seed.hex())
+        sender = verifying_key.to_bytes()
+        previous_block_hash = bytes.fromhex(frozen["hash"])
+        timestamp = max(timestamp, inclusion_timestamp())
+        return [self._sign(key, sender, recipient, amount, data, frozen['height'], previous_block_hash,
+                           timestamp + index)
+                for index, (recipient, amount, data) in enumerate(entries)]
+
+    def _sign(self, key, sender: bytes, recipient: str, amount: float, data: str, previous_hash_height: int,
+              previous_block_hash: bytes, timestamp: int) -> tuple:
+        """(tx__, signature) of a standard transaction"""
+        _, recipient_raw = self.normalize_address(recipient)
         data_bytes = data[:32].encode("utf-8")
+        micronyzos = int(amount * 1e6)
         transaction = Transaction(buffer=None, type=Transaction.type_standard, timestamp=timestamp,
-                                  sender_identifier=bytes.fromhex(address), amount=int(amount * 1e6),
-                                  receiver_identifier=bytes.fromhex(recipient_raw),
-                                  previous_block_hash=bytes.fromhex(frozen["hash"]),
-                                  previous_hash_height=frozen['height'],
+                                  sender_identifier=sender, amount=micronyzos,
+                                  receiver_identifier=recipient_raw,
+                                  previous_block_hash=previous_block_hash,
+                                  previous_hash_height=previous_hash_height,
                                   signature=b'', sender_data=data_bytes)
-        # print(transaction.to_json())
-        key, _ = KeyUtil.get_from_private_seed(seed.hex())
-        to_sign = transaction.get_bytes(for_signing=True)
-        sign = KeyUtil.sign_bytes(to_sign, key)
-        tx = NyzoStringTransaction(Transaction.type_standard, timestamp, int(amount * 1e6),
-                                   bytes.fromhex(recipient_raw),
-                                   frozen['height'],
-                                   bytes.fromhex(frozen["hash"]),
-                                   bytes.fromhex(address), data_bytes,
-                                   sign)
-        tx__ = NyzoStringEncoder.encode(tx)
-        # Send the tx
-        url = "{}/forwardTransaction?transaction={}&action=run".format(self.client, tx__)
-        res = get(url)
-        # print(res.text)
-        temp = self.fake_table_to_list(res.text)
+        sign = KeyUtil.sign_bytes(transaction.get_bytes(for_signing=True), key)
+        tx = NyzoStringTransaction(Transaction.type_standard, timestamp, micronyzos, recipient_raw,
+                                   previous_hash_height, previous_block_hash, sender, data_bytes, sign)
+        return NyzoStringEncoder.encode(tx), sign
+
+    def forward_url(self, tx__: str) -> str:
+        return "{}/forwardTransaction?transaction={}&action=run".format(self.client, tx__)
+
+    def forward_result(self, html: str, tx__: str) -> dict:
+        temp = self.fake_table_to_list(html)
         # print(temp)
         temp = temp[0]
         # Add tx to data
         temp["tx__"] = tx__
         return temp
 
+    def _batch_result(self, html: Union[str, Exception], tx__: str, signature: bytes) -> dict:
+        """forward_result of a batch entry, a failed request gives a not forwarded entry"""
+        if isinstance(html, Exception):
+            res = {"forwarded": "false", "error": str(html), "notice": [], "tx__": tx__}
+        else:
+            res = self.forward_result(html, tx__)
+        res["signature"] = signature.hex()
+        return res
+
+    def send_batch(self, entries: list, key_: str = "", frozen: dict=None) -> list:
+        """
+        Send Nyzo to many (recipient, amount, data) entries.
+        Entries go by chunks of BATCH_SIZE: each chunk is signed against a frozen edge snapshot - frozen for the
+        first one, a fresh one for the next - then forwarded concurrently on pool_size threads.
+        Returns the forward results in entry order, with the transaction "signature" as hex.
+        """
+        if key_ == "":
+            raise ValueError("Need a key_")
+
+        def forward(tx__: str) -> Union[str, Exception]:
+            try:
+                return self._get(self.forward_url(tx__))
+            except Exception as e:
+                return e
+
+        results = []
+        timestamp = 0
+        for start in range(0, len(entries), BATCH_SIZE):
+            if frozen is None or start:
+                frozen = self.get_frozen()
+            chunk = entries[start:start + BATCH_SIZE]
+            timestamp = max(timestamp, inclusion_timestamp())
+            signed = self.build_transactions(chunk, key_, frozen, timestamp)
+            timestamp += len(chunk)
+            htmls = self._get_executor().map(forward, [tx__ for tx__, _ in signed])
+            results.extend(self._batch_result(html, tx__, signature)
+                           for html, (tx__, signature) in zip(htmls, signed))
+        return results
+
+    async def async_send_batch(self, entries: list, key_: str = "", frozen: dict=None) -> list:
+        """send_batch, async version. Concurrent requests are bounded by pool_size."""
+        if key_ == "":
+            raise ValueError("Need a key_")
+        results = []
+        timestamp = 0
+        for start in range(0, len(entries), BATCH_SIZE):
+            if frozen is None or start:
+                frozen = await self.async_get_frozen()
+            chunk = entries[start:start + BATCH_SIZE]
+            timestamp = max(timestamp, inclusion_timestamp())
+            signed = self.build_transactions(chunk, key_, frozen, timestamp)
+            timestamp += len(chunk)
+            htmls = await asyncio.gather(*[self._async_get(self.forward_url(tx__)) for tx__, _ in signed],
+                                         return_exceptions=True)
+            results.extend(self._batch_result(html, tx__, signature)
+                           for html, (tx__, signature) in zip(htmls, signed))
+        return results
+
+    async def async_confirm_batch(self, results: list, pool: ConnectionPool=None, interval: float=BLOCK_TIME,
+                                  verbose=False, tracker: ConfirmationTracker=None,
+                                  timeout: float=CONFIRM_TIMEOUT) -> list:
+        """
+        Waits for the frozen edge to pass the highest "block height" of the forwarded results, then sets
+        "sent" and, once found, "height" on each result. Returns the results.
+        With a pool of verifiers, the frozen blocks of the whole batch are downloaded once and scanned for the
+        transaction signatures. Without, it falls back to one concurrent transactionSearch per transaction.
+        With a running tracker, the results are registered there instead, pool and interval are not used.
+        Results get "unconfirmed": True when their block is not frozen within timeout seconds, when it can not be
+        downloaded, or when the tracker fails to check it.
+        """
+        pending = [res for res in results if str(res.get("forwarded", "false")).lower() == "true"]
+        for res in results:
+            res["sent"] = False
+        if not pending:
+            return results
+        if tracker is not None:
+            futures = [tracker.track_result(res) for res in pending]
+            # Not cancelled on timeout: the futures belong to the tracker
+            await asyncio.wait(futures, timeout=timeout)
+            for res, future in zip(pending, futures):
+                if not future.done() or future.cancelled() or future.exception() is not None:
+                    res["unconfirmed"] = True
+                elif future.result() is not None:
+                    res["height"] = future.result()
+                    res["sent"] = True
+            return results
+        heights = [int(res['block height']) for res in pending]
+        end_height = max(heights)
+        follower = FrozenEdgeFollower(pool) if pool else None
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            try:
+                if follower:
+                    frozen = await follower.fetch_frozen_edge() or 0
+                else:
+                    frozen = int((await self.async_get_frozen()).get('height', 0))
+            except (OSError, RuntimeError, asyncio.TimeoutError) as e:
+                print(f"async_confirm_batch, exception {e}")
+                frozen = 0
+            if frozen >= end_height:
+                break
+            if loop.time() >= deadline:
+                # Not frozen in time, unknown either way. The blocks that are frozen are still checked.
+                for res, height in zip(pending, heights):
+                    if height > frozen:
+                        res["unconfirmed"] = True
+                pending = [res for res, height in zip(pending, heights) if height <= frozen]
+                if not pending:
+                    return results
+                heights = [int(res['block height']) for res in pending]
+                end_height = max(heights)
+                break
+            if verbose:
+                print(f"Waiting for frozen edge ({frozen}) to reach {end_height}")
+            await async_sleep(min(interval, deadline - loop.time()))
+        if follower:
+            by_signature = {bytes.fromhex(res["signature"]): res for res in pending}
+            scanned = min(heights) - 1
+            try:
+                async for block in BlockSync(pool, lazy=True).iter_blocks(min(heights), end_height):
+                    for transaction in block.iter_transactions():
+                        res = by_signature.get(bytes(transaction.get_signature()))
+                        if res is not None:
+                            res["height"] = block.get_height()
+                            res["sent"] = True
+                    scanned = block.get_height()
+            except RuntimeError as e:
+                print(f"async_confirm_batch, exception {e}")
+                # Not known either way: they may be in the blocks that failed
+                for res, height in zip(pending, heights):
+                    if height > scanned:
+                        res["unconfirmed"] = True
+        else:
+            found = await asyncio.gather(*[self.async_query_tx(res['tx__']) for res in pending])
+            for res, res_tx in zip(pending, found):
+                if int(res_tx.get("height", 0)) == int(res['block height']):
+                    res["height"] = int(res['block height'])
+                    res["sent"] = True
+        return results
+
+    async def async_safe_send_batch(self, entries: list, key_: str = "", pool: ConnectionPool=None, max_tries=5,
+                                    interval: float=BLOCK_TIME, verbose=False, tracker: ConfirmationTracker=None,
+                                    timeout: float=CONFIRM_TIMEOUT) -> list:
+        """
+        Send Nyzo to many (recipient, amount, data) entries, see async_send_batch and async_confirm_batch.
+        Returns only after the blocks are frozen: entries that were forwarded but did not make it are sent again,
+        up to max_tries. One async_safe_send like result per entry, in entry order.
+        Entries whose blocks could not be checked are not sent again: their result has "unconfirmed": True.
+        """
+        sent = [None] * len(entries)
+        todo = list(range(len(entries)))
+        attempt = 1
+        while todo and attempt <= max_tries:
+            if verbose:
+                print(f"Sending {len(todo)} transactions, try {attempt}")
+            results = await self.async_send_batch([entries[index] for index in todo], key_)
+            await self.async_confirm_batch(results, pool, interval, verbose, tracker, timeout)
+            retry = []
+            for index, res in zip(todo, results):
+                notice = res.get("notice", ("",))
+                may_not_be_approved = "may not be approved" in notice[0] if len(notice) else False
+                if res["sent"]:
+                    sent[index] = {"sent": True, "height": res["height"], "tx__": res['tx__'], "try": attempt}
+                elif res.get("unconfirmed"):
+                    sent[index] = {"sent": False, "unconfirmed": True, "tx__": res['tx__'], "try": attempt,
+                                   "error": "", "notice": "Forwarded, its frozen block could not be checked."}
+                elif str(res.get("forwarded", "false")).lower() == "false" or may_not_be_approved:
+                    sent[index] = {"sent": False, "try": attempt, "error": res.get("error", []), "notice": notice}
+                else:
+                    retry.append(index)
+            todo = retry
+            attempt += 1
+        for index in todo:
+            sent[index] = {"sent": False, "try": max_tries, "error": "",
+                           "notice": f"Forwarded but still not in chain after {max_tries} attempts."}
+        return sent
+
     def safe_send(self, recipient: str, amount: float = 0, data: str = "", key_: str = "", max_tries=5, verbose=False):
         """
         Send Nyzo with data string to a RECIPIENT.
@@ -202,18 +512,19 @@ class NyzoClient:
         return sent
 
     async def async_safe_send(self, recipient: str, amount: float = 0, data: str = "", key_: str = "",
-                              max_tries=5, verbose=False):
+                              max_tries=5, verbose=False, tracker: ConfirmationTracker=None,
+                              timeout: float=CONFIRM_TIMEOUT):
         """
         Send Nyzo with data string to a RECIPIENT.
         Returns only after block is frozen or max_tries
-        Async version
+        Async version. With a running tracker, waits on it instead of polling the frozen edge and querying the tx,
+        up to timeout seconds: past that, or if the tracker fails to check the block, the result is "unconfirmed".
         """
         attempt = 1
         while attempt <= max_tries:
             if verbose:
                 print(f"Sending, try {attempt}")
-            frozen = int(self.get_frozen().get('height', 0))
-            res = self.send(recipient, amount, data, key_)
+            res = await self.async_send(recipient, amount, data, key_)
             notice = res.get("notice", ("",))
             may_not_be_approved = "may not be approved" in notice[0] if len(notice) else False
             if str(res.get("forwarded", "false")).lower() == "false":
@@ -222,14 +533,24 @@ class NyzoClient:
                 error = res.get("error", [])
                 sent = {"sent": False, "try": max_tries, "error": error, "notice": notice}
                 return sent
-            # Was forwarded, wait for freeze.
-            while frozen < int(res['block height']):
-                if verbose:
-                    print(f"Waiting for frozen edge ({frozen}) to reach {res['block height']}")
-                await async_sleep(10)
-                frozen = int(self.get_frozen().get('height', 0))
-            print(f"Frozen edge is now {frozen}, querying tx")
-            res_tx = self.query_tx(res['tx__'])
+            if tracker is not None:
+                try:
+                    # shield: the tracker future may be shared, it is not cancelled on timeout
+                    height = await asyncio.wait_for(asyncio.shield(tracker.track_result(res)), timeout)
+                except (asyncio.TimeoutError, RuntimeError):
+                    return {"sent": False, "unconfirmed": True, "tx__": res['tx__'], "try": attempt, "error": "",
+                            "notice": "Forwarded, its frozen block could not be checked."}
+                res_tx = {"height": height} if height is not None else {}
+            else:
+                # Was forwarded, wait for freeze.
+                frozen = int((await self.async_get_frozen()).get('height', 0))
+                while frozen < int(res['block height']):
+                    if verbose:
+                        print(f"Waiting for frozen edge ({frozen}) to reach {res['block height']}")
+                    await async_sleep(10)
+                    frozen = int((await self.async_get_frozen()).get('height', 0))
+                print(f"Frozen edge is now {frozen}, querying tx")
+                res_tx = await self.async_query_tx(res['tx__'])
             if int(res_tx.get("height", 0)) == int(res['block height']):
                 # transaction was frozen, return
                 sent = {"sent": True, "height": int(res['block height']), "tx__": res['tx__'], "try": attempt}
@@ -248,7 +569,11 @@ class NyzoClient:
         Query for a given tx__ (nyzostring) on chain.
         """
         url = "{}/transactionSearch?string={}&action=run".format(self.client, tx_)
-        res = get(url)
-        temp = self.fake_table_to_list(res.text)
+        temp = self.fake_table_to_list(self._get(url))
         # print("temp", temp)
         return temp[0]
+
+    async def async_query_tx(self, tx_: str = ""):
+        """query_tx, async version"""
+        url = "{}/transactionSearch?string={}&action=run".format(self.client, tx_)
+        return self.fake_table_to_list(await self._async_get(url))[0]
@@ -0,0 +1,123 @@
+"""
+Parser for the html pages of the Nyzo web client.
+
+The client answers with header-row / data-row div tables, error and notice paragraphs, and label / value div
+pairs for the frozen edge. Rows are cut with a single str.split of the page, plain <div> cells with a split of
+the row; precompiled patterns only handle the header, the paragraphs, and cells with a class attribute.
+
+Typed fields: heights, indexes and timestamps as int, hashes as bytes, forwarded as bool.
+Values that do not parse are kept as strings.
+"""
+
+import re
+
+_DATA_ROW = '<div class="data-row">'
+_HEADER_ROW = re.compile(r'<div class="header-row">((?:<div(?: class="[^"]*")?>[^<]*</div>)*)</div>')
+# Inline markup in a paragraph is kept as is
+_PARAGRAPH = re.compile(r'<p class="(error|notice)">(.*?)</p>', re.DOTALL)
+_CELL = re.compile(r'<div(?: class="[^"]*")?>([^<]*)</div>')
+_FROZEN = re.compile(r'<div>(height|hash|verification timestamp \(ms\)|distance from open edge)</div>'
+                     r'<div(?: class="[^"]*")?>([^<]*)</div>')
+
+
+def _hash(value: str) -> bytes:
+    return bytes.fromhex(value.replace('-', ''))
+
+
+def _bool(value: str) -> bool:
+    value = value.strip()
+    if value not in ('true', 'false'):
+        raise ValueError(f"Not a boolean: {value}")
+    return value == 'true'
+
+
+FIELD_TYPES = {'height': int, 'block height': int, 'index': int, 'timestamp': int, 'distance': int,
+               'hash': _hash, 'forwarded': _bool}
+
+# Frozen edge page labels, and their key
+FROZEN_LABELS = {'height': 'height', 'hash': 'hash', 'verification timestamp (ms)': 'timestamp',
+                 'distance from open edge': 'distance'}
+
+
+def typed(key: str, value: str):
+    """Value of a field, converted according to FIELD_TYPES"""
+    convert = FIELD_TYPES.get(key)
+    if convert is None:
+        return value
+    try:
+        return convert(value)
+    except ValueError:
+        return value
+
+
+def _cells(row: str) -> list:
+    """Values of the cells of a row, "<div>a</div><div>b</div>" """
+    if row.startswith('<div>') and 'class=' not in row:
+        return row[5:-6].split('</div><div>')
+    return _CELL.findall(row)
+
+
+def tokenize(html: str) -> tuple:
+    """(headers, rows, errors, notices) of a page, rows as lists of cell values"""
+    parts = html.split(_DATA_ROW)
+    rows = []
+    for part in parts[1:]:
+        # A row ends with its last cell and its own closing div
+        end = part.find('</div></div>')
+        rows.append(_cells(part[:end + 6] if end >= 0 else part))
+    header = _HEADER_ROW.search(parts[0])
+    headers = _CELL.findall(header.group(1)) if header else []
+    errors, notices = [], []
+    for paragraph, text in _PARAGRAPH.findall(html):
+        (errors if paragraph == 'error' else notices).append(text)
+    return headers, rows, errors, notices
+
+
+def parse_table(html: str, typed_fields: bool=True) -> list:
+    """One dict per data row, header -> value, with the "notice" tuple and the "error" of the page if any.
+    A page without rows gives a single dict with "notice" and "error".
+    typed_fields=False keeps the NyzoClient.fake_table_to_list format: string values, first notice only."""
+    headers, rows, errors, notices = tokenize(html)
+    if typed_fields:
+        notice = tuple(notices)
+        columns = [(header, FIELD_TYPES[header]) for header in headers if header in FIELD_TYPES]
+    else:
+        notice = (notices[0], ) if notices else []
+        columns = ()
+    values = []
+    for row in rows:
+        temp = dict(zip(headers, row))
+        for column, convert in columns:
+            if column in temp:
+                try:
+                    temp[column] = convert(temp[column])
+                except ValueError:
+                    pass
+        if errors:
+            temp["error"] = errors[0]
+        temp["notice"] = notice
+        values.append(temp)
+    if not values:
+        values = [{"notice": notice}]
+        if errors:
+            values[0]["error"] = errors[0]
+    return values
+
+
+def parse_frozen(html: str, typed_fields: bool=True) -> dict:
+    """Frozen edge page as {"height", "hash", "timestamp", "distance"}.
+    typed_fields=False keeps the NyzoClient.fake_table_frozen_to_dict format: int height, strings otherwise.
+    Raises ValueError without a hash."""
+    values = {}
+    for label, value in _FROZEN.findall(html):
+        values.setdefault(FROZEN_LABELS[label], value)
+    if "hash" not in values:
+        raise ValueError("No frozen edge hash")
+    if typed_fields:
+        return {key: typed(key, values.get(key, '0')) for key in ("height", "hash", "timestamp", "distance")}
+    return {"height": int(values.get("height", 0)), "hash": values["hash"].replace('-', ''),
+            "timestamp": values.get("timestamp", 0), "distance": values.get("distance", 0)}
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
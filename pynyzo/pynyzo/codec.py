@@ -0,0 +1,83 @@
+"""
+Precompiled codecs for the fixed width wire fields.
+
+Every format is parsed once, here. Decoders read straight from the buffer with unpack_from(buffer, offset):
+no format string parsing and no intermediate slice per field. Composite fixed headers are read in one call.
+Transaction structs only hold numeric fields: unpacking a "32s" field copies it to bytes, transactions slice their
+identifiers and signatures from the buffer instead, so that LazyBlock transactions stay views on the block.
+Fields are big endian, as in the java ByteBuffer.
+Sizes are given after each format, see FieldByteSize.
+
+Tracing: with TRACE off - the default - decoders and encoders skip their debug records entirely, not even a
+level check is made in the hot loops. With TRACE on, records go through trace(): arguments are only formatted
+if the logger emits DEBUG, bytes fields are hex encoded at that time only.
+"""
+
+import logging
+from struct import Struct
+
+# Codec layer debug records, see trace(). Set from TRACE_CODEC in config.txt, or directly.
+TRACE = False
+
+# Single fields
+BYTE = Struct(">B")  # 1
+BOOLEAN = Struct(">?")  # 1
+SHORT = Struct(">h")  # 2
+UNSIGNED_SHORT = Struct(">H")  # 2
+INT = Struct(">I")  # 4
+LONG = Struct(">Q")  # 8
+
+# Message: timestamp, type
+MESSAGE_HEADER = Struct(">Qh")  # 10
+
+# Block: height (blockchain version in the upper 2 bytes), previous block hash, start timestamp,
+# verification timestamp, number of transactions
+BLOCK_HEADER = Struct(">Q32sQQI")  # 60
+# Block: balance list hash, verifier identifier, verifier signature
+BLOCK_FOOTER = Struct(">32s32s64s")  # 128
+
+# Transaction: type, timestamp
+TRANSACTION_HEADER = Struct(">BQ")  # 9
+# Transaction types 0 to 3: type, timestamp, amount. The receiver identifier follows.
+TRANSACTION_AMOUNT_HEADER = Struct(">BQQ")  # 17
+
+# Balance list: height (blockchain version in the upper 2 bytes), rollover fees
+BALANCE_LIST_HEADER = Struct(">QB")  # 9
+# Balance list item: identifier, balance, blocks until fee
+BALANCE_LIST_ITEM = Struct(">32sQH")  # 42
+# Balance list v1+: unlock threshold, unlock transfer sum
+BALANCE_LIST_UNLOCK = Struct(">QQ")  # 16
+
+# Approved cycle transaction: initiator identifier, receiver identifier, approval height, amount
+APPROVED_CYCLE_TRANSACTION = Struct(">32s32sQQ")  # 80
+
+# Block request: start height, end height, include balance list
+BLOCK_REQUEST = Struct(">QQ?")  # 17
+
+# Height field masks
+HEIGHT_MASK = 0x0000ffffffffffff
+VERSION_SHIFT = 6 * 8
+
+
+def split_height(height_field: int) -> tuple:
+    """(blockchain version, height) from a block or balance list height field"""
+    return height_field >> VERSION_SHIFT, height_field & HEIGHT_MASK
+
+
+class _Hex:
+    """bytes like value, hex encoded only when the log record is formatted"""
+
+    __slots__ = ('value', )
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self) -> str:
+        return bytes(self.value).hex()
+
+
+def trace(app_log, message: str, *args) -> None:
+    """Debug record with deferred %-style formatting. Call sites guard with `if codec.TRACE:`"""
+    if app_log.isEnabledFor(logging.DEBUG):
+        app_log.debug(message, *[_Hex(arg) if isinstance(arg, (bytes, bytearray, memoryview)) else arg
+                                 for arg in args])
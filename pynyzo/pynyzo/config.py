@@ -8,6 +8,8 @@ Also serves as config file for POC and tests
 from os import path
 from pynyzo.keyutil import KeyUtil
 from pynyzo.byteutil import ByteUtil
+from pynyzo.metrics import metrics
+from pynyzo import codec
 
 __version__ = '0.0.1'
 
@@ -32,6 +34,12 @@ LOG = []
 
 AVAILABLE_LOGS = ['keys', 'connections', 'timing']
 
+# Records latency, traffic and decode time metrics, see metrics.py
+METRICS = False
+
+# Dev only, debug records of every decoded and encoded object - slow, see codec.py
+TRACE_CODEC = False
+
 # Path to the privkey
 NYZO_SEED = "tmp/verifier_private_seed"
 
@@ -71,6 +79,8 @@ _VARS = {
     "VERBOSE": "bool",
     "DEBUG": "bool",
     "DUMP_PACKETS": "bool",
+    "METRICS": "bool",
+    "TRACE_CODEC": "bool",
     "LOG": "list",
     "NYZO_SEED": "str",
     "PYTHON_EXECUTABLE": "str",
@@ -131,6 +141,9 @@ def load(dir: str='./'):
         PRIVATE_KEY = KeyUtil.generateSeed()
         KeyUtil.save_to_private_seed_file(NYZO_SEED, PRIVATE_KEY)
     PRIVATE_KEY, PUBLIC_KEY = KeyUtil.get_from_private_seed_file(NYZO_SEED)
+    if METRICS:
+        metrics.enable()
+    codec.TRACE = TRACE_CODEC
     # We can tweak verbosity later on, do not print here but later on.
     if DEBUG:
         print(f"Key Loaded, public id {ByteUtil.bytes_as_string_with_dashes(PUBLIC_KEY.to_bytes())}")
@@ -0,0 +1,174 @@
+"""
+Confirmation tracker: resolves pending transactions as their blocks freeze.
+
+Transactions are registered by signature and target block height - the "block height" the web client answers
+on forward. A single FrozenEdgeFollower watches the frozen edge and downloads the new blocks. Only the blocks
+at a registered height have their transactions decoded and matched against the pending signatures.
+The number of requests depends on the block rate, not on the number of pending transactions.
+
+Each registration gets a future that resolves to the block height, or to None if the transaction is not in
+its target block once frozen. An optional callback(signature, height) gets the same result.
+A block registered after the follower went past it is downloaded on its own. If that fails, the futures of
+that block get the RuntimeError and their callbacks are not called.
+"""
+
+import asyncio
+
+from nyzostrings.nyzostringencoder import NyzoStringEncoder
+
+from pynyzo.connectionpool import ConnectionPool
+from pynyzo.frozenedgefollower import FrozenEdgeFollower
+from pynyzo.helpers import base_app_log
+
+
+class _Pending:
+    """A tracked transaction"""
+
+    __slots__ = ('future', 'callbacks')
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.callbacks = []
+
+
+class ConfirmationTracker:
+    """Tracks pending transactions over a ConnectionPool of verifiers, see module doc.
+    Start with `await tracker.start()`, or run `await tracker.run()` in a task."""
+
+    __slots__ = ('app_log', 'pool', 'follower', 'verbose', '_pending', '_by_height', '_task', '_backfills',
+                 'confirmed', 'missed', 'failed')
+
+    def __init__(self, pool: ConnectionPool, follower: FrozenEdgeFollower=None, verbose: bool=False,
+                 app_log: object=None, **follower_args):
+        """follower: the FrozenEdgeFollower to take blocks from, otherwise one is created with follower_args
+        (peers, quorum, block_time, min_interval, max_interval, timeout), lazy blocks."""
+        self.app_log = base_app_log(app_log)
+        self.pool = pool
+        self.verbose = verbose
+        if follower is None:
+            follower_args.setdefault('lazy', True)
+            follower = FrozenEdgeFollower(pool, verbose=verbose, app_log=self.app_log, **follower_args)
+        self.follower = follower
+        self._pending = {}  # signature -> _Pending
+        self._by_height = {}  # target height -> set of signatures
+        self._task = None
+        self._backfills = {}  # height -> task downloading that block
+        self.confirmed = 0
+        self.missed = 0
+        self.failed = 0
+
+    def get_pending(self) -> int:
+        """Number of transactions still waiting for their block"""
+        return len(self._pending)
+
+    def track(self, signature: bytes, height: int, callback=None) -> asyncio.Future:
+        """Future of the height the transaction with this signature is frozen in, None if it is not in block
+        height. callback(signature, height) - a function or a coroutine function - is called with the result.
+        Tracking an already pending signature returns the same future."""
+        signature = bytes(signature)
+        pending = self._pending.get(signature)
+        if pending is None:
+            pending = _Pending(asyncio.get_running_loop().create_future())
+            self._pending[signature] = pending
+            self._by_height.setdefault(height, set()).add(signature)
+            next_height = self.follower.get_next_height()
+            if self.follower.get_frozen_edge() is None:
+                # No poll yet: the follower starts from the lowest tracked block, it may be frozen already
+                if next_height is None or height < next_height:
+                    self.follower.set_next_height(height)
+            elif height < next_height and height not in self._backfills:
+                # The follower is past that block already, and it is frozen. One download per block, whatever
+                # the number of transactions registered at that height while it runs.
+                self._backfills[height] = asyncio.ensure_future(self._backfill(height))
+        if callback is not None:
+            pending.callbacks.append(callback)
+        return pending.future
+
+    def track_result(self, res: dict, callback=None) -> asyncio.Future:
+        """track() of a forwarded NyzoClient.send or send_batch result, from its "signature" or its "tx__" """
+        if "signature" in res:
+            signature = bytes.fromhex(res["signature"])
+        else:
+            # A standard transaction nyzostring ends with the signature
+            signature = NyzoStringEncoder.decode(res["tx__"]).get_bytes()[-64:]
+        return self.track(signature, int(res["block height"]), callback)
+
+    def _resolve(self, signature: bytes, height: int) -> None:
+        pending = self._pending.pop(signature)
+        if height is None:
+            self.missed += 1
+        else:
+            self.confirmed += 1
+        if not pending.future.done():
+            pending.future.set_result(height)
+        for callback in pending.callbacks:
+            try:
+                result = callback(signature, height)
+                if asyncio.iscoroutine(result):
+                    asyncio.ensure_future(result)
+            except Exception as e:
+                self.app_log.warning(f"ConfirmationTracker: callback failed, {e}")
+
+    def process_block(self, block) -> None:
+        """Resolves the transactions tracked at this block height. Block or LazyBlock."""
+        height = block.get_height()
+        signatures = self._by_height.pop(height, None)
+        if not signatures:
+            return
+        for transaction in block.get_transactions():
+            signature = bytes(transaction.get_signature())
+            if signature in signatures:
+                signatures.discard(signature)
+                self._resolve(signature, height)
+        for signature in signatures:
+            if self.verbose:
+                self.app_log.info(f"ConfirmationTracker: {signature.hex()[:16]} not in block {height}")
+            self._resolve(signature, None)
+
+    async def _backfill(self, height: int) -> None:
+        try:
+            async for block in self.follower.block_sync.iter_blocks(height, height):
+                # Registrations from now on are not in this block anymore, they need their own download
+                self._backfills.pop(height, None)
+                self.process_block(block)
+        except RuntimeError as e:
+            self.app_log.warning(f"ConfirmationTracker: block {height} failed, {e}")
+            for signature in self._by_height.pop(height, ()):
+                pending = self._pending.pop(signature)
+                self.failed += 1
+                if not pending.future.done():
+                    pending.future.set_exception(RuntimeError(f"ConfirmationTracker: block {height} failed, {e}"))
+        finally:
+            if self._backfills.get(height) is asyncio.current_task():
+                del self._backfills[height]
+
+    async def run(self) -> None:
+        """Follows the frozen edge and resolves the pending transactions, until stop()"""
+        await self.follower.run(self.process_block)
+
+    async def start(self) -> 'ConfirmationTracker':
+        """Runs the tracker in a task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+        return self
+
+    async def stop(self) -> None:
+        """Stops following the edge. Pending futures stay unresolved."""
+        self.follower.stop()
+        tasks = list(self._backfills.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.stop()
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
@@ -13,6 +13,7 @@ from pynyzo.helpers import base_app_log
 from pynyzo.message import Message
 from pynyzo.messagetype import MessageType
 from pynyzo.messageobject import MessageObject, EmptyMessageObject
+from pynyzo.metrics import metrics
 
 # Logical timeout
 LTIMEOUT = 45
@@ -67,6 +68,8 @@ class Connection(object):
             # TODO: handle tries #
             self.sdef = None
             if retry:
+                if metrics.enabled:
+                    metrics.count_reconnect(f"{self.ip}:{self.port}")
                 if self.verbose:
                     self.app_log.warning(f"Send failed ({e}), trying to reconnect")
                 self.check_connection()
@@ -155,8 +158,23 @@ class Connection(object):
         """From Message - fetch bin buffer"""
         # TODO
         # identifier = NodeManager.identifierForIpAddress(self.ip);
-        self.send(message.get_bytes_for_transmission())
-        response = self.receive()
+        data = message.get_bytes_for_transmission()
+        if not metrics.enabled:
+            self.send(data)
+            return self.receive()
+        start = metrics.clock()
+        try:
+            self.send(data)
+            response = self.receive()
+        except Exception:
+            metrics.count_error(message.get_type().name, f"{self.ip}:{self.port}")
+            raise
+        if not response:
+            # receive() timed out
+            metrics.count_error(message.get_type().name, f"{self.ip}:{self.port}")
+        else:
+            metrics.observe_request(message.get_type().name, f"{self.ip}:{self.port}", metrics.clock() - start,
+                                    len(data) + 4, len(response) + 4)
         return response
 
     def fetch(self, message: Message, identifier: bytes=b'') -> MessageObject:
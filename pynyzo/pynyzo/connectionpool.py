@@ -0,0 +1,161 @@
+"""
+Persistent connections to a set of verifiers, and fan-out queries over them.
+
+fan_out() sends the same message to many peers at once and returns as soon as a quorum answered,
+slow peers are cancelled. Responses are grouped by hash of their payload, so agreeing peers are easy to spot.
+"""
+
+import asyncio
+
+from pynyzo.asyncconnection import AsyncConnection, REQUEST_TIMEOUT
+from pynyzo.hashutil import HashUtil
+from pynyzo.helpers import base_app_log
+from pynyzo.message import Message
+from pynyzo.messagetype import MessageType
+from pynyzo.messageobject import MessageObject
+
+
+class FanOutResult:
+    """Responses of a fan_out() call. Peers are (ip, port) tuples.
+    Payload hash is a double sha256 of the message type and content, timestamp and signer excluded."""
+
+    __slots__ = ('quorum', 'buffers', 'errors', 'cancelled', 'groups', '_contents')
+
+    def __init__(self, quorum: int):
+        self.quorum = quorum
+        self.buffers = {}  # peer -> raw response buffer
+        self.errors = {}  # peer -> exception
+        self.cancelled = []  # peers that did not answer in time, or after the quorum
+        self.groups = {}  # payload hash -> list of peers, in answer order
+        self._contents = {}
+
+    @staticmethod
+    def payload_hash(buffer: bytes) -> bytes:
+        return HashUtil.double_sha256(memoryview(buffer)[8:-64 - 32])
+
+    def add(self, peer: tuple, buffer: bytes) -> None:
+        self.buffers[peer] = buffer
+        self.groups.setdefault(self.payload_hash(buffer), []).append(peer)
+
+    def get_number_of_responses(self) -> int:
+        return len(self.buffers)
+
+    def is_quorum_reached(self) -> bool:
+        return len(self.buffers) >= self.quorum
+
+    def get_groups(self) -> list:
+        """(payload hash, peers) tuples, largest group first"""
+        return sorted(self.groups.items(), key=lambda item: len(item[1]), reverse=True)
+
+    def get_content(self, payload_hash: bytes) -> MessageObject:
+        """Decoded content of a group, decoded once whatever the group size"""
+        if payload_hash not in self._contents:
+            buffer = self.buffers[self.groups[payload_hash][0]]
+            message_type = MessageType(int.from_bytes(buffer[8:10], 'big', signed=True))
+            self._contents[payload_hash] = Message.process_content(message_type, buffer)
+        return self._contents[payload_hash]
+
+    def get_majority(self) -> tuple:
+        """(content, peers) of the largest group, (None, []) without any response"""
+        if not self.groups:
+            return None, []
+        payload_hash, peers = self.get_groups()[0]
+        return self.get_content(payload_hash), peers
+
+    def to_string(self) -> str:
+        return f"[FanOutResult: {len(self.buffers)}/{self.quorum} responses, {len(self.groups)} groups, " \
+               f"{len(self.errors)} errors, {len(self.cancelled)} cancelled]"
+
+
+class ConnectionPool:
+    """AsyncConnection per peer, created on first use and kept open. Peers are "ip", "ip:port" or (ip, port)."""
+
+    __slots__ = ('app_log', 'port', 'timeout', 'pipeline_depth', 'verbose', '_connections')
+
+    def __init__(self, peers: list=None, port: int=9444, timeout: float=REQUEST_TIMEOUT, pipeline_depth: int=1,
+                 verbose: bool=False, app_log: object=None):
+        """port is the default one, for peers that do not give theirs."""
+        self.app_log = base_app_log(app_log)
+        self.port = port
+        self.timeout = timeout
+        self.pipeline_depth = pipeline_depth
+        self.verbose = verbose
+        self._connections = {}
+        for peer in peers if peers else []:
+            self.add_peer(peer)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def _peer(self, peer) -> tuple:
+        if isinstance(peer, tuple):
+            return peer
+        ip, _, port = peer.partition(':')
+        return ip, int(port) if port else self.port
+
+    def add_peer(self, peer) -> tuple:
+        peer = self._peer(peer)
+        if peer not in self._connections:
+            self._connections[peer] = AsyncConnection(peer[0], peer[1], timeout=self.timeout,
+                                                      pipeline_depth=self.pipeline_depth, verbose=self.verbose,
+                                                      app_log=self.app_log)
+        return peer
+
+    async def remove_peer(self, peer) -> None:
+        connection = self._connections.pop(self._peer(peer), None)
+        if connection:
+            await connection.close()
+
+    def get_peers(self) -> list:
+        return list(self._connections)
+
+    def get_connection(self, peer) -> AsyncConnection:
+        """Connection to a peer, the peer is added if needed"""
+        return self._connections[self.add_peer(peer)]
+
+    async def fetch_buffer(self, peer, message: Message, timeout: float=None) -> bytes:
+        return await self.get_connection(peer).fetch_buffer(message, timeout)
+
+    async def fetch(self, peer, message: Message, timeout: float=None) -> MessageObject:
+        return await self.get_connection(peer).fetch(message, timeout)
+
+    async def fan_out(self, message: Message, peers: list=None, quorum: int=None, timeout: float=None) \
+            -> FanOutResult:
+        """Sends message to peers - all the pool by default - concurrently.
+        Returns once quorum peers answered (all of them by default), or after timeout seconds for the whole
+        call, whichever comes first. Requests still running then are cancelled."""
+        peers = [self.add_peer(peer) for peer in peers] if peers else self.get_peers()
+        result = FanOutResult(quorum=len(peers) if quorum is None else min(quorum, len(peers)))
+        timeout = self.timeout if timeout is None else timeout
+        tasks = {asyncio.ensure_future(self._connections[peer].fetch_buffer(message, timeout)): peer
+                 for peer in peers}
+        pending = set(tasks)
+        deadline = asyncio.get_running_loop().time() + timeout
+        while pending and not result.is_quorum_reached():
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    result.add(tasks[task], task.result())
+                except Exception as e:
+                    result.errors[tasks[task]] = e
+        for task in pending:
+            task.cancel()
+            result.cancelled.append(tasks[task])
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        if self.verbose:
+            self.app_log.info(result.to_string())
+        return result
+
+    async def close(self) -> None:
+        await asyncio.gather(*[connection.close() for connection in self._connections.values()])
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
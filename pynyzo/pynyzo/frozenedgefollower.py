@@ -0,0 +1,174 @@
+"""
+Frozen edge follower: streams blocks as they freeze.
+
+Each poll sends a StatusRequest17 to the verifiers and reads their "frozen edge: <height>" line. Only the new
+heights are then fetched with BlockRequest11, through BlockSync, and handed out in height order.
+
+Polls follow the ~7 s block time: once the edge moved, the next poll is planned for when the next block is
+expected, from a moving average of the observed block interval. If it did not move yet, polls come back
+after min_interval, doubling up to max_interval: no busy polling, and little lag.
+"""
+
+import asyncio
+import re
+
+from pynyzo.blocksync import BlockSync
+from pynyzo.connectionpool import ConnectionPool
+from pynyzo.helpers import base_app_log
+from pynyzo.message import Message
+from pynyzo.messageobject import EmptyMessageObject
+from pynyzo.messagetype import MessageType
+
+# Nyzo block duration, seconds
+BLOCK_TIME = 7.0
+
+_FROZEN_EDGE_LINE = re.compile(r'^frozen edge:\s*(\d+)')
+
+
+def frozen_edge_from_lines(lines: list) -> int:
+    """Frozen edge height from StatusResponse lines, None if not reported"""
+    for line in lines:
+        match = _FROZEN_EDGE_LINE.match(line)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+class FrozenEdgeFollower:
+    """Follows the frozen edge of the pool verifiers, see module doc.
+    Iterate with `async for block in follower`, or hand blocks to a callback with run(callback)."""
+
+    __slots__ = ('app_log', 'pool', 'peers', 'quorum', 'block_time', 'min_interval', 'max_interval', 'timeout',
+                 'verbose', 'block_sync', '_next_height', '_frozen_edge', '_last_advance', '_misses', '_stopped',
+                 '_stop')
+
+    def __init__(self, pool: ConnectionPool, start_height: int=None, peers: list=None, quorum: int=1,
+                 block_time: float=BLOCK_TIME, min_interval: float=1.0, max_interval: float=30.0,
+                 timeout: float=None, lazy: bool=False, block_sync: BlockSync=None, verbose: bool=False,
+                 app_log: object=None):
+        """start_height: first height to hand out, to resume after a restart. None starts past the current edge.
+        quorum: the edge is the highest height at least quorum verifiers froze.
+        lazy: blocks are LazyBlock views, Block instances otherwise. Ignored if a block_sync is given."""
+        self.app_log = base_app_log(app_log)
+        self.pool = pool
+        self.peers = [pool.add_peer(peer) for peer in peers] if peers else None
+        self.quorum = quorum
+        self.block_time = block_time
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.timeout = timeout
+        self.verbose = verbose
+        self.block_sync = block_sync if block_sync else BlockSync(pool, peers=self.peers, lazy=lazy,
+                                                                  timeout=timeout, verbose=verbose,
+                                                                  app_log=self.app_log)
+        self._next_height = start_height
+        self._frozen_edge = None
+        self._last_advance = None  # loop time the edge was last seen moving
+        self._misses = 0  # polls without progress since then
+        self._stopped = False
+        self._stop = None  # wakes up the poll wait, created by iter_blocks in its loop
+
+    def get_next_height(self) -> int:
+        """Next height to be handed out - store it to resume later. None until the first poll without start."""
+        return self._next_height
+
+    def set_next_height(self, height: int) -> None:
+        """Next height to hand out, from the next poll on"""
+        self._next_height = height
+
+    def get_frozen_edge(self) -> int:
+        """Last known frozen edge, None before the first poll"""
+        return self._frozen_edge
+
+    async def fetch_frozen_edge(self) -> int:
+        """Polls the verifiers, returns the highest height at least quorum of them froze, None if unknown"""
+        message = Message(MessageType.StatusRequest17, EmptyMessageObject())
+        result = await self.pool.fan_out(message, peers=self.peers, timeout=self.timeout)
+        heights = []
+        for payload_hash, peers in result.get_groups():
+            height = frozen_edge_from_lines(result.get_content(payload_hash).get_lines())
+            if height is not None:
+                heights.extend([height] * len(peers))
+        if len(heights) < self.quorum:
+            if self.verbose:
+                self.app_log.warning(f"FrozenEdgeFollower: {len(heights)} edge(s) reported, quorum {self.quorum}")
+            return None
+        heights.sort(reverse=True)
+        return heights[self.quorum - 1]
+
+    def _update(self, edge: int, now: float) -> None:
+        """Block interval estimate from the edge progress"""
+        if edge is None or (self._frozen_edge is not None and edge <= self._frozen_edge):
+            self._misses += 1
+            return
+        if self._frozen_edge is not None and self._last_advance is not None:
+            interval = (now - self._last_advance) / (edge - self._frozen_edge)
+            # Moving average, bounded so a stall or a burst does not throw the schedule off
+            interval = max(self.block_time / 4, min(interval, self.block_time * 4))
+            self.block_time = 0.8 * self.block_time + 0.2 * interval
+        self._frozen_edge = edge
+        self._last_advance = now
+        self._misses = 0
+
+    def get_poll_delay(self, now: float) -> float:
+        """Seconds until the next poll"""
+        if self._last_advance is not None and not self._misses:
+            expected = self._last_advance + self.block_time - now
+            if expected > self.min_interval:
+                return min(expected, self.max_interval)
+        return min(self.max_interval, self.min_interval * 2 ** max(self._misses - 1, 0))
+
+    async def iter_blocks(self):
+        """Async generator of the new frozen blocks, in height order, until stop().
+        A stop() before the iteration starts ends it right away, without polling."""
+        loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        try:
+            while not self._stopped:
+                try:
+                    edge = await self.fetch_frozen_edge()
+                except (OSError, RuntimeError, asyncio.TimeoutError) as e:
+                    self.app_log.warning(f"FrozenEdgeFollower: poll failed, {e}")
+                    edge = None
+                self._update(edge, loop.time())
+                if edge is not None:
+                    if self._next_height is None:
+                        self._next_height = edge + 1
+                    if edge >= self._next_height:
+                        try:
+                            async for block in self.block_sync.iter_blocks(self._next_height, edge):
+                                self._next_height = block.get_height() + 1
+                                yield block
+                                if self._stopped:
+                                    return
+                        except RuntimeError as e:
+                            # Whatever was handed out stays done, the rest is asked again on next poll.
+                            self.app_log.warning(f"FrozenEdgeFollower: sync to {edge} failed, {e}")
+                try:
+                    await asyncio.wait_for(self._stop.wait(), self.get_poll_delay(loop.time()))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # A stop() ends one iteration, the next one starts afresh
+            self._stopped = False
+            self._stop = None
+
+    def __aiter__(self):
+        return self.iter_blocks()
+
+    async def run(self, callback) -> None:
+        """Calls callback(block) - a function or a coroutine function - for each new frozen block, until stop()"""
+        async for block in self.iter_blocks():
+            result = callback(block)
+            if asyncio.iscoroutine(result):
+                await result
+
+    def stop(self) -> None:
+        """Ends iter_blocks() and run() after the current block or poll, or the next one if none is running"""
+        self._stopped = True
+        if self._stop is not None:
+            self._stop.set()
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
@@ -0,0 +1,134 @@
+"""
+Frozen edge provider: one cached frozen edge, shared by every caller.
+
+The edge moves once per block, so it is kept for ttl seconds - the block time by default - and concurrent
+callers that miss the cache wait for a single request (single-flight) instead of sending their own.
+
+The edge comes from a Nyzo web client (NyzoClient) or from a verifier over a Connection: a StatusRequest17 gives
+the frozen edge height, then a BlockRequest11 of that block gives its hash and timestamp.
+Either way it is a NyzoClient.get_frozen like dict: {"height", "hash", "timestamp", "distance"}.
+"""
+
+import asyncio
+import threading
+from time import time
+
+from pynyzo.connection import Connection
+from pynyzo.frozenedgefollower import BLOCK_TIME, frozen_edge_from_lines
+from pynyzo.helpers import base_app_log
+from pynyzo.message import Message
+from pynyzo.messageobject import EmptyMessageObject
+from pynyzo.messagetype import MessageType
+from pynyzo.messages.blockrequest import BlockRequest
+from pynyzo.messages.blockresponse import BlockResponse
+from pynyzo.messages.statusresponse import StatusResponse
+
+
+class FrozenEdgeProvider:
+    """TTL cached, single-flight frozen edge, see module doc. Thread and asyncio safe.
+    A failed fetch is not cached: callers get an empty dict, and the next call tries again."""
+
+    __slots__ = ('app_log', 'client', 'connection', 'ttl', 'verbose', 'fetches', '_frozen', '_fetched_at',
+                 '_lock', '_future')
+
+    def __init__(self, client=None, connection: Connection=None, ttl: float=BLOCK_TIME, verbose: bool=False,
+                 app_log: object=None):
+        """client: a NyzoClient, or connection: a Connection to a verifier. One of them is required.
+        ttl: seconds a fetched edge is served from cache."""
+        if client is None and connection is None:
+            raise ValueError("FrozenEdgeProvider needs a client or a connection")
+        self.app_log = base_app_log(app_log)
+        self.client = client
+        self.connection = connection
+        self.ttl = ttl
+        self.verbose = verbose
+        self.fetches = 0  # Requests actually sent
+        self._frozen = {}
+        self._fetched_at = 0
+        self._lock = threading.Lock()
+        self._future = None  # Pending async fetch
+
+    def get_cached(self) -> dict:
+        """Cached edge if still fresh, None otherwise"""
+        if self._frozen and time() - self._fetched_at < self.ttl:
+            return self._frozen
+        return None
+
+    def invalidate(self) -> None:
+        """Next call fetches again"""
+        self._fetched_at = 0
+
+    def _store(self, frozen: dict, fetched_at: float) -> dict:
+        self.fetches += 1
+        if not frozen or not frozen.get("height"):
+            # Failed, or an unparsable page
+            return frozen
+        # A slower request must not overwrite a newer edge
+        if not self._frozen or frozen["height"] >= self._frozen["height"]:
+            self._frozen = frozen
+        self._fetched_at = fetched_at
+        return self._frozen
+
+    def _fetch_from_connection(self) -> dict:
+        """Frozen edge from the verifier: status, then the block for its hash"""
+        buffer = self.connection.fetch_buffer(Message(MessageType.StatusRequest17, EmptyMessageObject()))
+        if not buffer:
+            raise RuntimeError("FrozenEdgeProvider: no status response")
+        height = frozen_edge_from_lines(StatusResponse(buffer=buffer).get_lines())
+        if height is None:
+            raise RuntimeError("FrozenEdgeProvider: no frozen edge in status")
+        buffer = self.connection.fetch_buffer(Message(MessageType.BlockRequest11,
+                                                      BlockRequest(start_height=height, end_height=height)))
+        blocks = BlockResponse(buffer=buffer, lazy=True).get_blocks() if buffer else []
+        if not blocks or blocks[0].get_height() != height:
+            raise RuntimeError(f"FrozenEdgeProvider: no block {height}")
+        return {"height": height, "hash": blocks[0].get_hash().hex(),
+                "timestamp": str(blocks[0].get_verification_timestamp()), "distance": 0}
+
+    def _fetch(self) -> dict:
+        if self.client is not None:
+            return self.client.fetch_frozen()
+        try:
+            return self._fetch_from_connection()
+        except Exception as e:
+            self.app_log.warning(f"FrozenEdgeProvider: {e}")
+            return {}
+
+    def get_frozen(self) -> dict:
+        """Frozen edge, from cache if fresh. Concurrent threads share a single request."""
+        frozen = self.get_cached()
+        if frozen is not None:
+            return frozen
+        with self._lock:
+            # Another thread may have fetched it while we waited
+            frozen = self.get_cached()
+            if frozen is not None:
+                return frozen
+            if self.verbose:
+                self.app_log.info("FrozenEdgeProvider: fetching frozen edge")
+            fetched_at = time()
+            return self._store(self._fetch(), fetched_at)
+
+    async def _async_fetch(self) -> dict:
+        fetched_at = time()
+        if self.client is not None:
+            return self._store(await self.client.async_fetch_frozen(), fetched_at)
+        # The sync connection runs in a thread, under the same lock as sync callers
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_frozen)
+
+    async def async_get_frozen(self) -> dict:
+        """get_frozen, async version. Concurrent tasks share a single request."""
+        frozen = self.get_cached()
+        if frozen is not None:
+            return frozen
+        loop = asyncio.get_running_loop()
+        if self._future is None or self._future.done() or self._future.get_loop() is not loop:
+            if self.verbose:
+                self.app_log.info("FrozenEdgeProvider: fetching frozen edge")
+            self._future = asyncio.ensure_future(self._async_fetch())
+        # shield: a cancelled caller does not cancel the request the others wait for
+        return await asyncio.shield(self._future)
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
@@ -18,3 +18,11 @@ class HashUtil:
         if data is None:
             data = b''
         return sha256(data).digest()
+
+    @staticmethod
+    def double_sha256_chunks(chunks) -> bytes:
+        """double_sha256 of the concatenation of chunks, without building the concatenation"""
+        inner = sha256()
+        for chunk in chunks:
+            inner.update(chunk)
+        return sha256(inner.digest()).digest()
@@ -3,7 +3,7 @@ Helper Class and functions
 """
 
 import logging
-import struct
+from pynyzo import codec
 # Using tornado.log for pretty printing. async client could follow.
 import tornado.log
 from os import path
@@ -40,20 +40,20 @@ def tornado_logger():
 def strings_to_buffer(lines: list) -> bytes:
     """Diverges from Nyzo arch"""
     result = []
-    result.append(struct.pack(">B", len(lines)))  # byte
+    result.append(codec.BYTE.pack(len(lines)))  # byte
     for line in lines:
         bin = line.encode('utf-8')
-        result.append(struct.pack(">h", len(bin)))  # short
+        result.append(codec.SHORT.pack(len(bin)))  # short
         result.append(bin)
     return b''.join(result)
 
 
 def buffer_to_strings(b: memoryview) -> list:
-    number_of_lines = struct.unpack(">B", b[:1])[0]
+    number_of_lines = b[0]  # byte
     result = list()
     pos = 1
     for i in range(number_of_lines):
-        line_len = struct.unpack(">h", b[pos:pos + 2])[0]
+        line_len = codec.SHORT.unpack_from(b, pos)[0]  # short
         result.append(bytes(b[pos+2:pos+2+line_len]).decode('utf-8'))
         pos += line_len + 2
     return result
@@ -0,0 +1,282 @@
+"""
+Balance list with O(1) account lookup and incremental serialization, to track balances block after block.
+
+Items are kept in wire format in a single bytearray, sorted by identifier, with an identifier -> row map.
+Balance changes only re-pack the changed rows, so get_bytes / get_hash never re-serialize the whole list.
+"""
+
+from bisect import bisect_left
+import struct
+
+from pynyzo.messageobject import MessageObject
+from pynyzo.balancelist import BalanceList
+from pynyzo.balancelistitem import BalanceListItem
+from pynyzo.fieldbytesize import FieldByteSize
+from pynyzo.hashutil import HashUtil
+from pynyzo.transaction import Transaction
+
+
+class IndexedBalanceList(MessageObject):
+    """Mutable, indexed equivalent of BalanceList"""
+
+    row_size = FieldByteSize.identifier + FieldByteSize.transactionAmount + FieldByteSize.blocksUntilFee
+    _row_struct = struct.Struct(">QH")  # balance, blocks until fee - after the identifier
+
+    __slots__ = ('_block_height', '_blockchain_version', '_rollover_fees', '_previous_verifiers', '_identifiers',
+                 '_positions', '_rows', '_unlock_threshold', '_unlock_transfer_sum', '_cycle_transactions_bytes')
+
+    def __init__(self, block_height: int=0, rollover_fees: int=0, previous_verifiers: list=None, items: list=None,
+                 blockchain_version: int=0, unlock_threshold: int=0, unlock_transfer_sum: int=0,
+                 cycle_transactions_bytes: bytes=None, app_log=None):
+        """items is a list of BalanceListItem, sorted by identifier.
+        cycle_transactions_bytes is the serialized v2 tail (pending and approved cycle transactions), kept as is."""
+        super().__init__(app_log=app_log)
+        self._block_height = block_height
+        self._blockchain_version = blockchain_version
+        self._rollover_fees = rollover_fees
+        self._previous_verifiers = [bytes(verifier) for verifier in previous_verifiers] if previous_verifiers else []
+        self._unlock_threshold = unlock_threshold
+        self._unlock_transfer_sum = unlock_transfer_sum
+        if cycle_transactions_bytes is None:
+            cycle_transactions_bytes = struct.pack(">II", 0, 0) if blockchain_version > 1 else b''
+        self._cycle_transactions_bytes = cycle_transactions_bytes
+        items = items if items else []
+        self._identifiers = [bytes(item.get_identifier()) for item in items]
+        self._rows = bytearray(b''.join(bytes(item.get_identifier())
+                                        + self._row_struct.pack(item.get_balance(), item.get_blocks_until_fee())
+                                        for item in items))
+        self._positions = None
+
+    @classmethod
+    def from_balance_list(cls, balance_list: BalanceList, app_log=None) -> 'IndexedBalanceList':
+        """Indexed copy of a decoded BalanceList"""
+        indexed = cls(block_height=balance_list.get_block_height(), rollover_fees=balance_list.get_rollover_fees(),
+                      previous_verifiers=balance_list.get_previous_verifiers(),
+                      blockchain_version=balance_list.get_blockchain_version(),
+                      unlock_threshold=balance_list.get_unlock_threshold(),
+                      unlock_transfer_sum=balance_list.get_unlock_transfer_sum(), app_log=app_log)
+        if balance_list.get_blockchain_version() > 1:
+            pending = balance_list.get_pending_cycle_transactions()
+            approved = balance_list.get_recently_approved_cycle_transactions()
+            indexed._cycle_transactions_bytes = b''.join(
+                [struct.pack(">I", len(pending))] + [transaction.get_bytes() for transaction in pending]
+                + [struct.pack(">I", len(approved))] + [transaction.get_bytes() for transaction in approved])
+        try:
+            # numpy fast path, rows are already in wire format
+            rows = balance_list.get_pairs().tobytes()
+        except RuntimeError:
+            rows = b''.join(bytes(item.get_identifier())
+                            + cls._row_struct.pack(item.get_balance(), item.get_blocks_until_fee())
+                            for item in balance_list.get_items())
+        indexed._rows = bytearray(rows)
+        size = cls.row_size
+        indexed._identifiers = [rows[offset:offset + FieldByteSize.identifier]
+                                for offset in range(0, len(rows), size)]
+        return indexed
+
+    def _get_positions(self) -> dict:
+        """identifier -> row map, rebuilt only after an insertion or a removal"""
+        if self._positions is None:
+            self._positions = {identifier: position for position, identifier in enumerate(self._identifiers)}
+        return self._positions
+
+    def __len__(self) -> int:
+        return len(self._identifiers)
+
+    def __contains__(self, identifier: bytes) -> bool:
+        return bytes(identifier) in self._get_positions()
+
+    def get_block_height(self) -> int:
+        return self._block_height
+
+    def get_blockchain_version(self) -> int:
+        return self._blockchain_version
+
+    def get_rollover_fees(self) -> int:
+        return self._rollover_fees
+
+    def get_previous_verifiers(self) -> list:
+        return self._previous_verifiers.copy()
+
+    def set_block_height(self, block_height: int, rollover_fees: int=None, previous_verifiers: list=None) -> None:
+        """Header fields for the next block. Only the header is re-packed."""
+        self._block_height = block_height
+        if rollover_fees is not None:
+            self._rollover_fees = rollover_fees
+        if previous_verifiers is not None:
+            self._previous_verifiers = [bytes(verifier) for verifier in previous_verifiers]
+
+    def get_balance(self, identifier: bytes) -> int:
+        """Balance of an account, 0 if not in the list"""
+        position = self._get_positions().get(bytes(identifier))
+        if position is None:
+            return 0
+        return self._row_struct.unpack_from(self._rows, position * self.row_size + FieldByteSize.identifier)[0]
+
+    def get_item(self, identifier: bytes) -> BalanceListItem:
+        """BalanceListItem of an account, None if not in the list"""
+        identifier = bytes(identifier)
+        position = self._get_positions().get(identifier)
+        if position is None:
+            return None
+        balance, blocks_until_fee = self._row_struct.unpack_from(
+            self._rows, position * self.row_size + FieldByteSize.identifier)
+        return BalanceListItem(identifier, balance, blocks_until_fee)
+
+    def get_items(self) -> list:
+        return [BalanceListItem(identifier, *self._row_struct.unpack_from(
+                    self._rows, position * self.row_size + FieldByteSize.identifier))
+                for position, identifier in enumerate(self._identifiers)]
+
+    @staticmethod
+    def _default_blocks_until_fee(identifier: bytes) -> int:
+        # Same default as BalanceListItem
+        return 0 if identifier == BalanceListItem.transfer_identifier else 500
+
+    def set_balance(self, identifier: bytes, balance: int, blocks_until_fee: int=None) -> None:
+        """Sets an account balance. New accounts are inserted at their sorted position, empty ones are removed.
+        Each insertion or removal is O(n), use apply_delta for many accounts at once."""
+        identifier = bytes(identifier)
+        if balance < 0:
+            raise ValueError(f"Negative balance for {identifier.hex()}: {balance}")
+        position = self._get_positions().get(identifier)
+        if position is None:
+            if balance == 0:
+                return
+            if blocks_until_fee is None:
+                blocks_until_fee = self._default_blocks_until_fee(identifier)
+            position = bisect_left(self._identifiers, identifier)
+            offset = position * self.row_size
+            self._rows[offset:offset] = identifier + self._row_struct.pack(balance, blocks_until_fee)
+            self._identifiers.insert(position, identifier)
+            self._positions = None
+        elif balance == 0:
+            offset = position * self.row_size
+            del self._rows[offset:offset + self.row_size]
+            del self._identifiers[position]
+            self._positions = None
+        else:
+            offset = position * self.row_size + FieldByteSize.identifier
+            if blocks_until_fee is None:
+                blocks_until_fee = self._row_struct.unpack_from(self._rows, offset)[1]
+            self._row_struct.pack_into(self._rows, offset, balance, blocks_until_fee)
+
+    def apply_delta(self, deltas: dict) -> None:
+        """Adds signed amounts to balances, deltas maps identifier -> micronyzos.
+        Existing accounts are updated in place, new and emptied ones are merged in a single pass over the rows:
+        a block with many new accounts costs one rebuild, not one per account.
+        All or nothing: a delta that would make a balance negative raises ValueError before anything is written."""
+        positions = self._get_positions()
+        updates = {}  # row offset -> (balance, blocks until fee), of the accounts that keep a balance
+        changes = {}  # identifier -> balance, of the accounts to insert (> 0) or remove (0)
+        for identifier, delta in deltas.items():
+            if not delta:
+                continue
+            identifier = bytes(identifier)
+            position = positions.get(identifier)
+            if position is None:
+                balance = changes.get(identifier, 0) + delta
+                if balance < 0:
+                    raise ValueError(f"Negative balance for {identifier.hex()}: {balance}")
+                changes[identifier] = balance
+                continue
+            offset = position * self.row_size + FieldByteSize.identifier
+            balance, blocks_until_fee = updates[offset] if offset in updates \
+                else self._row_struct.unpack_from(self._rows, offset)
+            balance += delta
+            if balance < 0:
+                raise ValueError(f"Negative balance for {identifier.hex()}: {balance}")
+            updates[offset] = (balance, blocks_until_fee)
+        # Every delta is valid, now write
+        for offset, (balance, blocks_until_fee) in updates.items():
+            if balance:
+                self._row_struct.pack_into(self._rows, offset, balance, blocks_until_fee)
+            else:
+                changes[self._identifiers[(offset - FieldByteSize.identifier) // self.row_size]] = 0
+        changes = {identifier: balance for identifier, balance in changes.items()
+                   if balance or identifier in positions}
+        if changes:
+            self._merge(changes)
+
+    def _merge(self, changes: dict) -> None:
+        """Inserts the accounts with a balance and removes the others, in one pass"""
+        positions = self._get_positions()
+        size = self.row_size
+        # (row position, 0 insert before it / 1 remove it, identifier), in row order
+        events = sorted((positions[identifier], 1, identifier) if identifier in positions
+                        else (bisect_left(self._identifiers, identifier), 0, identifier)
+                        for identifier in changes)
+        rows, identifiers = [], []
+        start = 0
+        for position, removal, identifier in events:
+            rows.append(self._rows[start * size:position * size])
+            identifiers.extend(self._identifiers[start:position])
+            if removal:
+                start = position + 1
+            else:
+                rows.append(identifier + self._row_struct.pack(changes[identifier],
+                                                               self._default_blocks_until_fee(identifier)))
+                identifiers.append(identifier)
+                start = position
+        rows.append(self._rows[start * size:])
+        identifiers.extend(self._identifiers[start:])
+        self._rows = bytearray(b''.join(rows))
+        self._identifiers = identifiers
+        self._positions = None
+
+    @staticmethod
+    def transactions_delta(transactions) -> tuple:
+        """Balance changes of a block transactions, as (deltas, total fees).
+        Covers coin generation, seed and standard transactions. Fees are returned, not distributed:
+        verifier rewards, account fees and cycle transactions (paid from the cycle account when approved)
+        are left to the caller."""
+        deltas = {}
+        fees = 0
+        for transaction in transactions:
+            transaction_type = transaction.get_type()
+            if transaction_type == Transaction.type_coin_generation:
+                receiver = bytes(transaction.get_receiver_identifier())
+                deltas[receiver] = deltas.get(receiver, 0) + transaction.get_amount()
+            elif transaction_type in (Transaction.type_seed, Transaction.type_standard):
+                sender = bytes(transaction.get_sender_identifier())
+                receiver = bytes(transaction.get_receiver_identifier())
+                fee = transaction.get_fee()
+                deltas[sender] = deltas.get(sender, 0) - transaction.get_amount()
+                deltas[receiver] = deltas.get(receiver, 0) + transaction.get_amount() - fee
+                fees += fee
+        return deltas, fees
+
+    def apply_transactions(self, transactions) -> int:
+        """Applies a block transactions to the balances, returns the fees to distribute."""
+        deltas, fees = self.transactions_delta(transactions)
+        self.apply_delta(deltas)
+        return fees
+
+    def _get_chunks(self) -> list:
+        """Serialized segments, the item rows are never re-packed here."""
+        chunks = [struct.pack(">QB", (self._blockchain_version << (6 * 8)) | self._block_height,
+                              self._rollover_fees)]
+        chunks.extend(self._previous_verifiers)
+        chunks.append(struct.pack(">I", len(self._identifiers)))  # int, 4
+        chunks.append(self._rows)
+        if self._blockchain_version > 0:
+            chunks.append(struct.pack(">QQ", self._unlock_threshold, self._unlock_transfer_sum))
+        if self._blockchain_version > 1:
+            chunks.append(self._cycle_transactions_bytes)
+        return chunks
+
+    def get_byte_size(self) -> int:
+        return sum(len(chunk) for chunk in self._get_chunks())
+
+    def get_bytes(self) -> bytes:
+        return b''.join(self._get_chunks())
+
+    def get_hash(self) -> bytes:
+        return HashUtil.double_sha256_chunks(self._get_chunks())
+
+    def to_string(self) -> str:
+        return f"[IndexedBalanceList: height={self._block_height}, count={len(self._identifiers)} " \
+               f"hash={self.get_hash().hex()}]"
+
+    def to_json(self) -> str:
+        return BalanceList(buffer=self.get_bytes()).to_json()
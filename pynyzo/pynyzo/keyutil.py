@@ -12,7 +12,13 @@ https://github.com/n-y-z-o/nyzoVerifier/blob/17509f03a7f530c0431ce85377db9b35688
 
 import ed25519
 import hashlib
+from functools import lru_cache
 from pynyzo.byteutil import ByteUtil
+from pynyzo.signaturecache import SignatureCache, signature_cache
+
+
+# Parsed verifying keys kept in cache, by identifier. Same idea as SignatureUtil in the java verifier.
+VERIFYING_KEY_CACHE_SIZE = 10000
 
 
 class KeyUtil:
@@ -75,11 +81,30 @@ class KeyUtil:
         return sig
 
     @staticmethod
-    def signature_is_valid(signature: bytes, signed_bytes: bytes, public_id: bytes) -> bool:
-        verifying_key = ed25519.VerifyingKey(public_id)
-        # todo: cache key from id, see https://github.com/n-y-z-o/nyzoVerifier/blob/17509f03a7f530c0431ce85377db9b35688c078e/src/main/java/co/nyzo/verifier/util/SignatureUtil.java
+    @lru_cache(maxsize=VERIFYING_KEY_CACHE_SIZE)
+    def get_verifying_key(public_id: bytes) -> ed25519.VerifyingKey:
+        """Cached VerifyingKey from a 32 bytes identifier. public_id has to be bytes (hashable, and not pinning
+        the buffer a memoryview would come from)"""
+        return ed25519.VerifyingKey(public_id)
+
+    @staticmethod
+    def signature_is_valid(signature: bytes, signed_bytes: bytes, public_id: bytes, use_cache: bool=True) -> bool:
+        """use_cache: consult and feed the process wide signature_cache, see signaturecache.py"""
+        # see https://github.com/n-y-z-o/nyzoVerifier/blob/17509f03a7f530c0431ce85377db9b35688c078e/src/main/java/co/nyzo/verifier/util/SignatureUtil.java
+        if use_cache:
+            key = SignatureCache.make_key(public_id, signature, signed_bytes)
+            valid = signature_cache.get(key)
+            if valid is None:
+                valid = KeyUtil.signature_is_valid(signature, signed_bytes, public_id, use_cache=False)
+                signature_cache.put(key, valid)
+            return valid
+        try:
+            verifying_key = KeyUtil.get_verifying_key(bytes(public_id))
+        except ValueError:
+            # Not a valid identifier
+            return False
         try:
-            verifying_key.verify(signature, signed_bytes)
+            verifying_key.verify(bytes(signature), bytes(signed_bytes))
             # print("signature is good")
             return True
         except ed25519.BadSignatureError:
@@ -0,0 +1,149 @@
+"""
+Lazy, zero-copy view over a serialized block.
+
+Header fields are decoded on access, transactions are only indexed (offsets) until one is requested.
+Every bytes field is a memoryview slice of the original buffer, nothing is copied.
+"""
+
+from pynyzo.messageobject import MessageObject
+from pynyzo.fieldbytesize import FieldByteSize
+from pynyzo.transaction import Transaction
+from pynyzo.hashutil import HashUtil
+from pynyzo.keyutil import KeyUtil
+from pynyzo import codec
+
+import json
+
+
+class LazyBlock(MessageObject):
+    """Read only Block view, same accessors as Block but decodes on demand."""
+
+    # Fixed offsets of the block header fields
+    _previous_block_hash_offset = FieldByteSize.blockHeight
+    _start_timestamp_offset = _previous_block_hash_offset + FieldByteSize.hash
+    _verification_timestamp_offset = _start_timestamp_offset + FieldByteSize.timestamp
+    _number_of_transactions_offset = _verification_timestamp_offset + FieldByteSize.timestamp
+    _transactions_offset = _number_of_transactions_offset + 4
+
+    __slots__ = ('_buffer', '_transaction_offsets', '_balance_list_hash_offset')
+
+    def __init__(self, buffer: bytes, offset: int=0, app_log=None):
+        super().__init__(app_log=app_log)
+        if not isinstance(buffer, memoryview):
+            buffer = memoryview(buffer)
+        # The view may extend past the end of the block (whole file), exact bounds are known after indexing.
+        self._buffer = buffer[offset:] if offset else buffer
+        self._transaction_offsets = None
+        self._balance_list_hash_offset = None
+
+    def _index(self) -> None:
+        """Walks the transactions once to record their offsets, without decoding them."""
+        number_of_transactions = self.get_number_of_transactions()
+        balance_list_cycle_transaction = self.get_blockchain_version() > 1
+        offsets = []
+        offset = self._transactions_offset
+        for i in range(number_of_transactions):
+            offsets.append(offset)
+            offset += Transaction.byte_size_from_buffer(self._buffer, offset, balance_list_cycle_transaction)
+        self._transaction_offsets = tuple(offsets)
+        self._balance_list_hash_offset = offset
+
+    def get_height(self) -> int:
+        return codec.HEIGHT_MASK & codec.LONG.unpack_from(self._buffer, 0)[0]  # Long, 8
+
+    def get_blockchain_version(self) -> int:
+        return codec.UNSIGNED_SHORT.unpack_from(self._buffer, 0)[0]  # upper 2 bytes of the height field
+
+    def get_previous_block_hash(self) -> memoryview:
+        offset = self._previous_block_hash_offset
+        return self._buffer[offset:offset + FieldByteSize.hash]
+
+    def get_start_timestamp(self) -> int:
+        return codec.LONG.unpack_from(self._buffer, self._start_timestamp_offset)[0]  # Long, 8
+
+    def get_verification_timestamp(self) -> int:
+        return codec.LONG.unpack_from(self._buffer, self._verification_timestamp_offset)[0]  # Long, 8
+
+    def get_number_of_transactions(self) -> int:
+        return codec.INT.unpack_from(self._buffer, self._number_of_transactions_offset)[0]  # Int, 4
+
+    def get_transaction_offsets(self) -> tuple:
+        """Offsets of each transaction, relative to the start of the block"""
+        if self._transaction_offsets is None:
+            self._index()
+        return self._transaction_offsets
+
+    def get_transaction(self, index: int) -> Transaction:
+        """Decodes a single transaction"""
+        offset = self.get_transaction_offsets()[index]
+        return Transaction(buffer=self._buffer[offset:],
+                           balance_list_cycle_transaction=self.get_blockchain_version() > 1)
+
+    def iter_transactions(self):
+        """Decodes the transactions one at a time"""
+        for index in range(len(self.get_transaction_offsets())):
+            yield self.get_transaction(index)
+
+    def get_transactions(self) -> list:
+        return list(self.iter_transactions())
+
+    def get_balance_list_hash(self) -> memoryview:
+        if self._balance_list_hash_offset is None:
+            self._index()
+        offset = self._balance_list_hash_offset
+        return self._buffer[offset:offset + FieldByteSize.hash]
+
+    def get_verifier_identifier(self) -> memoryview:
+        if self._balance_list_hash_offset is None:
+            self._index()
+        offset = self._balance_list_hash_offset + FieldByteSize.hash
+        return self._buffer[offset:offset + FieldByteSize.identifier]
+
+    def get_verifier_signature(self) -> memoryview:
+        if self._balance_list_hash_offset is None:
+            self._index()
+        offset = self._balance_list_hash_offset + FieldByteSize.hash + FieldByteSize.identifier
+        return self._buffer[offset:offset + FieldByteSize.signature]
+
+    def get_byte_size(self, include_signature: bool=False) -> int:
+        if self._balance_list_hash_offset is None:
+            self._index()
+        size = self._balance_list_hash_offset + FieldByteSize.hash
+        if include_signature:
+            size += FieldByteSize.identifier + FieldByteSize.signature
+        return size
+
+    def get_buffer(self, include_signature: bool=True) -> memoryview:
+        """Exact view of the serialized block, no copy"""
+        return self._buffer[:self.get_byte_size(include_signature=include_signature)]
+
+    def get_bytes(self, include_signature: bool=False) -> bytes:
+        return bytes(self.get_buffer(include_signature=include_signature))
+
+    def write_into(self, buffer: bytearray, offset: int=0, include_signature: bool=False) -> int:
+        """Copies the serialized block into a preallocated buffer, returns the offset past its end."""
+        source = self.get_buffer(include_signature=include_signature)
+        buffer[offset:offset + len(source)] = source
+        return offset + len(source)
+
+    def signature_is_valid(self) -> bool:
+        """Verifier signature, over the block bytes without the signature"""
+        return KeyUtil.signature_is_valid(self.get_verifier_signature(), self.get_buffer(include_signature=False),
+                                          self.get_verifier_identifier())
+
+    def get_hash(self) -> bytes:
+        return HashUtil.double_sha256(self.get_verifier_signature())
+
+    def to_string(self) -> str:
+        return f"[Block: height={self.get_height()}, nb_tx={self.get_number_of_transactions()} " \
+               f"hash={self.get_hash().hex()}]"
+
+    def to_json(self) -> str:
+        transactions = [json.loads(tx.to_json()) for tx in self.iter_transactions()]
+        return json.dumps({"message_type": "Block", 'value': {
+            'height': self.get_height(), 'previous_block_hash': self.get_previous_block_hash().hex(),
+            'start_timestamp': self.get_start_timestamp(),
+            'verification_timestamp': self.get_verification_timestamp(),
+            'transactions': transactions, 'balance_list_hash': self.get_balance_list_hash().hex(),
+            'verifier_identifier': self.get_verifier_identifier().hex(),
+            'verifier_signature': self.get_verifier_signature().hex()}})
@@ -2,7 +2,7 @@
 Message ancestor class for Nyzo messages
 """
 
-import struct
+from pynyzo import codec
 from abc import ABC, abstractmethod
 from pynyzo.helpers import base_app_log
 from pynyzo.messagetype import MessageType
@@ -13,6 +13,7 @@ from pynyzo.byteutil import ByteUtil
 import pynyzo.config as config
 from pynyzo.messages.statusresponse import StatusResponse
 from pynyzo.messages.blockresponse import BlockResponse
+from pynyzo.metrics import metrics
 
 from time import time
 
@@ -23,8 +24,8 @@ class Message(ABC):
     """Abstract Ancestor for all messages."""
 
     # slots for private vars, to spare ram
-    __slots__ = ('_applog', '_timestamp', '_type', '_content', '_sourceNodeIdentifier', '_sourceNodeSignature',
-                 '_valid', '_source_ip_address')
+    __slots__ = ('app_log', '_timestamp', '_type', '_content', '_sourceNodeIdentifier', '_sourceNodeSignature',
+                 '_valid', '_sourceIpAddress')
 
     # Static class variables
     maximumMessageLength = 4194304  # 4MB
@@ -38,13 +39,15 @@ class Message(ABC):
 
     def __init__(self, a_type: MessageType, content: MessageObject, app_log:object=None,
                  sourceNodeIdentifier: bytes=None, sourceNodeSignature: bytes=None, source_ip_address: bytes=None,
-                 timestamp: int=0):
+                 timestamp: int=0, valid: bool=None):
         """This is the constructor for a new message originating from this system AND from the outside,
-        depending on the params."""
+        depending on the params.
+        valid: signature check result for messages from the outside, None if it was not checked."""
         self.app_log = base_app_log(app_log)
         self._type = a_type
         self._content = content
         self._valid = True
+        self._sourceIpAddress = source_ip_address
 
         if sourceNodeIdentifier is None:
             # From our system
@@ -61,12 +64,11 @@ class Message(ABC):
             self._timestamp = timestamp
             self._sourceNodeIdentifier = sourceNodeIdentifier
             self._sourceNodeSignature = sourceNodeSignature
-            self._sourceIpAddress = source_ip_address
-            # self._valid = KeyUtil.signature_is_valid(sourceNodeSignature, self.get_bytes_for_signing(),
-            # sourceNodeIdentifier)
-            self.valid = True
-            # TODO: needs all the chain of get_bytes to validate; let suppose for now it is valid.
-            if config.VERBOSE:
+            if valid is not None:
+                # Checked against the raw buffer, see from_bytes(verify=True)
+                self._valid = valid
+            elif config.VERBOSE:
+                # Unchecked, let suppose it is valid.
                 self.app_log.warning(f"TODO: Did NOT validate message from "
                                      f"{ByteUtil.bytes_as_string_with_dashes(sourceNodeIdentifier)} "
                                      f"of type {self._type.name}")
@@ -118,13 +120,14 @@ class Message(ABC):
         # buffer += struct.pack('I', size_bytes)  # 4 bytes
 
         # Add the data.
-        buffer += struct.pack('>Q', self._timestamp)   # unsigned long long, 8 bytes
-        self.app_log.debug(f"get bytes for message {self._type.name}, {self._type.value}")
-        buffer += struct.pack('>h', self._type.value)  # 2 bytes
+        if codec.TRACE:
+            codec.trace(self.app_log, "get bytes for message %s, %s", self._type.name, self._type.value)
+        buffer += codec.MESSAGE_HEADER.pack(self._timestamp, self._type.value)  # unsigned long long 8, short 2
         buffer += self._content.get_bytes()  # no need for test, see EmptyMessageObject
         buffer += self._sourceNodeIdentifier
         buffer += self._sourceNodeSignature
-        self.app_log.debug(f"buffer ({len(buffer)}): {buffer.hex()}")
+        if codec.TRACE:
+            codec.trace(self.app_log, "buffer (%s): %s", len(buffer), buffer)
         return buffer
 
     def get_bytes_for_signing(self) -> bytes:
@@ -139,21 +142,27 @@ class Message(ABC):
         # buffer += struct.pack('I', size_bytes)  # 4 bytes
 
         # Add the data.
-        buffer += struct.pack('>Q', self._timestamp)   # unsigned long long, 8 bytes
-        self.app_log.debug(f"get bytes for signing {self._type.name}, {self._type.value}")
-        buffer += struct.pack('>h', self._type.value)  # 2 bytes
+        if codec.TRACE:
+            codec.trace(self.app_log, "get bytes for signing %s, %s", self._type.name, self._type.value)
+        buffer += codec.MESSAGE_HEADER.pack(self._timestamp, self._type.value)  # unsigned long long 8, short 2
         buffer += self._content.get_bytes()  # no need for test, see EmptyMessageObject
         buffer += self._sourceNodeIdentifier
-        self.app_log.debug(f"buffer to sign ({len(buffer)}): {buffer.hex()}")
+        if codec.TRACE:
+            codec.trace(self.app_log, "buffer to sign (%s): %s", len(buffer), buffer)
         return buffer
 
     @staticmethod
-    def from_bytes(buffer: bytes, source_ip_address: bytes) -> any:
+    def signature_is_valid_from_bytes(buffer: bytes) -> bool:
+        """Checks a received message signature straight from its buffer: the signed bytes are the buffer minus
+        the trailing signature, no re-serialization of the content is needed."""
+        return KeyUtil.signature_is_valid(buffer[-64:], buffer[:-64], buffer[-64-32:-64])
+
+    @staticmethod
+    def from_bytes(buffer: bytes, source_ip_address: bytes, verify: bool=False) -> any:
         message = None
         message_type = None
 
-        timestamp = struct.unpack('>Q', buffer[:8])[0]
-        typeValue = struct.unpack('>h', buffer[8:10])[0]
+        timestamp, typeValue = codec.MESSAGE_HEADER.unpack_from(buffer, 0)
         message_type = MessageType(typeValue)
 
         content = Message.process_content(message_type, buffer)
@@ -164,16 +173,21 @@ class Message(ABC):
 
         # print("id", sourceNodeIdentifier.hex(), "sig", sourceNodeSignature.hex() )
 
+        valid = Message.signature_is_valid_from_bytes(buffer) if verify else None
+
         message = Message(timestamp=timestamp, a_type=message_type, content=content,
                           sourceNodeIdentifier=sourceNodeIdentifier, sourceNodeSignature=sourceNodeSignature,
-                          source_ip_address=source_ip_address)
+                          source_ip_address=source_ip_address, valid=valid)
         return message
 
     @staticmethod
     def process_content(message_type: MessageType, buffer: bytes) -> MessageObject:
+        start = metrics.clock() if metrics.enabled else 0
         content = EmptyMessageObject()
         if message_type == MessageType.StatusResponse18:
             content = StatusResponse(buffer=buffer)
         if message_type == MessageType.BlockResponse12:
             content = BlockResponse(buffer=buffer)
+        if start:
+            metrics.observe_decode(content.__class__.__name__, metrics.clock() - start)
         return content
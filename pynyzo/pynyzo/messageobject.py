@@ -27,6 +27,30 @@ class MessageObject(ABC):
         return json.dumps({"Error": "Not implemented"})
 
 
+class MessageRecord(ABC):
+    """Lightweight MessageObject, for the leaf objects decoded by the thousand - transactions, balance list items.
+    No app_log slot and no logger lookup per object: app_log is the logger resolved once, at import."""
+
+    __slots__ = ()
+
+    app_log = base_app_log()
+
+    @abstractmethod
+    def get_byte_size(self) -> int:
+        pass
+
+    @abstractmethod
+    def get_bytes(self) -> bytes:
+        pass
+
+    def to_json(self) -> str:
+        return json.dumps({"Error": "Not implemented"})
+
+
+# Records are MessageObjects for isinstance() and issubclass()
+MessageObject.register(MessageRecord)
+
+
 class EmptyMessageObject(MessageObject):
     """This one was added for convenience and avoid extra tests, not present in the java impl."""
 
@@ -4,8 +4,8 @@ from pynyzo.messageobject import MessageObject
 from pynyzo.helpers import base_app_log
 from pynyzo.messagetype import MessageType
 from pynyzo.fieldbytesize import FieldByteSize
+from pynyzo import codec
 import json
-import struct
 
 
 class BlockRequest(MessageObject):
@@ -18,14 +18,10 @@ class BlockRequest(MessageObject):
         """This replaces the various constructors from java, depending on the params"""
         super().__init__(app_log=app_log)
         if buffer:
-            offset = 10
             # buffer is the full buffer with timestamp and type, why the 10 offset.
-            self._start_height = struct.unpack(">Q", buffer[offset:offset +8])[0]  # Long, 8
-            offset += 8
-            self._end_height = struct.unpack(">Q", buffer[offset:offset +8])[0]
-            offset += 8
-            self._include_balance_list = struct.unpack("?", buffer[-1:])[0]
-            offset += 1
+            # Long, Long, boolean
+            self._start_height, self._end_height, self._include_balance_list = \
+                codec.BLOCK_REQUEST.unpack_from(buffer, 10)
         else:
             self._start_height = start_height
             self._end_height = end_height
@@ -44,14 +40,7 @@ class BlockRequest(MessageObject):
         return FieldByteSize.blockHeight * 2 + FieldByteSize.booleanField
 
     def get_bytes(self) -> bytes:
-        result = []
-        result.append(struct.pack(">Q", self._start_height))  # 8
-        result.append(struct.pack(">Q", self._end_height))  # 8
-        if self._include_balance_list:
-            result.append(b'\x01')
-        else:
-            result.append(b'\x00')
-        return b''.join(result)
+        return codec.BLOCK_REQUEST.pack(self._start_height, self._end_height, bool(self._include_balance_list))
 
     def to_string(self) -> str:
         return f"[BlockRequest({self._start_height}, {self._end_height}, {self._include_balance_list})]"
@@ -6,8 +6,9 @@ from pynyzo.messagetype import MessageType
 from pynyzo.fieldbytesize import FieldByteSize
 from pynyzo.balancelist import BalanceList
 from pynyzo.block import Block
+from pynyzo.lazyblock import LazyBlock
+from pynyzo import codec
 import json
-import struct
 
 
 class BlockResponse(MessageObject):
@@ -15,15 +16,17 @@ class BlockResponse(MessageObject):
 
     __slots__ = ('_initial_balance_list', '_blocks')
 
-    def __init__(self, start_height: int=0, end_height: int=0, include_balance_list: bool=False,
-                 buffer: bytes = None, app_log=None):
-        """This replaces the various constructors from java, depending on the params"""
+    def __init__(self, initial_balance_list: BalanceList=None, blocks: list=None,
+                 buffer: bytes = None, lazy: bool=False, app_log=None):
+        """This replaces the various constructors from java, depending on the params.
+        blocks may be Block or LazyBlock instances.
+        lazy: blocks are decoded as LazyBlock views over the buffer."""
         super().__init__(app_log=app_log)
         if buffer:
             # buffer is the full buffer with timestamp and type, why the 10 offset.
             self._initial_balance_list = None
             offset = 10
-            has_balance = struct.unpack("?", buffer[offset:offset +1])[0]
+            has_balance = codec.BOOLEAN.unpack_from(buffer, offset)[0]
             offset += 1
             if has_balance:
                 self._initial_balance_list = BalanceList(buffer=memoryview(buffer)[offset:])
@@ -31,18 +34,16 @@ class BlockResponse(MessageObject):
                 # self.app_log.error("TODO: BlockResponse initialBalanceList")
             self._blocks = []
 
-            number_of_blocks = struct.unpack(">H", buffer[offset:offset +2])[0]  # short = 2 bytes
+            number_of_blocks = codec.UNSIGNED_SHORT.unpack_from(buffer, offset)[0]  # short = 2 bytes
             offset += 2
-            print("number_of_blocks", number_of_blocks)
             mv = memoryview(buffer)
             for i in range(number_of_blocks):
-                block = Block(buffer=mv[offset:])
+                block = LazyBlock(mv, offset) if lazy else Block(buffer=mv[offset:])
                 offset += block.get_byte_size(include_signature=True)
                 self._blocks.append(block)
         else:
-            # This is for the node to fill TODO
-            self._initialBalanceList = None
-            self._blocks = []
+            self._initial_balance_list = initial_balance_list
+            self._blocks = blocks if blocks else []
 
     def get_initial_balance_list(self):
         return self._initial_balance_list
@@ -51,27 +52,29 @@ class BlockResponse(MessageObject):
         return self._blocks
 
     def get_byte_size(self) -> int:
-        byteSize = FieldByteSize.booleanField  # boolean value indicating whether a balance list is included
-        if self._initialBalanceList:
-            byteSize += self._initial_balance_list.getByteSize()
+        byte_size = FieldByteSize.booleanField  # boolean value indicating whether a balance list is included
+        if self._initial_balance_list:
+            byte_size += self._initial_balance_list.get_byte_size()
 
-        byteSize += FieldByteSize.frozenBlockListLength
+        byte_size += FieldByteSize.frozenBlockListLength
         for block in self._blocks:
-            byteSize += block.get_byte_size()
-        return byteSize
+            byte_size += block.get_byte_size(include_signature=True)
+        return byte_size
 
     def get_bytes(self) -> bytes:
-        result = b''
-        self.app_log.error("TODO: BlockResponse.get_bytes")
-        """
-        result += struct.pack(">Q", self._start_height)  # 8
-        result += struct.pack(">Q", self._end_height)  # 8
-        if self._include_balance_list:
-            result += b'\x01'
-        else:
-            result += b'\x00'
-        """
-        return result
+        buffer = bytearray(self.get_byte_size())
+        offset = 0
+        buffer[offset] = 1 if self._initial_balance_list else 0
+        offset += FieldByteSize.booleanField
+        if self._initial_balance_list:
+            offset = self._initial_balance_list.write_into(buffer, offset)
+        codec.UNSIGNED_SHORT.pack_into(buffer, offset, len(self._blocks))  # short = 2 bytes
+        offset += FieldByteSize.frozenBlockListLength
+        for block in self._blocks:
+            offset = block.write_into(buffer, offset, include_signature=True)
+        if offset != len(buffer):
+            raise ValueError(f"BlockResponse fields do not match its size: {self.to_string()}")
+        return bytes(buffer)
 
     def to_string(self) -> str:
         balance = True if self._initial_balance_list else False
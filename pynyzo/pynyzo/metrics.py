@@ -0,0 +1,183 @@
+"""
+Opt-in instrumentation of the hot paths.
+
+Records, per MessageType and per peer: request latency histograms, bytes in and out, errors and reconnects,
+plus decode time per object class. Disabled by default: every hook is guarded by a single attribute test
+`if metrics.enabled`, no clock is read and nothing is recorded until metrics.enable() - or METRICS in config.txt.
+
+snapshot() returns plain dicts, to_prometheus() the Prometheus text exposition format.
+"""
+
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+# Histogram upper bounds, seconds. Requests span LAN round trips to slow verifiers,
+# decodes span single transactions to full balance lists.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DECODE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                  0.1)
+
+
+class Histogram:
+    """Fixed buckets histogram, counts per bucket plus an overflow one"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: tuple=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q quantile, None if empty. inf past the last bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float('inf'), ), self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float('inf')
+
+    def to_dict(self) -> dict:
+        """Cumulative counts per upper bound, as Prometheus"""
+        buckets = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float('inf'), ), self.counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return {'buckets': buckets, 'count': self.count, 'sum': self.sum, 'p50': self.quantile(0.5),
+                'p99': self.quantile(0.99)}
+
+
+class _Traffic:
+    """Counters of one MessageType or one peer"""
+
+    __slots__ = ('latency', 'requests', 'errors', 'reconnects', 'bytes_out', 'bytes_in')
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.requests = 0
+        self.errors = 0
+        self.reconnects = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+    def to_dict(self) -> dict:
+        return {'requests': self.requests, 'errors': self.errors, 'reconnects': self.reconnects,
+                'bytes_out': self.bytes_out, 'bytes_in': self.bytes_in, 'latency': self.latency.to_dict()}
+
+
+class Metrics:
+    """Process wide counters, see module doc. Thread safe, usable from asyncio and thread pools alike."""
+
+    __slots__ = ('enabled', '_lock', '_message_types', '_peers', '_decode')
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._message_types = {}
+            self._peers = {}
+            self._decode = {}
+
+    @staticmethod
+    def clock() -> float:
+        return perf_counter()
+
+    def _traffic(self, registry: dict, key: str) -> _Traffic:
+        traffic = registry.get(key)
+        if traffic is None:
+            traffic = registry[key] = _Traffic()
+        return traffic
+
+    def observe_request(self, message_type: str, peer: str, seconds: float, bytes_out: int, bytes_in: int) -> None:
+        """A request/response round trip. message_type is the MessageType name, peer is 'ip:port'."""
+        with self._lock:
+            for traffic in (self._traffic(self._message_types, message_type), self._traffic(self._peers, peer)):
+                traffic.latency.observe(seconds)
+                traffic.requests += 1
+                traffic.bytes_out += bytes_out
+                traffic.bytes_in += bytes_in
+
+    def count_error(self, message_type: str, peer: str) -> None:
+        with self._lock:
+            self._traffic(self._message_types, message_type).errors += 1
+            self._traffic(self._peers, peer).errors += 1
+
+    def count_reconnect(self, peer: str) -> None:
+        with self._lock:
+            self._traffic(self._peers, peer).reconnects += 1
+
+    def observe_decode(self, class_name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._decode.get(class_name)
+            if histogram is None:
+                histogram = self._decode[class_name] = Histogram(DECODE_BUCKETS)
+            histogram.observe(seconds)
+
+    def snapshot(self) -> dict:
+        """{'message_types': {name: counters}, 'peers': {peer: counters}, 'decode': {class: histogram}}"""
+        with self._lock:
+            return {'enabled': self.enabled,
+                    'message_types': {key: traffic.to_dict() for key, traffic in self._message_types.items()},
+                    'peers': {key: traffic.to_dict() for key, traffic in self._peers.items()},
+                    'decode': {key: histogram.to_dict() for key, histogram in self._decode.items()}}
+
+    def to_prometheus(self, prefix: str='pynyzo') -> str:
+        """Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+
+        def histogram(name: str, help_text: str, label: str, histograms: dict) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for key, values in histograms.items():
+                for bound, count in values['buckets']:
+                    le = '+Inf' if bound == float('inf') else repr(float(bound))
+                    lines.append(f'{prefix}_{name}_bucket{{{label}="{key}",le="{le}"}} {count}')
+                lines.append(f'{prefix}_{name}_sum{{{label}="{key}"}} {values["sum"]!r}')
+                lines.append(f'{prefix}_{name}_count{{{label}="{key}"}} {values["count"]}')
+
+        def counter(name: str, help_text: str, label: str, registry: dict, field: str) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for key, values in registry.items():
+                lines.append(f'{prefix}_{name}{{{label}="{key}"}} {values[field]}')
+
+        for label, registry in (('message_type', snapshot['message_types']), ('peer', snapshot['peers'])):
+            scope = 'peer' if label == 'peer' else 'message_type'
+            histogram(f"{scope}_request_duration_seconds", f"Request round trip time, per {scope}", label,
+                      {key: values['latency'] for key, values in registry.items()})
+            counter(f"{scope}_sent_bytes_total", f"Bytes sent, per {scope}", label, registry, 'bytes_out')
+            counter(f"{scope}_received_bytes_total", f"Bytes received, per {scope}", label, registry, 'bytes_in')
+            counter(f"{scope}_errors_total", f"Failed requests, per {scope}", label, registry, 'errors')
+        counter("peer_reconnects_total", "Reconnections after a dropped socket, per peer", 'peer',
+                snapshot['peers'], 'reconnects')
+        histogram("decode_duration_seconds", "Decode time, per object class", 'class', snapshot['decode'])
+        return '\n'.join(lines) + '\n'
+
+
+# Process wide instance, the one the hooks feed
+metrics = Metrics()
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
@@ -0,0 +1,72 @@
+"""
+Bounded cache of signature verification results.
+
+The same blocks and transactions reach us from several peers, and overlapping block ranges get checked again.
+A result is keyed by signer identifier, signature and a sha256 digest of the signed bytes,
+so a hit never has to keep - nor compare - the signed data itself. Least recently used entries are evicted first.
+"""
+
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+
+
+# Default number of results kept, about 200 bytes each.
+SIGNATURE_CACHE_SIZE = 65536
+
+
+class SignatureCache:
+    """LRU cache of (signer, signature, digest of signed bytes) -> bool, with hit/miss/eviction counters.
+    Thread safe, the batch verifier may use it from its threads."""
+
+    __slots__ = ('max_size', 'hits', 'misses', 'evictions', '_results', '_lock')
+
+    def __init__(self, max_size: int=SIGNATURE_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._results = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def make_key(signer: bytes, signature: bytes, signed_bytes: bytes) -> bytes:
+        """signer, 32 + signature, 64 + sha256 of the signed bytes, 32"""
+        return b''.join((bytes(signer), bytes(signature), hashlib.sha256(signed_bytes).digest()))
+
+    def get(self, key: bytes) -> bool:
+        """Cached result for a make_key() key, None if unknown"""
+        with self._lock:
+            valid = self._results.get(key)
+            if valid is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._results.move_to_end(key)
+            return valid
+
+    def put(self, key: bytes, valid: bool) -> None:
+        with self._lock:
+            self._results[key] = valid
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drops the results and resets the counters"""
+        with self._lock:
+            self._results.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {'size': len(self._results), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'hit_ratio': self.hits / lookups if lookups else 0.0}
+
+
+# Process wide instance, used by KeyUtil.signature_is_valid and the SignatureVerifier.
+signature_cache = SignatureCache()
@@ -0,0 +1,164 @@
+"""
+Batch Ed25519 signature verification, for blocks, transactions and messages.
+
+Work items are (identifier, signed_bytes, signature) triples, verified in chunks on a pool.
+The backend is PyNaCl (libsodium) when installed: it releases the GIL, so a thread pool scales with the cores.
+Otherwise the python-ed25519 binding is used; it holds the GIL, so the chunks go to a process pool instead.
+Parsed verifying keys are cached by identifier in both cases, and results go through the signature cache:
+only the triples it does not know are sent to the pool.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import lru_cache
+from os import cpu_count
+
+from pynyzo.helpers import base_app_log
+from pynyzo.keyutil import KeyUtil, VERIFYING_KEY_CACHE_SIZE
+from pynyzo.signaturecache import SignatureCache, signature_cache
+from pynyzo.transaction import Transaction
+
+try:
+    from nacl.signing import VerifyKey
+    from nacl.exceptions import BadSignatureError
+except ImportError:  # pragma: no cover
+    VerifyKey = None
+
+
+@lru_cache(maxsize=VERIFYING_KEY_CACHE_SIZE)
+def _nacl_verifying_key(public_id: bytes):
+    return VerifyKey(public_id)
+
+
+def nacl_signature_is_valid(signature: bytes, signed_bytes: bytes, public_id: bytes) -> bool:
+    """Same as KeyUtil.signature_is_valid, libsodium backend"""
+    try:
+        _nacl_verifying_key(bytes(public_id)).verify(bytes(signed_bytes), bytes(signature))
+        return True
+    except (BadSignatureError, ValueError, TypeError):
+        return False
+
+
+def _verify_chunk(triples: list) -> list:
+    """Worker side. Module level so that it can be sent to a process pool.
+    The cache is checked by the caller, a worker process would only fill its own copy."""
+    if VerifyKey is not None:
+        return [nacl_signature_is_valid(signature, signed_bytes, identifier)
+                for identifier, signed_bytes, signature in triples]
+    return [KeyUtil.signature_is_valid(signature, signed_bytes, identifier, use_cache=False)
+            for identifier, signed_bytes, signature in triples]
+
+
+class SignatureVerifier:
+    """Verifies signatures in batches. Can be used as a context manager, the pool is closed on exit."""
+
+    __slots__ = ('app_log', 'max_workers', 'use_processes', 'chunk_size', 'cache', '_executor')
+
+    def __init__(self, max_workers: int=None, use_processes: bool=None, chunk_size: int=128,
+                 cache: SignatureCache=signature_cache, app_log: object=None):
+        """use_processes: None picks threads with a GIL releasing backend, processes otherwise.
+        cache: results cache, None to always verify."""
+        self.app_log = base_app_log(app_log)
+        self.cache = cache
+        self.max_workers = max_workers if max_workers else cpu_count() or 1
+        self.use_processes = VerifyKey is None if use_processes is None else use_processes
+        self.chunk_size = chunk_size
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        if self._executor:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def verify_batch(self, triples) -> list:
+        """(identifier, signed_bytes, signature) triples to a list of booleans, in the same order."""
+        # bytes copies: memoryviews can't be pickled, and must not pin mmapped buffers in the workers.
+        triples = [(bytes(identifier), bytes(signed_bytes), bytes(signature))
+                   for identifier, signed_bytes, signature in triples]
+        if self.cache is None:
+            return self._verify(triples)
+        keys = [SignatureCache.make_key(identifier, signature, signed_bytes)
+                for identifier, signed_bytes, signature in triples]
+        results = [self.cache.get(key) for key in keys]
+        missing = [index for index, valid in enumerate(results) if valid is None]
+        if missing:
+            for index, valid in zip(missing, self._verify([triples[index] for index in missing])):
+                results[index] = valid
+                self.cache.put(keys[index], valid)
+        return results
+
+    def _verify(self, triples: list) -> list:
+        if len(triples) <= self.chunk_size:
+            # Not worth a round trip to the pool
+            return _verify_chunk(triples)
+        chunks = [triples[i:i + self.chunk_size] for i in range(0, len(triples), self.chunk_size)]
+        result = []
+        for chunk_result in self._get_executor().map(_verify_chunk, chunks):
+            result.extend(chunk_result)
+        return result
+
+    @staticmethod
+    def transaction_triple(transaction: Transaction, previous_block_hash_for_height=None) -> tuple:
+        """Verification triple of a transaction, None for unsigned ones.
+        previous_block_hash_for_height(height) has to return the hash of the block at that height, signed types
+        include it in their signed bytes but not in their serialized form."""
+        transaction_type = transaction.get_type()
+        if transaction_type == Transaction.type_coin_generation:
+            return None
+        if transaction_type != Transaction.type_cycle_signature:
+            height = transaction.get_previous_hash_height()
+            previous_block_hash = previous_block_hash_for_height(height) if previous_block_hash_for_height else None
+            if previous_block_hash is None:
+                raise ValueError(f"Previous block hash unknown for height {height}")
+            transaction.set_previous_block_hash(previous_block_hash)
+        return (transaction.get_sender_identifier(), transaction.get_bytes(for_signing=True),
+                transaction.get_signature())
+
+    @staticmethod
+    def block_triples(block, previous_block_hash_for_height=None, include_transactions: bool=True) -> list:
+        """Verifier signature triple of a block (Block or LazyBlock), then one per signed transaction"""
+        triples = [(block.get_verifier_identifier(), block.get_bytes(include_signature=False),
+                    block.get_verifier_signature())]
+        if include_transactions:
+            for transaction in block.get_transactions():
+                triple = SignatureVerifier.transaction_triple(transaction, previous_block_hash_for_height)
+                if triple:
+                    triples.append(triple)
+        return triples
+
+    def verify_block(self, block, previous_block_hash_for_height=None, include_transactions: bool=True) -> bool:
+        """True if the block verifier signature and all its transactions signatures are valid."""
+        return all(self.verify_batch(self.block_triples(block, previous_block_hash_for_height,
+                                                         include_transactions)))
+
+    def verify_blocks(self, blocks, previous_block_hash_for_height=None, include_transactions: bool=True) -> list:
+        """One boolean per block, all signatures of all blocks verified as a single batch."""
+        triples = []
+        bounds = []
+        for block in blocks:
+            start = len(triples)
+            triples.extend(self.block_triples(block, previous_block_hash_for_height, include_transactions))
+            bounds.append((start, len(triples)))
+        results = self.verify_batch(triples)
+        return [all(results[start:end]) for start, end in bounds]
+
+    def verify_messages(self, buffers) -> list:
+        """One boolean per received message buffer (as passed to Message.from_bytes)"""
+        return self.verify_batch((buffer[-64 - 32:-64], buffer[:-64], buffer[-64:]) for buffer in buffers)
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
@@ -1,13 +1,14 @@
 
 from pynyzo.hashutil import HashUtil
-from pynyzo.messageobject import MessageObject
+from pynyzo.messageobject import MessageRecord
 from pynyzo.fieldbytesize import FieldByteSize
+from pynyzo.keyutil import KeyUtil
+from pynyzo import codec
 import json
-import struct
 
 
-class Transaction(MessageObject):
-    """Transaction message"""
+class Transaction(MessageRecord):
+    """Transaction message. app_log is ignored, kept for compatibility: records share the module logger."""
 
     nyzos_in_system = 100000000
     micronyzo_multiplier_ratio = 1000000
@@ -40,7 +41,6 @@ class Transaction(MessageObject):
     def __init__(self, buffer: bytes=None, type: int=0, timestamp: int=0, amount: int=0,
                  receiver_identifier: bytes=None, previous_hash_height: int=0, previous_block_hash: bytes=None,
                  sender_identifier: bytes=None, sender_data: bytes=None, signature: bytes=None, cycle_transaction_vote: int=0, cycle_transaction_signature: bytes=None, balance_list_cycle_transaction: bool=False, app_log=None):
-        super().__init__(app_log=app_log)
         if buffer is None:
             self._type = type
             self._timestamp = timestamp
@@ -57,45 +57,45 @@ class Transaction(MessageObject):
             # fromByteBuffer constructor
             # These are the fields contained in all transactions.
             offset = 0
-            self._type = struct.unpack(">B", buffer[offset:offset +1])[0]  # Byte
-            offset += 1
-            self._timestamp = struct.unpack(">Q", buffer[offset:offset +8])[0]  # Long, 8
-            offset += 8
+            self._type = buffer[offset]  # Byte
 
             if self._type == self.type_coin_generation:
-                # self.app_log.error("TODO: Transaction.type_coin_generation")
+                _, self._timestamp, self._amount = codec.TRANSACTION_AMOUNT_HEADER.unpack_from(buffer, offset)
+                offset += codec.TRANSACTION_AMOUNT_HEADER.size
+                self._receiver_identifier = buffer[offset:offset + FieldByteSize.identifier]
+                offset += FieldByteSize.identifier
                 self._previous_hash_height = -1
                 self._previous_block_hash = b''
                 self._sender_identifier = b''
                 self._sender_data = b''
                 self._signature = b''
             elif self._type in [self.type_seed, self.type_standard, self.type_cycle]:
-                self._amount = struct.unpack(">Q", buffer[offset:offset + 8])[0]  # Long, 8
-                offset += 8
+                _, self._timestamp, self._amount = codec.TRANSACTION_AMOUNT_HEADER.unpack_from(buffer, offset)
+                offset += codec.TRANSACTION_AMOUNT_HEADER.size
                 self._receiver_identifier = buffer[offset:offset + FieldByteSize.identifier]
                 offset += FieldByteSize.identifier
-                self.app_log.debug(f"TX( {self._type}, {self._timestamp}, {self._amount}, "
-                                   f"{self._receiver_identifier.hex()}")
-                self._previous_hash_height = 0x0000ffffffffffff & struct.unpack(">Q", buffer[offset:offset + 8])[0]  # Long, 8
-                offset += 8
+                if codec.TRACE:
+                    codec.trace(self.app_log, "TX( %s, %s, %s, %s", self._type, self._timestamp, self._amount,
+                                self._receiver_identifier)
+                self._previous_hash_height = codec.HEIGHT_MASK & codec.LONG.unpack_from(buffer, offset)[0]  # Long, 8
+                offset += FieldByteSize.blockHeight
                 self._previous_block_hash = b''  # TODO: get from BlockManager
                 self._sender_identifier = buffer[offset:offset + FieldByteSize.identifier]
                 offset += FieldByteSize.identifier
-                sender_data_length = min(32, struct.unpack(">B", buffer[offset:offset +1])[0])  # Byte
+                sender_data_length = min(32, buffer[offset])  # Byte
                 offset += 1
                 self._sender_data = buffer[offset:offset + sender_data_length]  # TODO: memoryview?
                 offset += sender_data_length
                 self._signature = buffer[offset:offset + FieldByteSize.signature]
                 offset += FieldByteSize.signature
-                self.app_log.debug(f"TX( {self._previous_hash_height}, {self._sender_identifier.hex()}, "
-                                   f"{sender_data_length}, {self._signature.hex()}")
-                # print("offset", offset)
+                if codec.TRACE:
+                    codec.trace(self.app_log, "TX( %s, %s, %s, %s", self._previous_hash_height,
+                                self._sender_identifier, sender_data_length, self._signature)
                 if self._type == self.type_cycle:
                     self._cycle_signatures = []
                     self._cycle_signature_transactions = []
-                    number_of_cycle_signatures = struct.unpack(">I", buffer[offset:offset +4])[0]  # Int, 4
-                    offset += 4
-                    # print("number_of_cycle_signatures", number_of_cycle_signatures)
+                    number_of_cycle_signatures = codec.INT.unpack_from(buffer, offset)[0]  # Int, 4
+                    offset += FieldByteSize.unnamedInteger
 
                     if not balance_list_cycle_transaction:
                         for i in range(number_of_cycle_signatures):
@@ -103,29 +103,26 @@ class Transaction(MessageObject):
                             offset += FieldByteSize.identifier
                             cycle_signature = buffer[offset:offset + FieldByteSize.signature]
                             offset += FieldByteSize.signature
-
                             if identifier != self._sender_identifier:
                                 self._cycle_signatures.append((identifier, cycle_signature))
 
-
                     else:
                         # When the explicitly marked as a balance list cycle transaction, read the additional fields for
                         # cycle transaction signatures.
-
                         for i in range(number_of_cycle_signatures):
-                            child_timestamp = struct.unpack(">Q", buffer[offset:offset +8])[0]  # Long, 8
-                            offset += 8
-
+                            child_timestamp = codec.LONG.unpack_from(buffer, offset)[0]  # Long, 8
+                            offset += FieldByteSize.timestamp
                             child_sender_identifier = buffer[offset:offset + FieldByteSize.identifier]
                             offset += FieldByteSize.identifier
-
-                            child_cycle_transaction_vote = 1 if struct.unpack(">B", buffer[offset:offset +1])[0] == 1 else 0
-                            offset += 1
-                            child_signature =buffer[offset:offset + FieldByteSize.signature]
+                            child_cycle_transaction_vote = 1 if buffer[offset] == 1 else 0  # Byte
+                            offset += FieldByteSize.booleanField
+                            child_signature = buffer[offset:offset + FieldByteSize.signature]
                             offset += FieldByteSize.signature
-                            self._cycle_signature_transactions.append((child_sender_identifier, Transaction(timestamp=child_timestamp, sender_identifier=child_sender_identifier, sender_data=bytes(self._signature) + b':' + bytes(child_cycle_transaction_vote), signature=child_signature, balance_list_cycle_transaction=balance_list_cycle_transaction)))
+                            self._cycle_signature_transactions.append((child_sender_identifier, Transaction.from_vote_data(child_timestamp, child_sender_identifier, child_cycle_transaction_vote, self._signature, child_signature)))
 
             elif self._type == self.type_cycle_signature:
+                self._timestamp = codec.TRANSACTION_HEADER.unpack_from(buffer, offset)[1]
+                offset += codec.TRANSACTION_HEADER.size
                 self._amount = 0
                 self._receiver_identifier = b'\0'
                 self._previous_hash_height = 0
@@ -133,14 +130,11 @@ class Transaction(MessageObject):
                 self._sender_data = b''
                 self._sender_identifier = buffer[offset:offset + FieldByteSize.identifier]
                 offset += FieldByteSize.identifier
-                self._cycle_transaction_vote = 1 if struct.unpack(">B", buffer[offset:offset +1])[0] == 1 else 0
-                offset += 1
-                #print("tx cycle sign",bytes(self._sender_identifier).hex(), self._cycle_transaction_vote)
+                self._cycle_transaction_vote = 1 if buffer[offset] == 1 else 0  # Byte
+                offset += FieldByteSize.booleanField
                 self._cycle_transaction_signature = buffer[offset:offset + FieldByteSize.signature]
                 offset += FieldByteSize.signature
-                #print("cycle sign",bytes(self._cycle_transaction_signature).hex())
                 self._signature = buffer[offset:offset + FieldByteSize.signature]
-                #print("sign",bytes(self._signature).hex())
                 offset += FieldByteSize.signature
             else:
                 self.app_log.warning(f"Unknown Transaction type: {self._type}")
@@ -170,6 +164,20 @@ class Transaction(MessageObject):
     def get_signature(self):
         return self._signature
 
+    def get_previous_hash_height(self):
+        return self._previous_hash_height
+
+    def set_previous_block_hash(self, previous_block_hash: bytes) -> None:
+        """The hash of the block at previous_hash_height is part of the signed bytes but not of the serialized
+        transaction, it has to be provided before checking the signature of a decoded transaction."""
+        self._previous_block_hash = previous_block_hash
+
+    def signature_is_valid(self) -> bool:
+        if self._type == self.type_coin_generation:
+            # Not signed
+            return True
+        return KeyUtil.signature_is_valid(self._signature, self.get_bytes(for_signing=True), self._sender_identifier)
+
     def get_cycle_transaction_vote(self):
         return self._cycle_transaction_vote
 
@@ -179,7 +187,7 @@ class Transaction(MessageObject):
     def get_fee(self):
         if self._type in [self.type_cycle, self.type_cycle_signature]:
             return 0
-        return (self.get_amount() + 399) / 400
+        return (self.get_amount() + 399) // 400
 
     def get_byte_size(self, for_signing:bool=False):
 
@@ -203,7 +211,7 @@ class Transaction(MessageObject):
                 size += FieldByteSize.hash  # sender data hash for signing
             else:
                 size += 1 + len(self._sender_data) + FieldByteSize.signature  # length specifier + sender data + transaction signature
-            if self._type == self.type_cycle:
+            if self._type == self.type_cycle and not for_signing:
                 # These are stored differently in the v1 and v2 blockchains. The cycleSignatures field is used for
                 # the v1 blockchain, and the cycleSignatureTransactions field is used for the v2 blockchain.
                 if self._cycle_signatures:
@@ -218,60 +226,116 @@ class Transaction(MessageObject):
 
         return size
 
-    def get_bytes(self, for_signing: bool=False):
-        result = list()
-        result.append(struct.pack(">B", self._type))  # byte
-        result.append(struct.pack(">Q", self._timestamp))  # Long
+    @classmethod
+    def byte_size_from_buffer(cls, buffer: memoryview, offset: int=0,
+                              balance_list_cycle_transaction: bool=False) -> int:
+        """Size of the serialized transaction starting at offset, without decoding it.
+        Only reads the type and the length fields, used to index or skip transactions."""
+        tx_type = buffer[offset]
+        size = FieldByteSize.transactionType + FieldByteSize.timestamp
+        if tx_type == cls.type_coin_generation:
+            size += FieldByteSize.transactionAmount + FieldByteSize.identifier
+        elif tx_type in (cls.type_seed, cls.type_standard, cls.type_cycle):
+            size += FieldByteSize.transactionAmount + FieldByteSize.identifier + FieldByteSize.blockHeight \
+                    + FieldByteSize.identifier
+            sender_data_length = min(32, buffer[offset + size])  # Byte
+            size += 1 + sender_data_length + FieldByteSize.signature
+            if tx_type == cls.type_cycle:
+                number_of_cycle_signatures = codec.INT.unpack_from(buffer, offset + size)[0]  # Int, 4
+                size += FieldByteSize.unnamedInteger
+                if balance_list_cycle_transaction:
+                    size += number_of_cycle_signatures * (FieldByteSize.timestamp + FieldByteSize.identifier
+                                                          + FieldByteSize.booleanField + FieldByteSize.signature)
+                else:
+                    size += number_of_cycle_signatures * (FieldByteSize.identifier + FieldByteSize.signature)
+        elif tx_type == cls.type_cycle_signature:
+            size += FieldByteSize.identifier + FieldByteSize.booleanField + FieldByteSize.signature \
+                    + FieldByteSize.signature
+        else:
+            raise ValueError(f"Unknown Transaction type: {tx_type}")
+        return size
+
+    def get_bytes(self, for_signing: bool=False) -> bytes:
+        buffer = bytearray(self.get_byte_size(for_signing=for_signing))
+        if self.write_into(buffer, 0, for_signing=for_signing) != len(buffer):
+            raise ValueError(f"Transaction fields do not match its size: {self.to_json()}")
+        return bytes(buffer)
+
+    def write_into(self, buffer: bytearray, offset: int=0, for_signing: bool=False) -> int:
+        """Serializes the transaction into a preallocated buffer, returns the offset past its end."""
+        codec.TRANSACTION_HEADER.pack_into(buffer, offset, self._type, self._timestamp)  # byte, Long
+        offset += FieldByteSize.transactionType + FieldByteSize.timestamp
 
         if self._type in [self.type_coin_generation, self.type_seed, self.type_standard, self.type_cycle]:
-            result.append(struct.pack(">Q", self._amount))  # Long
-            result.append(self._receiver_identifier)
+            codec.LONG.pack_into(buffer, offset, self._amount)  # Long
+            offset += FieldByteSize.transactionAmount
+            buffer[offset:offset + FieldByteSize.identifier] = self._receiver_identifier
+            offset += FieldByteSize.identifier
         elif self._type == self.type_cycle_signature:
-            result.append(self._sender_identifier)
-            result.append(struct.pack(">B", self._cycle_transaction_vote))  # byte
-            result.append(self._cycle_transaction_signature)
+            buffer[offset:offset + FieldByteSize.identifier] = self._sender_identifier
+            offset += FieldByteSize.identifier
+            buffer[offset] = self._cycle_transaction_vote  # byte
+            offset += FieldByteSize.booleanField
+            buffer[offset:offset + FieldByteSize.signature] = self._cycle_transaction_signature
+            offset += FieldByteSize.signature
             if not for_signing:
-                result.append(self._signature)
+                buffer[offset:offset + FieldByteSize.signature] = self._signature
+                offset += FieldByteSize.signature
 
         if self._type in [self.type_seed, self.type_standard, self.type_cycle]:
             if for_signing:
-                result.append(self._previous_block_hash)
+                buffer[offset:offset + FieldByteSize.hash] = self._previous_block_hash
+                offset += FieldByteSize.hash
             else:
-                result.append(struct.pack(">Q", self._previous_hash_height))  # Long
+                codec.LONG.pack_into(buffer, offset, self._previous_hash_height)  # Long
+                offset += FieldByteSize.blockHeight
 
-            result.append(self._sender_identifier)
+            buffer[offset:offset + FieldByteSize.identifier] = self._sender_identifier
+            offset += FieldByteSize.identifier
 
             # For serializing, we use the raw sender data with a length specifier. For signing, we use the double-
             # SHA-256 of the user data. This will allow us to remove inappropriate or illegal metadata from the
             # blockchain at a later date by replacing it with its double-SHA-256 without compromising the signature
             # integrity.
             if for_signing:
-                # print("double sha", HashUtil.double_sha256(self._sender_data).hex())
-                result.append(HashUtil.double_sha256(self._sender_data))
+                buffer[offset:offset + FieldByteSize.hash] = HashUtil.double_sha256(self._sender_data)
+                offset += FieldByteSize.hash
             else:
-                result.append(struct.pack(">B", len(self._sender_data)))  # byte
-                result.append(self._sender_data)
+                sender_data_length = len(self._sender_data)
+                buffer[offset] = sender_data_length  # byte
+                offset += 1
+                buffer[offset:offset + sender_data_length] = self._sender_data
+                offset += sender_data_length
 
             if not for_signing:
-                result.append(self._signature)
+                buffer[offset:offset + FieldByteSize.signature] = self._signature
+                offset += FieldByteSize.signature
 
                 # For cycle transactions, order the signatures by verifier identifier. In the v1 blockchain, the
                 # cycleSignatures field is used. In the v2 blockchain, the cycleSignatureTransactions field is used.
                 if self._type == self.type_cycle:
                     if self._cycle_signatures:
-                        result.append(struct.pack(">I", len(self._cycle_signatures)))  # int, 4
-                        for identifier, signature in sorted(self._cycle_signatures, key=lambda x: x[0]):
-                            result.append(identifier)
-                            result.append(signature)
+                        codec.INT.pack_into(buffer, offset, len(self._cycle_signatures))  # int, 4
+                        offset += FieldByteSize.unnamedInteger
+                        for identifier, signature in sorted(self._cycle_signatures, key=lambda x: bytes(x[0])):
+                            buffer[offset:offset + FieldByteSize.identifier] = identifier
+                            offset += FieldByteSize.identifier
+                            buffer[offset:offset + FieldByteSize.signature] = signature
+                            offset += FieldByteSize.signature
                     else:
-                        result.append(struct.pack(">I", len(self._cycle_signature_transactions)))  # int, 4
-                        for identifier, transaction in sorted(self._cycle_signature_transactions, key=lambda x: x[0]):
-                            result.append(struct.pack(">Q", transaction.get_timestamp()))  # Long
-                            result.append(transaction.get_sender_identifier())
-                            result.append(transaction.get_cycle_transaction_vote())
-                            result.append(transaction.get_signature())
-
-        return b''.join(result)
+                        codec.INT.pack_into(buffer, offset, len(self._cycle_signature_transactions))  # int, 4
+                        offset += FieldByteSize.unnamedInteger
+                        for identifier, transaction in sorted(self._cycle_signature_transactions, key=lambda x: bytes(x[0])):
+                            codec.LONG.pack_into(buffer, offset, transaction.get_timestamp())  # Long
+                            offset += FieldByteSize.timestamp
+                            buffer[offset:offset + FieldByteSize.identifier] = transaction.get_sender_identifier()
+                            offset += FieldByteSize.identifier
+                            buffer[offset] = transaction.get_cycle_transaction_vote()  # byte
+                            offset += FieldByteSize.booleanField
+                            buffer[offset:offset + FieldByteSize.signature] = transaction.get_signature()
+                            offset += FieldByteSize.signature
+
+        return offset
 
     def to_json(self) -> str:
         signature = self._signature.hex() if self._signature else None
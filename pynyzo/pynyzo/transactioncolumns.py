@@ -0,0 +1,130 @@
+"""
+Columnar export of transactions to a numpy structured array.
+
+Transactions are never decoded as Python objects: LazyBlock indexes their offsets, then every column is gathered
+from the raw bytes in a single vectorized pass over all transactions.
+numpy is an optional dependency, pip install pynyzo[numpy]
+"""
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from pynyzo.block import Block
+from pynyzo.lazyblock import LazyBlock
+from pynyzo.transaction import Transaction
+
+
+# One row per transaction. Identifiers and signatures are V fields - raw bytes, read back with .tobytes() - since
+# numpy strips the trailing nulls of S fields. Sender data is null padded S32, sender_data_length gives its length.
+TRANSACTION_DTYPE = [('height', '<u8'), ('index', '<u4'), ('type', 'u1'), ('timestamp', '<u8'), ('amount', '<u8'),
+                     ('fee', '<u8'), ('amount_after_fee', '<u8'), ('previous_hash_height', '<u8'),
+                     ('receiver_identifier', 'V32'), ('sender_identifier', 'V32'), ('sender_data_length', 'u1'),
+                     ('sender_data', 'S32'), ('signature', 'V64')]
+
+# Offsets relative to the transaction start, see Transaction fromByteBuffer constructor.
+_AMOUNT = 9
+_RECEIVER = 17
+_PREVIOUS_HASH_HEIGHT = 49
+_SENDER = 57
+_SENDER_DATA_LENGTH = 89
+_SENDER_DATA = 90
+_CYCLE_SIGNATURE_SENDER = 9
+_CYCLE_SIGNATURE_SIGNATURE = 9 + 32 + 1 + 64
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("numpy is required for columnar exports, pip install numpy")
+
+
+def _gather(data, positions, width: int):
+    """(len(positions), width) uint8 matrix of the bytes starting at each position"""
+    return data[positions[:, None] + np.arange(width)]
+
+
+def _gather_uint64(data, positions):
+    return _gather(data, positions, 8).view('>u8').ravel().astype('<u8')
+
+
+def _gather_bytes(data, positions, width: int):
+    return _gather(data, positions, width).view(f'V{width}').ravel()
+
+
+class TransactionColumns:
+    """Batch decoders, from blocks to a TRANSACTION_DTYPE array"""
+
+    @staticmethod
+    def from_buffer(buffer, offsets, heights, indices):
+        """Gathers all columns from a single buffer. offsets, heights and indices are one entry per transaction."""
+        _require_numpy()
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        result = np.zeros(len(offsets), dtype=TRANSACTION_DTYPE)
+        if not len(offsets):
+            return result
+        result['height'] = heights
+        result['index'] = indices
+        types = data[offsets]
+        result['type'] = types
+        result['timestamp'] = _gather_uint64(data, offsets + 1)
+
+        # amount and receiver: every type but cycle signatures
+        mask = types <= Transaction.type_cycle
+        positions = offsets[mask]
+        result['amount'][mask] = _gather_uint64(data, positions + _AMOUNT)
+        result['receiver_identifier'][mask] = _gather_bytes(data, positions + _RECEIVER, 32)
+
+        # Signed transactions: seed, standard and cycle
+        mask = (types >= Transaction.type_seed) & (types <= Transaction.type_cycle)
+        positions = offsets[mask]
+        result['previous_hash_height'][mask] = _gather_uint64(data, positions + _PREVIOUS_HASH_HEIGHT) \
+            & 0x0000ffffffffffff
+        result['sender_identifier'][mask] = _gather_bytes(data, positions + _SENDER, 32)
+        lengths = np.minimum(data[positions + _SENDER_DATA_LENGTH], 32)
+        result['sender_data_length'][mask] = lengths
+        # The signature (64 bytes) always follows the sender data, so reading 32 bytes never overflows.
+        sender_data = _gather(data, positions + _SENDER_DATA, 32)
+        sender_data[np.arange(32) >= lengths[:, None]] = 0
+        result['sender_data'][mask] = sender_data.view('S32').ravel()
+        result['signature'][mask] = _gather_bytes(data, positions + _SENDER_DATA + lengths, 64)
+
+        mask = types == Transaction.type_cycle_signature
+        positions = offsets[mask]
+        result['sender_identifier'][mask] = _gather_bytes(data, positions + _CYCLE_SIGNATURE_SENDER, 32)
+        result['signature'][mask] = _gather_bytes(data, positions + _CYCLE_SIGNATURE_SIGNATURE, 64)
+
+        # Same as Transaction.get_fee, for the whole column at once
+        mask = types < Transaction.type_cycle
+        result['fee'][mask] = (result['amount'][mask] + 399) // 400
+        result['amount_after_fee'] = result['amount'] - result['fee']
+        return result
+
+    @staticmethod
+    def from_blocks(blocks):
+        """Columns for all transactions of the given blocks - LazyBlock, or Block re-serialized - in order.
+        The blocks buffers are concatenated so that the gather runs once for the whole range."""
+        _require_numpy()
+        buffers, offsets, heights, indices = [], [], [], []
+        base = 0
+        for block in blocks:
+            if not isinstance(block, LazyBlock):
+                block = LazyBlock(block.get_bytes(include_signature=True))
+            buffer = block.get_buffer(include_signature=True)
+            block_offsets = block.get_transaction_offsets()
+            if block_offsets:
+                buffers.append(buffer)
+                offsets.append(np.asarray(block_offsets, dtype=np.int64) + base)
+                heights.append(np.full(len(block_offsets), block.get_height(), dtype='<u8'))
+                indices.append(np.arange(len(block_offsets), dtype='<u4'))
+                base += len(buffer)
+        if not buffers:
+            return np.zeros(0, dtype=TRANSACTION_DTYPE)
+        return TransactionColumns.from_buffer(b''.join(buffers), np.concatenate(offsets), np.concatenate(heights),
+                                              np.concatenate(indices))
+
+    @staticmethod
+    def from_nyzoblock(filename: str):
+        """Columns for all transactions of a nyzoblock file"""
+        return TransactionColumns.from_blocks(Block.iter_nyzoblock(filename, lazy=True))
@@ -0,0 +1,230 @@
+"""
+Transaction index by account, built incrementally over a BlockStore.
+
+Maps each 32 bytes identifier - as sender or receiver - to its postings, (height, transaction index) pairs.
+Postings are buffered in memory and written in chunks, one chunk per identifier per flush:
+
+- postings.bin: chunks back to back. A chunk is the offset + 1 of the previous chunk of the same identifier
+  (0 for none, Long, 8), then a varint count and count (height delta, transaction index) varint pairs.
+- heads.bin: log of (identifier, 32 + offset of its last chunk, 8) records, the last record of an identifier wins.
+- state.bin: end height and the valid length of both files, replaced atomically after each flush.
+
+A query walks the chunks of one identifier only: O(results), not O(chain). Only appends past the end height.
+"""
+
+import os
+import struct
+
+from pynyzo.blockstore import MappedFile
+from pynyzo.fieldbytesize import FieldByteSize
+from pynyzo.helpers import base_app_log
+from pynyzo.transaction import Transaction
+
+# Offsets in a serialized transaction: type 1, timestamp 8, then per type fields
+_RECEIVER_OFFSET = 1 + FieldByteSize.timestamp + FieldByteSize.transactionAmount
+_SENDER_OFFSET = _RECEIVER_OFFSET + FieldByteSize.identifier + FieldByteSize.blockHeight
+_CYCLE_SIGNATURE_SENDER_OFFSET = 1 + FieldByteSize.timestamp
+
+
+def encode_varint(value: int, result: bytearray) -> None:
+    """Unsigned LEB128, appended to result"""
+    while value > 0x7f:
+        result.append((value & 0x7f) | 0x80)
+        value >>= 7
+    result.append(value)
+
+
+def decode_varint(buffer, offset: int) -> tuple:
+    """(value, next offset)"""
+    value = 0
+    shift = 0
+    while True:
+        byte = buffer[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def transaction_identifiers(buffer, offset: int=0) -> tuple:
+    """Identifiers a serialized transaction involves, straight from the buffer: (receiver, sender), None if n/a"""
+    transaction_type = buffer[offset]
+    if transaction_type == Transaction.type_cycle_signature:
+        start = offset + _CYCLE_SIGNATURE_SENDER_OFFSET
+        return None, bytes(buffer[start:start + FieldByteSize.identifier])
+    receiver = bytes(buffer[offset + _RECEIVER_OFFSET:offset + _RECEIVER_OFFSET + FieldByteSize.identifier])
+    if transaction_type == Transaction.type_coin_generation:
+        return receiver, None
+    return receiver, bytes(buffer[offset + _SENDER_OFFSET:offset + _SENDER_OFFSET + FieldByteSize.identifier])
+
+
+def decoded_transaction_identifiers(transaction: Transaction) -> tuple:
+    """transaction_identifiers of a decoded Transaction: (receiver, sender), None if n/a"""
+    transaction_type = transaction.get_type()
+    if transaction_type == Transaction.type_cycle_signature:
+        return None, transaction.get_sender_identifier()
+    if transaction_type == Transaction.type_coin_generation:
+        return transaction.get_receiver_identifier(), None
+    return transaction.get_receiver_identifier(), transaction.get_sender_identifier()
+
+
+class TransactionIndex:
+    """Account -> (height, transaction index) postings, see module doc"""
+
+    state_struct = struct.Struct(">qQQ")  # end height (-1 if empty), postings length, heads length
+    chunk_header = struct.Struct(">Q")  # previous chunk offset + 1
+    head_record = struct.Struct(">32sQ")  # identifier, last chunk offset
+
+    __slots__ = ('app_log', 'root', 'flush_every', '_end_height', '_heads', '_pending', '_pending_blocks',
+                 '_postings_length', '_heads_length', '_postings_map')
+
+    def __init__(self, root: str, flush_every: int=1000, app_log: object=None):
+        """flush_every: number of added blocks before the buffered postings are written"""
+        self.app_log = base_app_log(app_log)
+        self.root = root
+        self.flush_every = flush_every
+        os.makedirs(root, exist_ok=True)
+        self._end_height = -1
+        self._postings_length = 0
+        self._heads_length = 0
+        self._heads = {}  # identifier -> offset of its last chunk
+        self._pending = {}  # identifier -> [(height, index)], not written yet
+        self._pending_blocks = 0
+        if os.path.exists(self._filename('state.bin')):
+            with open(self._filename('state.bin'), 'rb') as file:
+                self._end_height, self._postings_length, self._heads_length = self.state_struct.unpack(file.read())
+        # Anything past the recorded lengths was written by an interrupted flush
+        for name, length in (('postings.bin', self._postings_length), ('heads.bin', self._heads_length)):
+            with open(self._filename(name), 'ab') as file:
+                file.truncate(length)
+        with open(self._filename('heads.bin'), 'rb') as file:
+            heads = file.read()
+        for identifier, offset in self.head_record.iter_unpack(heads):
+            self._heads[identifier] = offset
+        self._postings_map = MappedFile(self._filename('postings.bin'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _filename(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def get_end_height(self) -> int:
+        """Last indexed height, -1 for an empty index"""
+        return self._end_height
+
+    def get_number_of_identifiers(self) -> int:
+        return len(set(self._heads) | set(self._pending))
+
+    def add_block(self, block) -> None:
+        """Indexes a LazyBlock (fast path, reads identifiers from the buffer) or a Block"""
+        height = block.get_height()
+        if height <= self._end_height:
+            raise ValueError(f"Height {height} is already indexed (end height {self._end_height})")
+        pending = self._pending
+        if hasattr(block, 'get_transaction_offsets'):
+            buffer = block.get_buffer()
+            involved = (transaction_identifiers(buffer, offset) for offset in block.get_transaction_offsets())
+        else:
+            involved = (decoded_transaction_identifiers(transaction) for transaction in block.get_transactions())
+        for index, (receiver, sender) in enumerate(involved):
+            for identifier in (receiver, sender):
+                if identifier is None:
+                    continue
+                identifier = bytes(identifier)
+                postings = pending.get(identifier)
+                if postings is None:
+                    pending[identifier] = [(height, index)]
+                elif postings[-1] != (height, index):
+                    # Sender == receiver is recorded once
+                    postings.append((height, index))
+        self._end_height = height
+        self._pending_blocks += 1
+        if self._pending_blocks >= self.flush_every:
+            self.flush()
+
+    def update_from_store(self, store) -> int:
+        """Indexes the blocks of a BlockStore past the end height, returns how many were added"""
+        added = 0
+        end_height = store.get_end_height()
+        if end_height is not None:
+            for block in store.range(self._end_height + 1, end_height):
+                self.add_block(block)
+                added += 1
+        self.flush()
+        return added
+
+    def flush(self) -> None:
+        """Writes the buffered postings, then the heads, then the state"""
+        if self._pending:
+            chunks = bytearray()
+            heads = bytearray()
+            for identifier, postings in self._pending.items():
+                offset = self._postings_length + len(chunks)
+                chunks += self.chunk_header.pack(self._heads.get(identifier, -1) + 1)
+                encode_varint(len(postings), chunks)
+                previous_height = 0
+                for height, index in postings:
+                    encode_varint(height - previous_height, chunks)
+                    encode_varint(index, chunks)
+                    previous_height = height
+                heads += self.head_record.pack(identifier, offset)
+                self._heads[identifier] = offset
+            with open(self._filename('postings.bin'), 'ab') as file:
+                file.write(chunks)
+            with open(self._filename('heads.bin'), 'ab') as file:
+                file.write(heads)
+            self._postings_length += len(chunks)
+            self._heads_length += len(heads)
+            self._pending = {}
+        self._pending_blocks = 0
+        temporary = self._filename('state.tmp')
+        with open(temporary, 'wb') as file:
+            file.write(self.state_struct.pack(self._end_height, self._postings_length, self._heads_length))
+        os.replace(temporary, self._filename('state.bin'))
+
+    def _read_chunk(self, offset: int) -> tuple:
+        """(previous chunk offset or -1, postings) of the chunk at offset"""
+        view = self._postings_map.get_view(offset + self.chunk_header.size)
+        previous = self.chunk_header.unpack_from(view, offset)[0] - 1
+        count, position = decode_varint(view, offset + self.chunk_header.size)
+        postings = []
+        height = 0
+        for i in range(count):
+            delta, position = decode_varint(view, position)
+            index, position = decode_varint(view, position)
+            height += delta
+            postings.append((height, index))
+        return previous, postings
+
+    def get_postings(self, identifier: bytes) -> list:
+        """(height, transaction index) tuples involving identifier, by ascending height"""
+        identifier = bytes(identifier)
+        chunks = []
+        offset = self._heads.get(identifier, -1)
+        while offset >= 0:
+            offset, postings = self._read_chunk(offset)
+            chunks.append(postings)
+        result = [posting for postings in reversed(chunks) for posting in postings]
+        result.extend(self._pending.get(identifier, []))
+        return result
+
+    def iter_transactions(self, identifier: bytes, store):
+        """Yields (height, transaction index, Transaction) for identifier, blocks read from a BlockStore"""
+        block = None
+        for height, index in self.get_postings(identifier):
+            if block is None or block.get_height() != height:
+                block = store.get(height)
+            yield height, index, block.get_transaction(index)
+
+    def close(self) -> None:
+        self.flush()
+        self._postings_map.close()
+
+
+if __name__ == "__main__":
+    print("I'm a module, can't run!")
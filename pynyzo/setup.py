@@ -13,6 +13,9 @@ with open('HISTORY.rst') as history_file:
 
 requirements = ['tornado', 'ed25519', 'requests', 'nyzostrings>=0.0.7']
 
+# Optional features, pip install pynyzo[numpy]
+extras_requirements = {'numpy': ['numpy'], 'nacl': ['pynacl'], 'aiohttp': ['aiohttp']}
+
 setup_requirements = ['pytest-runner', ]
 
 test_requirements = ['pytest', ]
@@ -35,6 +38,7 @@ setup(
     ],
     description="A Nyzo client package for Python3.",
     install_requires=requirements,
+    extras_require=extras_requirements,
     license="MIT license",
     long_description=readme + '\n\n' + history,
     include_package_data=True,
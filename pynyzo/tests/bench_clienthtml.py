@@ -0,0 +1,103 @@
+"""
+Client html parsing benchmark, over the captured pages of webfactory.py.
+
+Compares the former NyzoClient.fake_table_to_list and fake_table_frozen_to_dict - several uncompiled re.search,
+str.replace and split per page - with the single pass pynyzo.clienthtml tokenizer, as string wrappers and typed.
+
+python3 bench_clienthtml.py [-n 2000]
+"""
+
+import argparse
+import re
+import sys
+import timeit
+
+sys.path.append('../')
+from pynyzo.clienthelpers import NyzoClient
+from pynyzo.clienthtml import parse_frozen, parse_table
+import webfactory
+
+
+def legacy_table_to_list(html: str):
+    test_header = re.search(r'<div class="header-row">([^"]*)</div><div class="data-row">', html)
+    headers = []
+    if test_header:
+        headers = test_header.groups()[0].replace('<div>', '').split("</div>")[:-1]  # closing /div
+    test_content = re.search(r'<div class="data-row">(.*)</div></div></div>', html)
+    try:
+        error_content = re.search(r'<p class="error">(.*)</p>', html).groups()[0]
+    except Exception:
+        error_content = None
+    try:
+        notice_content = re.search(r'<p class="notice">([^"]*)</p>', html).groups()
+    except Exception:
+        notice_content = []
+    values = []
+    if test_content:
+        content = test_content.groups()[0].replace('<div>', '')\
+            .replace('<div class="extra-wrap">', '') \
+            .replace('<div class="data-row">', '') \
+            .split("</div>")
+        while len(content) >= len(headers):
+            part = content[0:len(headers)]
+            content = content[len(headers)+1:]
+            temp = dict(zip(headers, part))
+            if error_content:
+                temp["error"] = error_content
+            temp["notice"] = notice_content
+            values.append(temp)
+    else:
+        values = [{"notice": notice_content}]
+        if error_content:
+            values[0]["error"] = error_content
+    return values
+
+
+def legacy_frozen_to_dict(html: str):
+    try:
+        height = re.search(r'<div>height</div><div>([^<]*)</div>', html).groups()[0]
+    except Exception:
+        height = 0
+    try:
+        the_hash = re.search(r'<div>hash</div><div[^>]*>([^<]*)</div>', html).groups()[0]
+    except Exception:
+        the_hash = b''
+    try:
+        timestamp = re.search(r'<div>verification timestamp \(ms\)</div><div>([^<]*)</div>', html).groups()[0]
+    except Exception:
+        timestamp = 0
+    try:
+        distance = re.search(r'<div>distance from open edge</div><div>([^<]*)</div>', html).groups()[0]
+    except Exception:
+        distance = 0
+    values = {"height": int(height), "hash": the_hash.replace('-', ''),
+              "timestamp": timestamp, "distance": distance}
+    return values
+
+
+def cases() -> dict:
+    """page name -> (legacy, wrapper, typed) callables"""
+    result = {}
+    for name, html in webfactory.captured_pages().items():
+        if name.startswith('frozen'):
+            result[name] = (lambda html=html: legacy_frozen_to_dict(html),
+                            lambda html=html: NyzoClient.fake_table_frozen_to_dict(html),
+                            lambda html=html: parse_frozen(html))
+        else:
+            result[name] = (lambda html=html: legacy_table_to_list(html),
+                            lambda html=html: NyzoClient.fake_table_to_list(html),
+                            lambda html=html: parse_table(html))
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='pynyzo client html parsing benchmark')
+    parser.add_argument("-n", "--number", type=int, default=2000, help='Calls per case (default 2000)')
+    args = parser.parse_args()
+
+    print(f"{'page':20s} {'legacy':>10s} {'wrapper':>10s} {'typed':>10s}  µs per page")
+    for name, (legacy, wrapper, typed) in cases().items():
+        times = [min(timeit.repeat(function, number=args.number, repeat=3)) / args.number * 1e6
+                 for function in (legacy, wrapper, typed)]
+        same = '' if legacy() == wrapper() else '  (legacy output differs)'
+        print(f"{name:20s} {times[0]:10.2f} {times[1]:10.2f} {times[2]:10.2f}  x{times[0] / times[1]:.1f}{same}")
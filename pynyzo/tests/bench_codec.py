@@ -0,0 +1,81 @@
+"""
+Decode micro benchmark, per message type, over synthetic fixtures (see blockfactory.py).
+
+Also compares the legacy field by field header decode - struct.unpack(fmt, buffer[o:o + n]) per field -
+with the precompiled pynyzo.codec structs.
+
+python3 bench_codec.py [-n 2000]
+"""
+
+import argparse
+import struct
+import sys
+import timeit
+
+sys.path.append('../')
+from pynyzo import codec
+from pynyzo.approvedcycletransaction import ApprovedCycleTransaction
+from pynyzo.balancelist import BalanceList
+from pynyzo.block import Block
+from pynyzo.messages.blockrequest import BlockRequest
+from pynyzo.messages.statusresponse import StatusResponse
+from pynyzo.transaction import Transaction
+import blockfactory
+import nodefactory
+
+
+def legacy_block_header(buffer) -> tuple:
+    height = struct.unpack(">Q", buffer[0:8])[0]
+    previous_block_hash = buffer[8:40]
+    start_timestamp = struct.unpack(">Q", buffer[40:48])[0]
+    verification_timestamp = struct.unpack(">Q", buffer[48:56])[0]
+    number_of_transactions = struct.unpack(">I", buffer[56:60])[0]
+    return height, previous_block_hash, start_timestamp, verification_timestamp, number_of_transactions
+
+
+def legacy_transaction_header(buffer) -> tuple:
+    transaction_type = struct.unpack(">B", buffer[0:1])[0]
+    timestamp = struct.unpack(">Q", buffer[1:9])[0]
+    amount = struct.unpack(">Q", buffer[9:17])[0]
+    receiver_identifier = buffer[17:49]
+    return transaction_type, timestamp, amount, receiver_identifier
+
+
+def cases() -> dict:
+    block = memoryview(blockfactory.block(transactions=[blockfactory.standard_transaction(amount=i)
+                                                        for i in range(100)]))
+    standard = memoryview(blockfactory.standard_transaction())
+    coin = memoryview(blockfactory.coin_generation_transaction())
+    cycle = memoryview(blockfactory.cycle_transaction(signers=20, v2=True))
+    cycle_signature = memoryview(blockfactory.cycle_signature_transaction())
+    approved = memoryview(blockfactory.approved_cycle_transaction())
+    balance_list = memoryview(blockfactory.balance_list(items=2000, version=2, pending_cycle_transactions=3,
+                                                        approved_cycle_transactions=3))
+    block_request = b'\x00' * 10 + BlockRequest(start_height=1, end_height=2, include_balance_list=True).get_bytes()
+    nodefactory.load_test_keys()
+    status = nodefactory.status_response(['frozen edge: 1000 (0 ago)', 'trailing edge: 0'] * 8)
+    return {
+        'block, 100 tx': lambda: Block(buffer=block),
+        'transaction, standard': lambda: Transaction(buffer=standard),
+        'transaction, coin generation': lambda: Transaction(buffer=coin),
+        'transaction, cycle v2, 20 signatures': lambda: Transaction(buffer=cycle, balance_list_cycle_transaction=True),
+        'transaction, cycle signature': lambda: Transaction(buffer=cycle_signature),
+        'approved cycle transaction': lambda: ApprovedCycleTransaction(buffer=approved),
+        'balance list, 2000 items': lambda: BalanceList(buffer=balance_list),
+        'block request': lambda: BlockRequest(buffer=block_request),
+        'status response, 16 lines': lambda: StatusResponse(buffer=status),
+        'block header, legacy': lambda: legacy_block_header(block),
+        'block header, codec': lambda: codec.BLOCK_HEADER.unpack_from(block, 0),
+        'transaction header, legacy': lambda: legacy_transaction_header(standard),
+        'transaction header, codec': lambda: (*codec.TRANSACTION_AMOUNT_HEADER.unpack_from(standard, 0),
+                                              standard[17:49]),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='pynyzo decode micro benchmark')
+    parser.add_argument("-n", type=int, default=2000, help='Iterations per repeat (default 2000)')
+    args = parser.parse_args()
+    for name, function in cases().items():
+        best = min(timeit.repeat(function, number=args.n, repeat=5)) / args.n
+        print(f"{name:40s} {best * 1e6:10.2f} µs")
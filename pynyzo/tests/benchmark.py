@@ -0,0 +1,166 @@
+"""
+Benchmark suite for the decode, parse, encode, hash and sign hot paths - synthetic fixtures, no network needed.
+
+Results are written as JSON, and can be compared against a stored baseline to flag regressions:
+
+python3 benchmark.py -o baseline.json
+(change things)
+python3 benchmark.py -c baseline.json [-t 0.1]
+
+Exits with 1 if a case is slower than its baseline by more than the threshold (10% by default).
+-k runs only the cases whose name contains the given text.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+
+sys.path.append('../')
+from pynyzo import codec
+from pynyzo.balancelist import BalanceList
+from pynyzo.block import Block
+from pynyzo.clienthtml import parse_frozen, parse_table
+from pynyzo.hashutil import HashUtil
+from pynyzo.keyutil import KeyUtil
+from pynyzo.messages.statusresponse import StatusResponse
+from pynyzo.transaction import Transaction
+import blockfactory
+import nodefactory
+import webfactory
+
+# Minimal wall time of a single repeat, seconds
+MIN_TIME = 0.2
+REPEAT = 5
+THRESHOLD = 0.1
+
+
+def fixtures() -> dict:
+    """Serialized synthetic inputs, by name"""
+    key = blockfactory.signing_key()
+    standard = blockfactory.standard_transaction()
+    fixtures = {
+        'key': key,
+        'standard_transaction': standard,
+        'block_1000': blockfactory.block(transactions=[blockfactory.standard_transaction(amount=i)
+                                                       for i in range(1000)]),
+        'block_cycle_v1': blockfactory.block(transactions=[blockfactory.cycle_transaction(signers=2000)], version=1),
+        'block_cycle_v2': blockfactory.block(transactions=[blockfactory.cycle_transaction(signers=2000, v2=True)],
+                                             version=2),
+        'balance_list_v0': blockfactory.balance_list(items=10000),
+        'balance_list_v2': blockfactory.balance_list(items=10000, version=2, pending_cycle_transactions=10,
+                                                     approved_cycle_transactions=10),
+        'status_response': nodefactory.status_response([f"frozen edge: {1000 + i} (0 ago)" for i in range(30)]),
+        'message_1k': bytes(range(256)) * 4,
+        'message_64k': bytes(range(256)) * 256,
+    }
+    fixtures.update({f'page_{name}': html for name, html in webfactory.captured_pages().items()})
+    fixtures['signature_1k'] = KeyUtil.sign_bytes(fixtures['message_1k'], key)
+    fixtures['identifier'] = blockfactory.identifier(key)
+    return fixtures
+
+
+def traced(function):
+    """Same call, with the codec layer tracing on - records are not emitted unless the logger is at DEBUG"""
+    def call():
+        codec.TRACE = True
+        try:
+            return function()
+        finally:
+            codec.TRACE = False
+    return call
+
+
+def cases(data: dict) -> dict:
+    """Name -> callable, one call per measured operation"""
+    transaction = Transaction(buffer=data['standard_transaction'])
+    transaction.set_previous_block_hash(blockfactory.PREVIOUS_BLOCK_HASH)
+    cycle_v2 = Block(buffer=data['block_cycle_v2']).get_transactions()[0]
+    message, signature, identifier = data['message_1k'], data['signature_1k'], data['identifier']
+    return {
+        'decode.block.1000_standard': lambda: Block(buffer=data['block_1000']),
+        'decode.block.1000_standard_traced': traced(lambda: Block(buffer=data['block_1000'])),
+        'decode.block.cycle_v1_2000_signatures': lambda: Block(buffer=data['block_cycle_v1']),
+        'decode.block.cycle_v2_2000_signatures': lambda: Block(buffer=data['block_cycle_v2']),
+        'decode.balance_list.v0_10000_items': lambda: BalanceList(buffer=data['balance_list_v0']),
+        'decode.balance_list.v2_10000_items': lambda: BalanceList(buffer=data['balance_list_v2']),
+        'decode.status_response.30_lines': lambda: StatusResponse(buffer=data['status_response']),
+        'parse.client_html.frozen_edge': lambda: parse_frozen(data['page_frozen_edge']),
+        'parse.client_html.forward': lambda: parse_table(data['page_forward_ok']),
+        'parse.client_html.200_rows': lambda: parse_table(data['page_search_200_rows']),
+        'encode.transaction.for_signing': lambda: transaction.get_bytes(for_signing=True),
+        'encode.transaction.cycle_v2_for_signing': lambda: cycle_v2.get_bytes(for_signing=True),
+        'hash.double_sha256.1k': lambda: HashUtil.double_sha256(message),
+        'hash.double_sha256.64k': lambda: HashUtil.double_sha256(data['message_64k']),
+        'sign.sign_bytes.1k': lambda: KeyUtil.sign_bytes(message, data['key']),
+        'sign.signature_is_valid.1k': lambda: KeyUtil.signature_is_valid(signature, message, identifier,
+                                                                         use_cache=False),
+        'sign.signature_is_valid.1k_cached': lambda: KeyUtil.signature_is_valid(signature, message, identifier),
+    }
+
+
+def measure(function, repeat: int=REPEAT, min_time: float=MIN_TIME) -> dict:
+    """Best and median time per call, seconds. The number of calls per repeat is scaled to last min_time."""
+    timer = timeit.Timer(function)
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time:
+            break
+        number *= 2 if number < 16 else 10
+    times = sorted(t / number for t in timer.repeat(repeat=repeat, number=number))
+    return {'best': times[0], 'median': times[len(times) // 2], 'number': number, 'repeat': repeat}
+
+
+def run(selection: str='', repeat: int=REPEAT, min_time: float=MIN_TIME, verbose: bool=False) -> dict:
+    """JSON serializable run report"""
+    results = {}
+    for name, function in cases(fixtures()).items():
+        if selection not in name:
+            continue
+        results[name] = measure(function, repeat=repeat, min_time=min_time)
+        if verbose:
+            print(f"{name:45s} {results[name]['best'] * 1e6:12.2f} µs")
+    return {'timestamp': int(time.time()), 'python': platform.python_version(),
+            'implementation': platform.python_implementation(), 'machine': platform.machine(),
+            'results': results}
+
+
+def compare(report: dict, baseline: dict, threshold: float=THRESHOLD) -> list:
+    """(name, baseline best, best, ratio) for the cases slower than baseline by more than threshold.
+    Cases missing from one of the reports are ignored."""
+    regressions = []
+    for name, result in report['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        ratio = result['best'] / reference['best']
+        if ratio > 1 + threshold:
+            regressions.append((name, reference['best'], result['best'], ratio))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='pynyzo hot paths benchmark')
+    parser.add_argument("-o", "--output", type=str, default='', help='Write the JSON report to this file')
+    parser.add_argument("-c", "--compare", type=str, default='', help='Baseline JSON report to compare against')
+    parser.add_argument("-t", "--threshold", type=float, default=THRESHOLD,
+                        help=f'Tolerated slowdown before flagging a regression (default {THRESHOLD})')
+    parser.add_argument("-k", "--select", type=str, default='', help='Only run cases whose name contains this')
+    parser.add_argument("-r", "--repeat", type=int, default=REPEAT, help=f'Repeats per case (default {REPEAT})')
+    args = parser.parse_args()
+
+    report = run(args.select, repeat=args.repeat, verbose=True)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(report, baseline, args.threshold)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: {before * 1e6:.2f} µs -> {after * 1e6:.2f} µs (x{ratio:.2f})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regression over {args.threshold:.0%} against {args.compare}")
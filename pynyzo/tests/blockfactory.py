@@ -0,0 +1,122 @@
+"""
+Synthetic, signed Nyzo binary fixtures for the tests - no network needed.
+
+NEVER USE THESE KEYS IN REAL WORLD!!!
+"""
+
+import hashlib
+import struct
+import sys
+
+import ed25519
+
+sys.path.append('../')
+from pynyzo.transaction import Transaction
+
+
+def signing_key(keyword: bytes=b'9444') -> ed25519.SigningKey:
+    return ed25519.SigningKey(hashlib.sha256(keyword).digest())
+
+
+def identifier(key: ed25519.SigningKey) -> bytes:
+    return key.get_verifying_key().to_bytes()
+
+
+PREVIOUS_BLOCK_HASH = bytes(range(32))
+
+
+def standard_transaction(amount: int=1000000, timestamp: int=1600000000000, receiver: bytes=b'\x02' * 32,
+                         sender_data: bytes=b'data', previous_hash_height: int=10, key: ed25519.SigningKey=None,
+                         tx_type: int=Transaction.type_standard,
+                         previous_block_hash: bytes=PREVIOUS_BLOCK_HASH) -> bytes:
+    """Serialized, signed, type 1 or 2 transaction"""
+    key = key if key else signing_key()
+    transaction = Transaction(type=tx_type, timestamp=timestamp, amount=amount, receiver_identifier=receiver,
+                              previous_hash_height=previous_hash_height, previous_block_hash=previous_block_hash,
+                              sender_identifier=identifier(key), sender_data=sender_data, signature=b'')
+    signature = key.sign(transaction.get_bytes(for_signing=True))
+    return b''.join((struct.pack(">BQQ", tx_type, timestamp, amount), receiver,
+                     struct.pack(">Q", previous_hash_height), identifier(key),
+                     struct.pack(">B", len(sender_data)), sender_data, signature))
+
+
+def coin_generation_transaction(amount: int=100, timestamp: int=1600000000000, receiver: bytes=b'\x03' * 32) -> bytes:
+    return struct.pack(">BQQ", Transaction.type_coin_generation, timestamp, amount) + receiver
+
+
+def cycle_transaction(signers: int=2, timestamp: int=1600000000000, amount: int=5000000,
+                      receiver: bytes=b'\x04' * 32, v2: bool=False) -> bytes:
+    """Type 3 transaction with v1 (identifier, signature) or v2 (timestamp, identifier, vote, signature) entries"""
+    key = signing_key(b'cycle')
+    body = b''.join((struct.pack(">BQQ", Transaction.type_cycle, timestamp, amount), receiver,
+                     struct.pack(">Q", 0), identifier(key), struct.pack(">B", 0), b'\x05' * 64))
+    entries = [struct.pack(">I", signers)]
+    for i in range(signers):
+        if v2:
+            entries.append(struct.pack(">Q", timestamp + i) + bytes([i % 255 + 1]) * 32 + b'\x01' + b'\x06' * 64)
+        else:
+            entries.append(bytes([i % 255 + 1]) * 32 + b'\x06' * 64)
+    return body + b''.join(entries)
+
+
+def cycle_signature_transaction(timestamp: int=1600000000000, vote: int=1) -> bytes:
+    return struct.pack(">BQ", Transaction.type_cycle_signature, timestamp) + b'\x07' * 32 + bytes([vote]) \
+        + b'\x08' * 64 + b'\x09' * 64
+
+
+def block(height: int=100, transactions: list=None, version: int=0, previous_block_hash: bytes=b'\x0a' * 32,
+          start_timestamp: int=1600000000000, balance_list_hash: bytes=b'\x0b' * 32,
+          key: ed25519.SigningKey=None) -> bytes:
+    """Serialized block, with verifier identifier and signature"""
+    transactions = transactions if transactions is not None else []
+    key = key if key else signing_key(b'verifier')
+    body = b''.join([struct.pack(">Q", (version << 48) | height), previous_block_hash,
+                     struct.pack(">QQI", start_timestamp, start_timestamp + 7000, len(transactions))]
+                    + transactions + [balance_list_hash])
+    return body + identifier(key) + key.sign(body)
+
+
+def approved_cycle_transaction(approval_height: int=90, amount: int=5000000) -> bytes:
+    return b'\x0c' * 32 + b'\x0d' * 32 + struct.pack(">QQ", approval_height, amount)
+
+
+def balance_list(height: int=100, items: int=10, version: int=0, rollover_fees: int=0,
+                 pending_cycle_transactions: int=0, approved_cycle_transactions: int=0) -> bytes:
+    """Serialized balance list with synthetic accounts, cycle transactions are only stored by v2"""
+    result = [struct.pack(">QB", (version << 48) | height, rollover_fees)]
+    for i in range(min(height, 9)):
+        result.append(bytes([i]) * 32)
+    result.append(struct.pack(">I", items))
+    for i in range(items):
+        result.append(i.to_bytes(32, 'big') + struct.pack(">QH", 1000000 * (i + 1), i % 500))
+    if version > 0:
+        result.append(struct.pack(">QQ", 0, 0))  # unlock threshold, unlock transfer sum
+    if version > 1:
+        result.append(struct.pack(">I", pending_cycle_transactions))
+        result.extend(cycle_transaction(signers=3, timestamp=1600000000000 + i, v2=True)
+                      for i in range(pending_cycle_transactions))
+        result.append(struct.pack(">I", approved_cycle_transactions))
+        result.extend(approved_cycle_transaction(approval_height=height - i - 1)
+                      for i in range(approved_cycle_transactions))
+    return b''.join(result)
+
+
+def nyzoblock(blocks: list, balance_lists: dict=None) -> bytes:
+    """Content of a .nyzoblock file. balance_lists maps the index of a block to the balance list that follows it,
+    a list is required after the first block and after each discontinuity."""
+    balance_lists = balance_lists if balance_lists else {}
+    result = [struct.pack(">H", len(blocks))]
+    for index, a_block in enumerate(blocks):
+        result.append(a_block)
+        if index in balance_lists:
+            result.append(balance_lists[index])
+    return b''.join(result)
+
+
+def consecutive_nyzoblock(start_height: int=100, count: int=3, transactions: int=2, version: int=0) -> bytes:
+    """A .nyzoblock file content with consecutive blocks, balance list after the first one only"""
+    blocks = [block(height=start_height + i, version=version,
+                    transactions=[standard_transaction(amount=1000 * (j + 1), timestamp=1600000000000 + j)
+                                  for j in range(transactions)])
+              for i in range(count)]
+    return nyzoblock(blocks, {0: balance_list(height=start_height, version=version)})
@@ -0,0 +1,110 @@
+"""
+Local asyncio stand in for Nyzo verifiers, for the connection tests - no network needed.
+
+NEVER USE THESE KEYS IN REAL WORLD!!!
+"""
+
+import asyncio
+import struct
+import sys
+
+sys.path.append('../')
+from pynyzo.messagetype import MessageType
+from pynyzo.messages.statusresponse import StatusResponse
+import pynyzo.config as config
+import blockfactory
+
+
+def load_test_keys() -> None:
+    """Our own messages are signed with config keys, use a synthetic one instead of config.load()"""
+    config.PRIVATE_KEY = blockfactory.signing_key(b'client')
+    config.PUBLIC_KEY = config.PRIVATE_KEY.get_verifying_key()
+
+
+def response(message_type: MessageType, content, key_keyword: bytes=b'node') -> bytes:
+    """Signed response buffer, as sent by a verifier (without the len header)"""
+    key = blockfactory.signing_key(key_keyword)
+    body = struct.pack('>Qh', 1600000000000, message_type.value) + content.get_bytes() + blockfactory.identifier(key)
+    return body + key.sign(body)
+
+
+def status_response(lines: list, key_keyword: bytes=b'node') -> bytes:
+    return response(MessageType.StatusResponse18, StatusResponse(lines=lines), key_keyword)
+
+
+async def read_message(reader: asyncio.StreamReader) -> bytes:
+    length = struct.unpack('>I', await reader.readexactly(4))[0] - 4
+    return await reader.readexactly(length)
+
+
+async def write_message(writer: asyncio.StreamWriter, buffer: bytes) -> None:
+    writer.write(struct.pack('>I', len(buffer) + 4) + buffer)
+    await writer.drain()
+
+
+class FakeNode:
+    """Answers each message with handler(request buffer) -> response buffer, or None to stay silent.
+    one_shot closes the socket after each response, like a real verifier."""
+
+    def __init__(self, handler, one_shot: bool=False, delay: float=0):
+        self.handler = handler
+        self.one_shot = one_shot
+        self.delay = delay
+        self.connections = 0
+        self.requests = 0
+        self.server = None
+        self.port = None
+
+    async def start(self) -> 'FakeNode':
+        self.server = await asyncio.start_server(self._serve, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                request = await read_message(reader)
+                self.requests += 1
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                buffer = self.handler(request)
+                if buffer is not None:
+                    await write_message(writer, buffer)
+                if self.one_shot:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def block_response(blocks: list, key_keyword: bytes=b'node') -> bytes:
+    """Signed BlockResponse buffer from serialized blocks, without initial balance list"""
+    key = blockfactory.signing_key(key_keyword)
+    body = b''.join([struct.pack('>QhBH', 1600000000000, MessageType.BlockResponse12.value, 0, len(blocks))]
+                    + blocks + [blockfactory.identifier(key)])
+    return body + key.sign(body)
+
+
+class FakeChain:
+    """Serves BlockRequests from synthetic blocks, max_blocks per response at most"""
+
+    def __init__(self, start_height: int=0, end_height: int=1000, max_blocks: int=None):
+        self.blocks = {height: blockfactory.block(height=height,
+                                                  transactions=[blockfactory.coin_generation_transaction()])
+                       for height in range(start_height, end_height + 1)}
+        self.max_blocks = max_blocks
+        self.requests = []
+
+    def handler(self, request: bytes) -> bytes:
+        start_height, end_height = struct.unpack('>QQ', request[10:26])
+        self.requests.append((start_height, end_height))
+        if self.max_blocks:
+            end_height = min(end_height, start_height + self.max_blocks - 1)
+        return block_response([self.blocks[height] for height in range(start_height, end_height + 1)
+                                if height in self.blocks])
@@ -0,0 +1,132 @@
+import asyncio
+import struct
+import sys
+
+sys.path.append('../')
+from pynyzo.asyncconnection import AsyncConnection
+from pynyzo.message import Message
+from pynyzo.messagetype import MessageType
+from pynyzo.messageobject import EmptyMessageObject
+from pynyzo.messages.blockrequest import BlockRequest
+import nodefactory
+
+nodefactory.load_test_keys()
+
+
+def echo_height(request: bytes) -> bytes:
+    """Answers a BlockRequest with a status line holding its start height, to match responses with requests"""
+    start_height = struct.unpack('>Q', request[10:18])[0]
+    return nodefactory.status_response([f"height: {start_height}"])
+
+
+def block_request(height: int) -> Message:
+    return Message(MessageType.BlockRequest11, BlockRequest(start_height=height, end_height=height))
+
+
+def test_concurrent_fetches(verbose=False):
+    async def run(pipeline_depth: int, one_shot: bool):
+        node = await nodefactory.FakeNode(echo_height, one_shot=one_shot).start()
+        async with AsyncConnection('127.0.0.1', node.port, pipeline_depth=pipeline_depth) as connection:
+            responses = await asyncio.gather(*[connection.fetch(block_request(height)) for height in range(20)])
+        await node.stop()
+        if verbose:
+            print(pipeline_depth, one_shot, node.connections)
+        assert [response.get_lines() for response in responses] == [[f"height: {h}"] for h in range(20)]
+        return node.connections
+
+    assert asyncio.run(run(pipeline_depth=1, one_shot=False)) == 1
+    assert asyncio.run(run(pipeline_depth=4, one_shot=False)) == 1
+    # The peer closes after each answer: one connection per request, none lost
+    assert asyncio.run(run(pipeline_depth=1, one_shot=True)) == 20
+
+
+def test_timeout_resets_connection(verbose=False):
+    async def run():
+        node = await nodefactory.FakeNode(lambda request: None).start()
+        connection = AsyncConnection('127.0.0.1', node.port, timeout=0.2)
+        try:
+            await connection.fetch(Message(MessageType.StatusRequest17, EmptyMessageObject()))
+            assert False, "Should time out"
+        except asyncio.TimeoutError:
+            pass
+        assert not connection.is_connected()
+        # The next request goes through a fresh socket
+        node.handler = echo_height
+        response = await connection.fetch(block_request(5), timeout=1)
+        assert response.get_lines() == ["height: 5"]
+        await connection.close()
+        await node.stop()
+        assert node.connections == 2
+
+    asyncio.run(run())
+
+
+def test_pipelined_reset_once(verbose=False):
+    """The peer drops a socket with pipelined requests in flight: they all fail and retry on one new socket,
+    a stale reset from one of them must not close the socket the others retry on."""
+    dropped = []
+
+    def drop_first(request: bytes) -> bytes:
+        if not dropped:
+            dropped.append(request)
+            # FakeNode closes the socket
+            raise ConnectionResetError()
+        return echo_height(request)
+
+    async def run():
+        node = await nodefactory.FakeNode(drop_first).start()
+        async with AsyncConnection('127.0.0.1', node.port, pipeline_depth=4) as connection:
+            await connection.connect()
+            responses = await asyncio.gather(*[connection.fetch(block_request(height)) for height in range(4)],
+                                             return_exceptions=True)
+        await node.stop()
+        if verbose:
+            print(responses, node.connections)
+        assert all(not isinstance(response, Exception) for response in responses), responses
+        assert [response.get_lines() for response in responses] == [[f"height: {h}"] for h in range(4)]
+        assert node.connections == 2
+
+    asyncio.run(asyncio.wait_for(run(), 10))
+
+
+def test_timeout_includes_queue(verbose=False):
+    async def run():
+        node = await nodefactory.FakeNode(echo_height, delay=0.3).start()
+        async with AsyncConnection('127.0.0.1', node.port, pipeline_depth=1) as connection:
+            start = asyncio.get_running_loop().time()
+            first, second = await asyncio.gather(connection.fetch(block_request(1), timeout=0.5),
+                                                 connection.fetch(block_request(2), timeout=0.5),
+                                                 return_exceptions=True)
+            elapsed = asyncio.get_running_loop().time() - start
+        await node.stop()
+        if verbose:
+            print(first, second, elapsed)
+        assert first.get_lines() == ["height: 1"]
+        # 0.3 s waiting for the slot, then 0.2 s left of its 0.5 s
+        assert isinstance(second, asyncio.TimeoutError)
+        assert elapsed < 0.55
+
+    asyncio.run(run())
+
+
+def test_connect_backoff(verbose=False):
+    async def run():
+        node = await nodefactory.FakeNode(echo_height).start()
+        port = node.port
+        await node.stop()
+        connection = AsyncConnection('127.0.0.1', port, timeout=1)
+        for failures in (1, 2):
+            try:
+                await connection.connect()
+                assert False, "Nobody listens"
+            except RuntimeError:
+                pass
+            assert connection.failures == failures
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_concurrent_fetches(True)
+    test_pipelined_reset_once(verbose=True)
+    test_timeout_includes_queue(verbose=True)
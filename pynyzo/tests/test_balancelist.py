@@ -0,0 +1,141 @@
+import sys
+
+import pytest
+
+sys.path.append('../')
+import pynyzo.balancelist
+from pynyzo.balancelist import BalanceList
+from pynyzo.balancelistitem import BalanceListItem
+from pynyzo.indexedbalancelist import IndexedBalanceList
+from pynyzo.messageobject import MessageObject, MessageRecord
+from pynyzo.transaction import Transaction
+import blockfactory
+
+
+def test_balance_list_fast_path_matches_loop(monkeypatch, verbose=False):
+    pytest.importorskip("numpy")
+    raw = blockfactory.balance_list(height=1000, items=300, version=1)
+    fast = BalanceList(buffer=raw)
+    assert fast.get_number_of_items() == 300
+    assert fast.get_pairs()['balance'][299] == 300000000
+    monkeypatch.setattr(pynyzo.balancelist, "np", None)
+    slow = BalanceList(buffer=raw)
+    if verbose:
+        print(fast.to_string(), slow.to_string())
+    assert fast.get_byte_size() == slow.get_byte_size() == len(raw)
+    assert fast.get_hash() == slow.get_hash()
+    fast_items = fast.get_items()
+    assert [(bytes(item.get_identifier()), item.get_balance(), item.get_blocks_until_fee()) for item in fast_items] \
+        == [(bytes(item.get_identifier()), item.get_balance(), item.get_blocks_until_fee())
+            for item in slow.get_items()]
+    # Identifier ending with a null byte is kept verbatim
+    assert bytes(fast_items[0].get_identifier()) == bytes(32)
+    assert fast.to_json() == slow.to_json()
+
+
+def test_balance_list_round_trip(verbose=False):
+    for version in (0, 1, 2):
+        raw = blockfactory.balance_list(height=1000, items=20, version=version, pending_cycle_transactions=2,
+                                        approved_cycle_transactions=3)
+        balance_list = BalanceList(buffer=raw)
+        if verbose:
+            print(balance_list.to_string())
+        assert balance_list.get_bytes() == raw
+
+
+def test_indexed_balance_list(verbose=False):
+    raw = blockfactory.balance_list(height=1000, items=50, version=2, pending_cycle_transactions=1,
+                                    approved_cycle_transactions=1)
+    balance_list = BalanceList(buffer=raw)
+    indexed = IndexedBalanceList.from_balance_list(balance_list)
+    assert indexed.get_bytes() == raw
+    assert indexed.get_hash() == balance_list.get_hash()
+    assert indexed.get_balance((7).to_bytes(32, 'big')) == 8000000
+    assert indexed.get_balance(b'\xff' * 32) == 0
+
+    # A transfer from an existing account to a new one, then emptying an account
+    sender = (7).to_bytes(32, 'big')
+    receiver = (60).to_bytes(32, 'big')
+    indexed.apply_delta({sender: -3000000, receiver: 2992500})
+    indexed.set_balance((3).to_bytes(32, 'big'), 0)
+    indexed.set_block_height(1001)
+    if verbose:
+        print(indexed.to_string())
+    assert len(indexed) == 50
+    assert indexed.get_balance(sender) == 5000000
+    assert indexed.get_balance(receiver) == 2992500
+    assert (3).to_bytes(32, 'big') not in indexed
+    identifiers = [bytes(item.get_identifier()) for item in indexed.get_items()]
+    assert identifiers == sorted(identifiers)
+
+    # Same state, serialized from scratch
+    expected = BalanceList(block_height=1001, rollover_fees=0, previous_verifiers=balance_list.get_previous_verifiers(),
+                           items=indexed.get_items(), blockchain_version=2,
+                           pending_cycle_transactions=balance_list.get_pending_cycle_transactions(),
+                           recently_approved_cycle_transactions=balance_list.get_recently_approved_cycle_transactions())
+    assert indexed.get_bytes() == expected.get_bytes()
+    assert indexed.get_hash() == expected.get_hash()
+
+
+def test_indexed_balance_list_transactions():
+    key = blockfactory.signing_key()
+    sender = blockfactory.identifier(key)
+    indexed = IndexedBalanceList(block_height=10, previous_verifiers=[b'\x01' * 32] * 9)
+    indexed.set_balance(sender, 10000000)
+    transactions = [Transaction(buffer=blockfactory.standard_transaction(amount=1000000, receiver=b'\x02' * 32)),
+                    Transaction(buffer=blockfactory.standard_transaction(amount=400, receiver=b'\x02' * 32))]
+    fees = indexed.apply_transactions(transactions)
+    assert fees == 2500 + 1
+    assert indexed.get_balance(sender) == 10000000 - 1000400
+    assert indexed.get_balance(b'\x02' * 32) == 1000400 - fees
+
+
+def test_indexed_balance_list_bulk_delta(verbose=False):
+    items = [BalanceListItem((i * 2).to_bytes(32, 'big'), 1000000, 100) for i in range(5000)]
+    indexed = IndexedBalanceList(block_height=1000, items=items)
+    reference = IndexedBalanceList(block_height=1000, items=items)
+    # 1000 new accounts between the existing ones, 100 emptied and 100 updated
+    deltas = {(i * 2 + 1).to_bytes(32, 'big'): 1000 + i for i in range(1000)}
+    deltas.update({(i * 2).to_bytes(32, 'big'): -1000000 for i in range(0, 200, 2)})
+    deltas.update({(i * 2).to_bytes(32, 'big'): 5 for i in range(1, 200, 2)})
+    indexed.apply_delta(deltas)
+    for identifier, delta in deltas.items():
+        reference.set_balance(identifier, reference.get_balance(identifier) + delta)
+    if verbose:
+        print(len(indexed), len(reference))
+    assert len(indexed) == 5000 + 1000 - 100
+    assert indexed.get_bytes() == reference.get_bytes()
+    assert indexed.get_balance((7).to_bytes(32, 'big')) == 1003 and (4).to_bytes(32, 'big') not in indexed
+    assert indexed.get_balance((6).to_bytes(32, 'big')) == 1000005
+    with pytest.raises(ValueError):
+        indexed.apply_delta({b'\xee' * 32: -1})
+
+
+def test_indexed_balance_list_delta_is_atomic(verbose=False):
+    items = [BalanceListItem((i * 2).to_bytes(32, 'big'), 1000000, 100) for i in range(100)]
+    indexed = IndexedBalanceList(block_height=1000, items=items)
+    before = indexed.get_bytes()
+    # Updates, a new account and an emptied one, then an overdraft last
+    deltas = {(2).to_bytes(32, 'big'): 5, (3).to_bytes(32, 'big'): 7, (4).to_bytes(32, 'big'): -1000000,
+              (6).to_bytes(32, 'big'): -1000001}
+    with pytest.raises(ValueError):
+        indexed.apply_delta(deltas)
+    if verbose:
+        print(len(indexed), indexed.get_balance((2).to_bytes(32, 'big')))
+    assert indexed.get_bytes() == before and len(indexed) == 100
+
+
+def test_items_are_records(verbose=False):
+    raw = blockfactory.balance_list(height=1000, items=3, version=2, pending_cycle_transactions=1,
+                                    approved_cycle_transactions=1)
+    balance_list = BalanceList(buffer=raw)
+    leaves = balance_list.get_items() + balance_list._pending_cycle_transactions \
+        + balance_list._recently_approved_cycle_transactions
+    for leaf in leaves:
+        if verbose:
+            print(type(leaf).__name__, leaf.__slots__)
+        # No per object logger, nor __dict__
+        assert 'app_log' not in leaf.__slots__ and not hasattr(leaf, '__dict__')
+        assert leaf.app_log is MessageRecord.app_log
+        assert isinstance(leaf, MessageObject)
+    assert BalanceList(buffer=raw).get_bytes() == raw
@@ -0,0 +1,38 @@
+import json
+import sys
+
+sys.path.append('../')
+import benchmark
+
+
+def test_run_report(verbose=False):
+    report = benchmark.run('hash', repeat=1, min_time=0.001, verbose=verbose)
+    assert set(report['results']) == {'hash.double_sha256.1k', 'hash.double_sha256.64k'}
+    for result in report['results'].values():
+        assert 0 < result['best'] <= result['median']
+    # Has to survive a JSON round trip, baselines are stored as files
+    assert json.loads(json.dumps(report)) == report
+
+
+def test_cases_run(verbose=False):
+    for name, function in benchmark.cases(benchmark.fixtures()).items():
+        if verbose:
+            print(name)
+        function()
+
+
+def test_compare(verbose=False):
+    baseline = {'results': {'a': {'best': 1.0}, 'b': {'best': 1.0}, 'gone': {'best': 1.0}}}
+    report = {'results': {'a': {'best': 1.05}, 'b': {'best': 1.5}, 'new': {'best': 9.0}}}
+    regressions = benchmark.compare(report, baseline, threshold=0.1)
+    if verbose:
+        print(regressions)
+    assert [name for name, *_ in regressions] == ['b']
+    assert regressions[0][3] == 1.5
+    assert benchmark.compare(report, baseline, threshold=0.6) == []
+
+
+if __name__ == "__main__":
+    test_run_report(verbose=True)
+    test_cases_run(verbose=True)
+    test_compare(verbose=True)
@@ -0,0 +1,134 @@
+import logging
+import sys
+
+sys.path.append('../')
+from pynyzo import codec
+from pynyzo.block import Block
+from pynyzo.lazyblock import LazyBlock
+from pynyzo.messageobject import MessageRecord
+from pynyzo.balancelist import BalanceList
+from pynyzo.transaction import Transaction
+import blockfactory
+
+
+def test_transaction_byte_size_from_buffer(verbose=False):
+    for raw, v2 in ((blockfactory.standard_transaction(), False),
+                    (blockfactory.coin_generation_transaction(), False),
+                    (blockfactory.cycle_transaction(signers=3), False),
+                    (blockfactory.cycle_transaction(signers=3, v2=True), True),
+                    (blockfactory.cycle_signature_transaction(), False)):
+        size = Transaction.byte_size_from_buffer(memoryview(raw + b'extra'), 0, v2)
+        if verbose:
+            print(raw[0], size)
+        assert size == len(raw)
+
+
+def test_lazy_block_matches_block(verbose=False):
+    transactions = [blockfactory.standard_transaction(amount=10 * i, sender_data=b'x' * i) for i in range(5)]
+    transactions.append(blockfactory.cycle_signature_transaction())
+    raw = blockfactory.block(height=1234, transactions=transactions, version=2)
+    block = Block(buffer=memoryview(raw))
+    lazy = LazyBlock(raw + b'trailing data')
+    if verbose:
+        print(lazy.to_string())
+    assert lazy.get_height() == block.get_height() == 1234
+    assert lazy.get_blockchain_version() == block.get_blockchain_version() == 2
+    assert lazy.get_previous_block_hash() == block.get_previous_block_hash()
+    assert lazy.get_start_timestamp() == block.get_start_timestamp()
+    assert lazy.get_verification_timestamp() == block.get_verification_timestamp()
+    assert lazy.get_number_of_transactions() == len(block.get_transactions()) == 6
+    assert lazy.get_balance_list_hash() == block.get_balance_list_hash()
+    assert lazy.get_verifier_identifier() == block.get_verifier_identifier()
+    assert lazy.get_verifier_signature() == block.get_verifier_signature()
+    assert lazy.get_byte_size(include_signature=True) == block.get_byte_size(include_signature=True) == len(raw)
+    assert lazy.get_hash() == block.get_hash()
+    assert lazy.get_bytes(include_signature=True) == raw
+    assert lazy.to_json() == block.to_json()
+    assert lazy.get_transaction(3).get_amount() == 30
+
+
+def test_lazy_block_is_zero_copy():
+    raw = bytearray(blockfactory.block(transactions=[blockfactory.standard_transaction()]))
+    lazy = LazyBlock(raw)
+    previous_hash = lazy.get_previous_block_hash()
+    assert isinstance(previous_hash, memoryview)
+    raw[8] = 0xff
+    assert previous_hash[0] == 0xff
+    # Transaction identifiers and signatures are views on the block too, as the variable length fields
+    transaction = lazy.get_transaction(0)
+    fields = (transaction.get_receiver_identifier(), transaction.get_sender_identifier(),
+              transaction.get_sender_data(), transaction.get_signature())
+    assert all(isinstance(field, memoryview) for field in fields)
+
+
+def test_from_nyzoblock_lazy(tmp_path, verbose=False):
+    filename = tmp_path / "test.nyzoblock"
+    filename.write_bytes(blockfactory.consecutive_nyzoblock(start_height=200, count=4, transactions=3))
+    blocks = Block.from_nyzoblock(str(filename))
+    lazy_blocks = Block.from_nyzoblock(str(filename), lazy=True)
+    if verbose:
+        print([block.to_string() for block in lazy_blocks])
+    assert [block.get_height() for block in lazy_blocks] == [200, 201, 202, 203]
+    assert [block.get_hash() for block in lazy_blocks] == [block.get_hash() for block in blocks]
+    assert all(isinstance(block, LazyBlock) for block in lazy_blocks)
+
+
+def test_balance_list_byte_size_from_buffer(verbose=False):
+    for version in (0, 1, 2):
+        raw = blockfactory.balance_list(height=50, items=20, version=version)
+        size = BalanceList.byte_size_from_buffer(memoryview(raw + b'extra'))
+        if verbose:
+            print(version, size)
+        assert size == len(raw) == BalanceList(buffer=raw).get_byte_size()
+
+
+def test_iter_nyzoblock(tmp_path, verbose=False):
+    filename = tmp_path / "test.nyzoblock"
+    blocks = [blockfactory.block(height=300), blockfactory.block(height=301), blockfactory.block(height=305)]
+    filename.write_bytes(blockfactory.nyzoblock(blocks, {0: blockfactory.balance_list(height=300, items=5),
+                                                         2: blockfactory.balance_list(height=305, items=7)}))
+    heights = [block.get_height() for block in Block.iter_nyzoblock(str(filename), lazy=True)]
+    assert heights == [300, 301, 305]
+    pairs = list(Block.iter_nyzoblock(str(filename), with_balance_lists=True))
+    if verbose:
+        print(pairs)
+    assert [block.get_height() for block, _ in pairs] == [300, 301, 305]
+    assert pairs[1][1] is None
+    assert len(pairs[0][1].get_items()) == 5
+    assert len(pairs[2][1].get_items()) == 7
+    empty = tmp_path / "empty.nyzoblock"
+    empty.write_bytes(b'')
+    assert list(Block.iter_nyzoblock(str(empty))) == []
+
+
+def test_codec_trace(verbose=False):
+    records = []
+    handler = logging.Handler()
+    handler.emit = lambda record: records.append(record.getMessage())
+    # Transactions are records, they log to the shared logger
+    log = MessageRecord.app_log
+    level = log.level
+    log.addHandler(handler)
+    raw = blockfactory.block(height=42, transactions=[blockfactory.standard_transaction()])
+    try:
+        # Off by default: nothing, even at DEBUG
+        log.setLevel(logging.DEBUG)
+        Block(buffer=raw, app_log=log)
+        assert records == []
+        codec.TRACE = True
+        # On, but the logger is above DEBUG
+        log.setLevel(logging.INFO)
+        Block(buffer=raw, app_log=log)
+        assert records == []
+        log.setLevel(logging.DEBUG)
+        Block(buffer=raw, app_log=log)
+    finally:
+        codec.TRACE = False
+        log.removeHandler(handler)
+        log.setLevel(level)
+    if verbose:
+        print(records)
+    assert len(records) == 3
+    assert records[0] == "Block 42, " + '0a' * 32 + ", 1600000000000, 1600000007000, 1"
+    # Transactions fields are hex encoded too
+    assert records[1].startswith("TX( 2, 1600000000000, 1000000, " + '02' * 32)
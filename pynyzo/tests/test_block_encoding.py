@@ -0,0 +1,74 @@
+import sys
+
+sys.path.append('../')
+from pynyzo.balancelist import BalanceList
+from pynyzo.block import Block
+from pynyzo.lazyblock import LazyBlock
+from pynyzo.messages.blockresponse import BlockResponse
+from pynyzo.transaction import Transaction
+import blockfactory
+import nodefactory
+
+
+def all_types_block(version: int) -> bytes:
+    transactions = [blockfactory.coin_generation_transaction(),
+                    blockfactory.standard_transaction(sender_data=b''),
+                    blockfactory.standard_transaction(sender_data=b'x' * 32, tx_type=Transaction.type_seed),
+                    blockfactory.cycle_signature_transaction()]
+    transactions.append(blockfactory.cycle_transaction(signers=3, v2=version > 1))
+    return blockfactory.block(height=500, transactions=transactions, version=version)
+
+
+def test_block_round_trip(verbose=False):
+    for version in (0, 1, 2):
+        raw = all_types_block(version)
+        block = Block(buffer=raw)
+        if verbose:
+            print(version, len(raw), block.to_string())
+        assert block.get_bytes(include_signature=True) == raw
+        assert block.get_bytes() == raw[:-96]
+        assert block.signature_is_valid()
+
+
+def test_transaction_for_signing(verbose=False):
+    transaction = Transaction(buffer=blockfactory.standard_transaction())
+    transaction.set_previous_block_hash(blockfactory.PREVIOUS_BLOCK_HASH)
+    assert len(transaction.get_bytes(for_signing=True)) == transaction.get_byte_size(for_signing=True)
+    assert transaction.signature_is_valid()
+    cycle = Transaction(buffer=blockfactory.cycle_transaction(signers=2))
+    assert len(cycle.get_bytes(for_signing=True)) == cycle.get_byte_size(for_signing=True)
+
+
+def test_balance_list_round_trip(verbose=False):
+    for version in (0, 1, 2):
+        raw = blockfactory.balance_list(height=1000, items=20, version=version, pending_cycle_transactions=2,
+                                        approved_cycle_transactions=3)
+        balance_list = BalanceList(buffer=raw)
+        assert balance_list.get_bytes() == raw
+        # Items path, once materialized
+        balance_list.get_items()
+        assert balance_list.get_bytes() == raw
+
+
+def test_block_response_round_trip(verbose=False):
+    raw_blocks = [all_types_block(2), blockfactory.block(height=501, version=2)]
+    raw_balance_list = blockfactory.balance_list(height=500, version=2, pending_cycle_transactions=1)
+    message_buffer = nodefactory.block_response(raw_blocks)
+    response = BlockResponse(buffer=message_buffer)
+    assert response.get_bytes() == message_buffer[10:-96]
+    assert BlockResponse(buffer=message_buffer, lazy=True).get_bytes() == response.get_bytes()
+    # Built from objects, with a balance list
+    response = BlockResponse(initial_balance_list=BalanceList(buffer=raw_balance_list),
+                             blocks=[Block(buffer=raw_blocks[0]), LazyBlock(raw_blocks[1])])
+    content = response.get_bytes()
+    if verbose:
+        print(response.to_string(), len(content))
+    assert content == b'\x01' + raw_balance_list + b'\x00\x02' + b''.join(raw_blocks)
+    assert len(content) == response.get_byte_size()
+    decoded = BlockResponse(buffer=b'0' * 10 + content)
+    assert decoded.get_initial_balance_list().get_bytes() == raw_balance_list
+    assert [block.get_height() for block in decoded.get_blocks()] == [500, 501]
+
+
+if __name__ == "__main__":
+    test_block_response_round_trip(True)
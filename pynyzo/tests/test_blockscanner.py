@@ -0,0 +1,54 @@
+import sys
+import time
+
+sys.path.append('../')
+from pynyzo.blockscanner import BlockScanner
+import blockfactory
+
+
+def heights_and_counts(filename, blocks):
+    """Reducer: compact per height tuples"""
+    return [(block.get_height(), block.get_number_of_transactions()) for block in blocks]
+
+
+def slow_heights(filename, blocks):
+    time.sleep(0.2)
+    return heights_and_counts(filename, blocks)
+
+
+def add(accumulator, result):
+    return accumulator + sum(count for _, count in result)
+
+
+def test_scan_directory(tmp_path, verbose=False):
+    for i in range(5):
+        directory = tmp_path / f"{i % 2}"
+        directory.mkdir(exist_ok=True)
+        (directory / f"{i}.nyzoblock").write_bytes(
+            blockfactory.consecutive_nyzoblock(start_height=100 * i, count=3, transactions=i))
+    (tmp_path / "not_a_block.txt").write_text("skip me")
+    scanner = BlockScanner(max_workers=2, batch_size=2)
+    assert len(scanner.list_files(str(tmp_path))) == 5
+    results = dict(scanner.scan(str(tmp_path), heights_and_counts))
+    if verbose:
+        print(results)
+    assert sorted(height for result in results.values() for height, _ in result) \
+        == sorted(100 * i + j for i in range(5) for j in range(3))
+    assert scanner.reduce(str(tmp_path), heights_and_counts, add, 0) == 3 * (0 + 1 + 2 + 3 + 4)
+
+
+def test_early_close(tmp_path, verbose=False):
+    filenames = []
+    for i in range(20):
+        filename = tmp_path / f"{i}.nyzoblock"
+        filename.write_bytes(blockfactory.consecutive_nyzoblock(start_height=100 * i, count=1, transactions=0))
+        filenames.append(str(filename))
+    start = time.time()
+    scan = BlockScanner(max_workers=1, batch_size=1).scan(filenames, slow_heights)
+    next(scan)
+    scan.close()
+    elapsed = time.time() - start
+    if verbose:
+        print(elapsed)
+    # The 19 other batches are not waited for
+    assert elapsed < 2
@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append('../')
+from pynyzo.blockstore import BlockStore
+from pynyzo.lazyblock import LazyBlock
+import blockfactory
+
+
+def write_nyzoblock(directory, start_height: int, count: int) -> str:
+    filename = os.path.join(directory, f"{start_height}.nyzoblock")
+    with open(filename, 'wb') as file:
+        file.write(blockfactory.consecutive_nyzoblock(start_height=start_height, count=count, transactions=2))
+    return filename
+
+
+def test_append_and_get(tmp_path, verbose=False):
+    raw = {height: blockfactory.block(height=height, transactions=[blockfactory.standard_transaction()])
+           for height in range(100, 130) if height != 110}
+    with BlockStore(str(tmp_path / 'store'), segment_size=4000) as store:
+        for height, buffer in raw.items():
+            store.append_buffer(height, buffer)
+        if verbose:
+            print(sorted(os.listdir(tmp_path / 'store')))
+        assert (store.get_start_height(), store.get_end_height(), len(store)) == (100, 129, 30)
+        assert store.get(110) is None and 110 not in store and 99 not in store
+        assert bytes(store.get_buffer(120)) == raw[120]
+        assert store.get(120).get_height() == 120
+        assert [block.get_height() for block in store.range(105, 112)] == [105, 106, 107, 108, 109, 111, 112]
+        try:
+            store.append_buffer(129, raw[129])
+            assert False, "Append only"
+        except ValueError:
+            pass
+    assert len([name for name in os.listdir(tmp_path / 'store') if name.endswith('.blocks')]) > 1
+    # Reopened, with a block cut by a crash after the last index record
+    with open(tmp_path / 'store' / max(os.listdir(tmp_path / 'store')), 'ab') as segment:
+        segment.write(b'partial block')
+    with BlockStore(str(tmp_path / 'store'), segment_size=4000) as store:
+        assert store.get_end_height() == 129
+        store.append(LazyBlock(blockfactory.block(height=130)))
+        assert all(bytes(store.get_buffer(height)) == buffer for height, buffer in raw.items())
+        assert store.get(130).signature_is_valid()
+
+
+def test_reopen_after_short_segment(tmp_path, verbose=False):
+    raw = {height: blockfactory.block(height=height) for height in range(100, 110)}
+    with BlockStore(str(tmp_path / 'store')) as store:
+        for height, buffer in raw.items():
+            store.append_buffer(height, buffer)
+    # The index reached the disk, not the end of the data: the last block is cut, the one before is partial
+    segment = tmp_path / 'store' / '000000.blocks'
+    size = os.path.getsize(segment)
+    os.truncate(segment, size - len(raw[109]) - 10)
+    with BlockStore(str(tmp_path / 'store')) as store:
+        if verbose:
+            print(size, os.path.getsize(segment), store.get_end_height())
+        assert store.get_end_height() == 107
+        assert all(bytes(store.get_buffer(height)) == raw[height] for height in range(100, 108))
+        store.append_buffer(108, raw[108])
+        store.append_buffer(109, raw[109])
+    with BlockStore(str(tmp_path / 'store')) as store:
+        assert store.get_end_height() == 109
+        assert all(bytes(store.get_buffer(height)) == buffer for height, buffer in raw.items())
+    assert os.path.getsize(segment) == size
+
+
+def test_append_nyzoblock(tmp_path, verbose=False):
+    store = BlockStore(str(tmp_path / 'store'))
+    assert store.append_nyzoblock(write_nyzoblock(str(tmp_path), 1000, 5)) == 5
+    # Overlapping file, only the new heights are added
+    assert store.append_nyzoblock(write_nyzoblock(str(tmp_path), 1003, 5)) == 3
+    blocks = list(store.range(0, 2000))
+    if verbose:
+        print([block.to_string() for block in blocks])
+    assert [block.get_height() for block in blocks] == list(range(1000, 1008))
+    assert blocks[4].get_number_of_transactions() == 2
+    store.close()
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        test_append_and_get(Path(directory), True)
+    with tempfile.TemporaryDirectory() as directory:
+        test_reopen_after_short_segment(Path(directory), True)
@@ -0,0 +1,71 @@
+import asyncio
+import sys
+
+sys.path.append('../')
+from pynyzo.blocksync import BlockSync
+from pynyzo.connectionpool import ConnectionPool
+import nodefactory
+
+nodefactory.load_test_keys()
+
+
+def test_sync_in_order(verbose=False):
+    async def run():
+        chain = nodefactory.FakeChain(0, 300)
+        capped = nodefactory.FakeChain(0, 300, max_blocks=3)  # Partial answers
+        nodes = [await nodefactory.FakeNode(chain.handler).start(),
+                 await nodefactory.FakeNode(capped.handler).start()]
+        async with ConnectionPool([('127.0.0.1', node.port) for node in nodes], timeout=5) as pool:
+            sync = BlockSync(pool, chunk_size=4)
+            heights = []
+            count = await sync.sync(10, 250, lambda block: heights.append(block.get_height()))
+            if verbose:
+                print(count, len(chain.requests), len(capped.requests),
+                      [sync.get_chunk_size(peer) for peer in pool.get_peers()])
+        for node in nodes:
+            await node.stop()
+        assert heights == list(range(10, 251))
+        assert chain.requests and capped.requests
+        # Fast full responses grow the chunks
+        assert max(end - start + 1 for start, end in chain.requests) > 4
+
+    asyncio.run(run())
+
+
+def test_failed_chunks_go_to_other_peers(verbose=False):
+    async def run():
+        chain = nodefactory.FakeChain(0, 100)
+        good = await nodefactory.FakeNode(chain.handler).start()
+        broken = await nodefactory.FakeNode(lambda request: b'garbage').start()
+        silent = await nodefactory.FakeNode(lambda request: None).start()
+        peers = [('127.0.0.1', node.port) for node in (good, broken, silent)]
+        async with ConnectionPool(peers, timeout=0.5) as pool:
+            blocks = [block async for block in BlockSync(pool, chunk_size=5).iter_blocks(0, 100)]
+        for node in (good, broken, silent):
+            await node.stop()
+        if verbose:
+            print(len(blocks), broken.requests, silent.requests)
+        assert [block.get_height() for block in blocks] == list(range(101))
+        assert broken.requests and silent.requests
+
+    asyncio.run(run())
+
+
+def test_no_peer_has_the_blocks(verbose=False):
+    async def run():
+        chain = nodefactory.FakeChain(0, 10)
+        node = await nodefactory.FakeNode(chain.handler).start()
+        async with ConnectionPool([('127.0.0.1', node.port)], timeout=1) as pool:
+            try:
+                await BlockSync(pool, max_retries=2).sync(5, 20, lambda block: None)
+                assert False, "Heights past 10 do not exist"
+            except RuntimeError as e:
+                if verbose:
+                    print(e)
+        await node.stop()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_sync_in_order(True)
@@ -0,0 +1,339 @@
+import asyncio
+import struct
+import sys
+import time
+
+sys.path.append('../')
+from nyzostrings.nyzostringencoder import NyzoStringEncoder
+from pynyzo import clienthelpers
+from pynyzo.clienthelpers import NyzoClient
+from pynyzo.confirmationtracker import ConfirmationTracker
+from pynyzo.connectionpool import ConnectionPool
+from pynyzo.messagetype import MessageType
+import blockfactory
+import nodefactory
+import webfactory
+
+nodefactory.load_test_keys()
+
+# Test vectors, do not use IRL
+RECIPIENT = "id__88idJKWPQ~j4adLXXIVreIHpn1dnHNXL0AvRw.dNI3PZXtxdHx7u"
+KEY = "key_87jpjKgC.hXMHGLL50Ym9x4GSnGR918PV6CzpqKwM6WEgqRzfABZ"
+
+
+def test_sync_keep_alive(verbose=False):
+    fake = webfactory.FakeClient().start()
+    with NyzoClient(fake.url) as client:
+        frozen = [client.get_frozen() for i in range(20)]
+        res = client.send(RECIPIENT, amount=1, data="test", key_=KEY)
+    fake.stop()
+    if verbose:
+        print(frozen[0], res, fake.connections)
+    assert frozen[0] == {"height": 1000, "hash": 'ab' * 32, "timestamp": '1600000000000', "distance": '2'}
+    assert res["forwarded"] == "true" and res["block height"] == "1003" and res["tx__"] in fake.forwarded
+    # One socket for all the calls
+    assert fake.connections == 1
+
+
+def test_async_is_concurrent(verbose=False):
+    async def run():
+        fake = webfactory.FakeClient(delay=0.2).start()
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.ensure_future(ticker())
+        start = time.time()
+        async with NyzoClient(fake.url, use_aiohttp=False) as client:
+            results = await asyncio.gather(*[client.async_get_frozen() for i in range(20)])
+        elapsed = time.time() - start
+        task.cancel()
+        fake.stop()
+        if verbose:
+            print(elapsed, ticks, fake.connections)
+        assert all(result["height"] == 1000 for result in results)
+        # 20 requests of 0.2 s each, concurrent and not blocking the loop
+        assert elapsed < 2
+        assert ticks > 10
+    asyncio.run(run())
+
+
+def test_async_safe_send(verbose=False):
+    async def run():
+        fake = webfactory.FakeClient(inclusion_delay=1).start()
+        async with NyzoClient(fake.url) as client:
+            res = await client.async_send(RECIPIENT, amount=1, data="test", key_=KEY)
+            assert res["forwarded"] == "true"
+            assert "height" not in await client.async_query_tx(res["tx__"])
+            fake.height += 1
+            found = await client.async_query_tx(res["tx__"])
+        fake.stop()
+        if verbose:
+            print(res, found)
+        assert found["height"] == res["block height"]
+    asyncio.run(run())
+
+
+def verifier_handler(fake: webfactory.FakeClient, dropped: set):
+    """FakeNode handler: frozen edge of the fake client, blocks with the forwarded transactions but the dropped"""
+    def handler(request: bytes) -> bytes:
+        if struct.unpack('>h', request[8:10])[0] == MessageType.StatusRequest17.value:
+            return nodefactory.status_response([f"frozen edge: {fake.height}"])
+        start_height, end_height = struct.unpack('>QQ', request[10:26])
+        with fake.lock:
+            included = [(height, tx__) for tx__, height in fake.forwarded.items() if tx__ not in dropped]
+        return nodefactory.block_response([
+            blockfactory.block(height=height, transactions=[NyzoStringEncoder.decode(tx__).get_bytes()
+                                                            for block_height, tx__ in included
+                                                            if block_height == height])
+            for height in range(start_height, min(end_height, fake.height) + 1)])
+    return handler
+
+
+def test_send_batch(verbose=False):
+    fake = webfactory.FakeClient().start()
+    entries = [(RECIPIENT, 0.5 * (i + 1), f"payout {i}") for i in range(20)] + [(RECIPIENT, 0.5, "payout 0")]
+    with NyzoClient(fake.url, pool_size=8) as client:
+        results = client.send_batch(entries, key_=KEY)
+    fake.stop()
+    if verbose:
+        print(results[0], fake.requests.count('/forwardTransaction'))
+    assert [res["forwarded"] for res in results] == ["true"] * len(entries)
+    # One frozen edge for the whole batch, and no two identical transactions
+    assert fake.requests.count('/frozenEdge') == 1
+    assert len(fake.forwarded) == len({res["signature"] for res in results}) == len(entries)
+    transaction = NyzoStringEncoder.decode(results[1]["tx__"])
+    assert transaction.amount == 1000000 and transaction.sender_data == b"payout 1"
+    assert transaction.previous_hash_height == 1000
+
+
+def test_send_batch_chunks(verbose=False):
+    fake = webfactory.FakeClient().start()
+    entries = [(RECIPIENT, 1, "payout")] * 12
+    batch_size = clienthelpers.BATCH_SIZE
+    clienthelpers.BATCH_SIZE = 5
+    try:
+        with NyzoClient(fake.url) as client:
+            results = client.send_batch(entries, key_=KEY)
+    finally:
+        clienthelpers.BATCH_SIZE = batch_size
+    fake.stop()
+    timestamps = [NyzoStringEncoder.decode(res["tx__"]).timestamp for res in results]
+    if verbose:
+        print(timestamps, fake.requests.count('/frozenEdge'))
+    # A frozen edge snapshot per chunk, and timestamps that keep growing across chunks
+    assert fake.requests.count('/frozenEdge') == 3
+    assert all(previous < timestamp for previous, timestamp in zip(timestamps, timestamps[1:]))
+    assert len({res["signature"] for res in results}) == len(entries)
+
+
+def test_async_safe_send_batch(verbose=False):
+    async def run():
+        fake = webfactory.FakeClient(inclusion_delay=2).start()
+        dropped = set()
+        node = await nodefactory.FakeNode(verifier_handler(fake, dropped)).start()
+        pool = ConnectionPool([('127.0.0.1', node.port)], timeout=1)
+
+        async def freeze():
+            # The first transaction forwarded does not make it in its block
+            while not fake.forwarded:
+                await asyncio.sleep(0.01)
+            dropped.add(next(iter(fake.forwarded)))
+            while True:
+                await asyncio.sleep(0.05)
+                fake.height += 1
+
+        mover = asyncio.ensure_future(freeze())
+        entries = [(RECIPIENT, 1, f"payout {i}") for i in range(10)]
+        async with NyzoClient(fake.url) as client:
+            sent = await client.async_safe_send_batch(entries, key_=KEY, pool=pool, interval=0.02)
+        mover.cancel()
+        await pool.close()
+        await node.stop()
+        fake.stop()
+        if verbose:
+            print(sent)
+        assert all(res["sent"] for res in sent)
+        assert sorted(res["try"] for res in sent) == [1] * 9 + [2]
+        assert all(fake.forwarded[res["tx__"]] == res["height"] for res in sent)
+        # No transactionSearch, the blocks were scanned
+        assert '/transactionSearch' not in fake.requests
+    asyncio.run(asyncio.wait_for(run(), 10))
+
+
+def test_async_safe_send_batch_unconfirmed(verbose=False):
+    def handler(request: bytes) -> bytes:
+        # Frozen edge far enough, but no block
+        if struct.unpack('>h', request[8:10])[0] == MessageType.StatusRequest17.value:
+            return nodefactory.status_response(["frozen edge: 2000"])
+        return nodefactory.block_response([])
+
+    async def run():
+        fake = webfactory.FakeClient().start()
+        node = await nodefactory.FakeNode(handler).start()
+        pool = ConnectionPool([('127.0.0.1', node.port)], timeout=1)
+        entries = [(RECIPIENT, 1, f"payout {i}") for i in range(3)]
+        async with NyzoClient(fake.url) as client:
+            sent = await client.async_safe_send_batch(entries, key_=KEY, pool=pool, interval=0.02)
+        await pool.close()
+        await node.stop()
+        fake.stop()
+        if verbose:
+            print(sent)
+        # Reported, not raised, and not sent again
+        assert all(res["unconfirmed"] and not res["sent"] and res["try"] == 1 for res in sent)
+        assert fake.requests.count('/forwardTransaction') == 3
+    asyncio.run(asyncio.wait_for(run(), 20))
+
+
+def test_confirm_batch_timeout(verbose=False):
+    async def run():
+        # The frozen edge never reaches the forwarded block height
+        fake = webfactory.FakeClient().start()
+        entries = [(RECIPIENT, 1, f"payout {i}") for i in range(3)]
+        async with NyzoClient(fake.url) as client:
+            start = time.time()
+            sent = await client.async_safe_send_batch(entries, key_=KEY, interval=0.02, timeout=0.3)
+            elapsed = time.time() - start
+        fake.stop()
+        if verbose:
+            print(sent, elapsed)
+        assert all(res["unconfirmed"] and not res["sent"] and res["try"] == 1 for res in sent)
+        assert elapsed < 2
+        assert '/transactionSearch' not in fake.requests
+    asyncio.run(asyncio.wait_for(run(), 10))
+
+
+def test_async_safe_send_tracker(verbose=False):
+    async def run():
+        fake = webfactory.FakeClient(inclusion_delay=2).start()
+        node = await nodefactory.FakeNode(verifier_handler(fake, set())).start()
+        pool = ConnectionPool([('127.0.0.1', node.port)], timeout=1)
+
+        async def freeze():
+            while True:
+                await asyncio.sleep(0.05)
+                fake.height += 1
+
+        mover = asyncio.ensure_future(freeze())
+        async with NyzoClient(fake.url, frozen_ttl=60) as client:
+            async with ConfirmationTracker(pool, block_time=0.05, min_interval=0.01, max_interval=0.05) as tracker:
+                sent = await asyncio.gather(*[client.async_safe_send(RECIPIENT, 1, f"payout {i}", KEY, tracker=tracker)
+                                              for i in range(20)])
+        mover.cancel()
+        await pool.close()
+        await node.stop()
+        fake.stop()
+        if verbose:
+            print(sent[0], fake.requests.count('/frozenEdge'))
+        assert all(res["sent"] and res["try"] == 1 for res in sent)
+        # One cached frozen edge for the 20 sends, no per transaction polling or search
+        assert fake.requests.count('/frozenEdge') == 1
+        assert '/transactionSearch' not in fake.requests
+    asyncio.run(asyncio.wait_for(run(), 10))
+
+
+def test_tracker_timeout(verbose=False):
+    async def run():
+        # The frozen edge does not move
+        fake = webfactory.FakeClient().start()
+        node = await nodefactory.FakeNode(verifier_handler(fake, set())).start()
+        pool = ConnectionPool([('127.0.0.1', node.port)], timeout=1)
+        async with NyzoClient(fake.url) as client:
+            async with ConfirmationTracker(pool, block_time=0.05, min_interval=0.01, max_interval=0.05) as tracker:
+                single = await client.async_safe_send(RECIPIENT, 1, "payout", KEY, tracker=tracker, timeout=0.2)
+                batch = await client.async_safe_send_batch([(RECIPIENT, 1, f"payout {i}") for i in range(3)],
+                                                           key_=KEY, tracker=tracker, timeout=0.2)
+        await pool.close()
+        await node.stop()
+        fake.stop()
+        if verbose:
+            print(single, batch)
+        assert single["unconfirmed"] and not single["sent"]
+        assert all(res["unconfirmed"] and not res["sent"] and res["try"] == 1 for res in batch)
+        assert fake.requests.count('/forwardTransaction') == 4
+    asyncio.run(asyncio.wait_for(run(), 10))
+
+
+class RecordingAiohttp:
+    """Just enough of aiohttp to see which sessions get closed"""
+
+    class ClientSession:
+        def __init__(self, connector=None, timeout=None):
+            self.connector = connector
+            self.closed = False
+            RecordingAiohttp.sessions.append(self)
+
+        def get(self, url: str):
+            session = self
+
+            class Response:
+                async def __aenter__(self):
+                    return self
+
+                async def __aexit__(self, *args):
+                    pass
+
+                async def text(self):
+                    return f"{url} {len(RecordingAiohttp.sessions)}"
+            assert not session.closed
+            return Response()
+
+        async def close(self):
+            self.closed = True
+
+    class TCPConnector:
+        def __init__(self, limit_per_host=0):
+            self.closed = False
+
+        def close(self):
+            self.closed = True
+
+    @staticmethod
+    def ClientTimeout(total=None):
+        return total
+
+    sessions = []
+
+
+def test_aiohttp_session_per_loop(verbose=False):
+    aiohttp = clienthelpers.aiohttp
+    clienthelpers.aiohttp = RecordingAiohttp
+    try:
+        client = NyzoClient("http://127.0.0.1:1", use_aiohttp=True)
+        # A new loop gets a new session, the one of the former loop is closed
+        first = asyncio.run(client._async_get("http://127.0.0.1:1/a"))
+        second = asyncio.run(client._async_get("http://127.0.0.1:1/b"))
+        old, current = RecordingAiohttp.sessions
+        assert old.connector.closed and not current.closed
+        client.close()
+        assert current.connector.closed
+
+        async def run():
+            async with NyzoClient("http://127.0.0.1:1", use_aiohttp=True) as other:
+                await other._async_get("http://127.0.0.1:1/c")
+                await other._async_get("http://127.0.0.1:1/d")
+        asyncio.run(run())
+    finally:
+        clienthelpers.aiohttp = aiohttp
+    if verbose:
+        print(first, second, [session.closed for session in RecordingAiohttp.sessions])
+    assert len(RecordingAiohttp.sessions) == 3 and RecordingAiohttp.sessions[2].closed
+
+
+if __name__ == "__main__":
+    test_sync_keep_alive(verbose=True)
+    test_async_is_concurrent(verbose=True)
+    test_async_safe_send(verbose=True)
+    test_send_batch(verbose=True)
+    test_send_batch_chunks(verbose=True)
+    test_async_safe_send_batch(verbose=True)
+    test_async_safe_send_batch_unconfirmed(verbose=True)
+    test_confirm_batch_timeout(verbose=True)
+    test_async_safe_send_tracker(verbose=True)
+    test_tracker_timeout(verbose=True)
+    test_aiohttp_session_per_loop(verbose=True)
@@ -0,0 +1,73 @@
+import sys
+
+sys.path.append('../')
+from pynyzo.clienthelpers import NyzoClient
+from pynyzo.clienthtml import parse_frozen, parse_table
+import bench_clienthtml
+import webfactory
+
+PAGES = webfactory.captured_pages()
+
+
+def test_typed_fields(verbose=False):
+    frozen = parse_frozen(PAGES['frozen_edge'])
+    forward = parse_table(PAGES['forward_error'])[0]
+    found = parse_table(PAGES['search_found'])[0]
+    if verbose:
+        print(frozen, forward, found, sep='\n')
+    assert frozen == {"height": 9876543, "hash": bytes.fromhex('ab12cd34ef56ab78' * 4), "timestamp": 1600000123456,
+                      "distance": 3}
+    assert forward == {"block height": 9876546, "forwarded": False, "error": "the sender balance is insufficient",
+                       "notice": ("the transaction may not be approved", )}
+    assert found["height"] == 9876546 and found["index"] == 12 and found["sender data"] == "payout 1"
+    # No conversion for untyped or unparsable fields
+    assert found["type"] == "2" and found["amount"] == "&cap;1.000000"
+    assert parse_table(webfactory.table(['height'], [['n/a']]))[0]["height"] == 'n/a'
+    rows = parse_table(PAGES['search_200_rows'])
+    assert [row["height"] for row in rows] == list(range(9876000, 9876200))
+
+
+def test_legacy_format(verbose=False):
+    """The NyzoClient wrappers give the same dicts as the former regex and split parsers"""
+    for name, html in PAGES.items():
+        if name.startswith('frozen'):
+            legacy, result = bench_clienthtml.legacy_frozen_to_dict(html), NyzoClient.fake_table_frozen_to_dict(html)
+        else:
+            legacy, result = bench_clienthtml.legacy_table_to_list(html), NyzoClient.fake_table_to_list(html)
+            if name == 'forward_error':
+                # The former greedy error pattern ran up to the last </p> of the page
+                assert legacy[0]["error"].startswith(result[0]["error"] + '</p>')
+                legacy[0]["error"] = result[0]["error"]
+        if verbose:
+            print(name, result)
+        assert result == legacy
+
+
+def test_missing_fields(verbose=False):
+    empty = parse_table(webfactory.page(''))
+    if verbose:
+        print(empty)
+    assert empty == [{"notice": ()}]
+    assert NyzoClient.fake_table_to_list(webfactory.page('')) == [{"notice": []}]
+    try:
+        parse_frozen(webfactory.page('<p class="error">unavailable</p>'))
+        assert False, "ValueError expected"
+    except ValueError:
+        pass
+
+
+def test_paragraph_markup(verbose=False):
+    html = webfactory.page('<p class="error">balance <b>too low</b></p><p class="notice">line 1\nline 2</p>'
+                           '<p class="notice">second</p>')
+    result = parse_table(html)
+    if verbose:
+        print(result)
+    assert result == [{"error": "balance <b>too low</b>", "notice": ("line 1\nline 2", "second")}]
+    assert NyzoClient.fake_table_to_list(html)[0]["error"] == "balance <b>too low</b>"
+
+
+if __name__ == "__main__":
+    test_typed_fields(verbose=True)
+    test_legacy_format(verbose=True)
+    test_missing_fields(verbose=True)
+    test_paragraph_markup(verbose=True)
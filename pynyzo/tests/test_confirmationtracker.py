@@ -0,0 +1,180 @@
+import asyncio
+import struct
+import sys
+
+sys.path.append('../')
+from pynyzo.confirmationtracker import ConfirmationTracker
+from pynyzo.connectionpool import ConnectionPool
+from pynyzo.messagetype import MessageType
+import blockfactory
+import nodefactory
+
+nodefactory.load_test_keys()
+
+
+class PayoutChain:
+    """Fake verifier: frozen edge moved by the test, blocks with the transactions given per height"""
+
+    def __init__(self, edge: int, transactions: dict):
+        self.edge = edge
+        self.transactions = transactions  # height -> serialized transactions
+        self.unavailable = set()  # heights not served
+        self.requests = 0
+        self.block_requests = []  # (start height, end height)
+
+    def handler(self, request: bytes) -> bytes:
+        self.requests += 1
+        if struct.unpack('>h', request[8:10])[0] == MessageType.StatusRequest17.value:
+            return nodefactory.status_response([f"frozen edge: {self.edge}"])
+        start_height, end_height = struct.unpack('>QQ', request[10:26])
+        self.block_requests.append((start_height, end_height))
+        return nodefactory.block_response([blockfactory.block(height=height,
+                                                              transactions=self.transactions.get(height, []))
+                                           for height in range(start_height, min(end_height, self.edge) + 1)
+                                           if height not in self.unavailable])
+
+
+def payouts(heights: range, per_block: int) -> dict:
+    return {height: [blockfactory.standard_transaction(amount=i + 1, timestamp=1600000000000 + height * 7000 + i)
+                     for i in range(per_block)] for height in heights}
+
+
+def tracker_for(pool: ConnectionPool) -> ConfirmationTracker:
+    return ConfirmationTracker(pool, block_time=0.05, min_interval=0.01, max_interval=0.05)
+
+
+def test_resolves_as_blocks_freeze(verbose=False):
+    chain = PayoutChain(10, payouts(range(11, 16), 60))
+    # Signed, but never included
+    missing = blockfactory.standard_transaction(amount=999)[-64:]
+
+    async def run():
+        node = await nodefactory.FakeNode(chain.handler).start()
+        pool = ConnectionPool([('127.0.0.1', node.port)], timeout=1)
+        called = []
+        async with tracker_for(pool) as tracker:
+            futures = [tracker.track(transaction[-64:], height, lambda signature, height: called.append(height))
+                       for height, transactions in chain.transactions.items() for transaction in transactions]
+            futures.append(tracker.track(missing, 13))
+            assert tracker.get_pending() == 301
+            for edge in range(11, 16):
+                await asyncio.sleep(0.05)
+                chain.edge = edge
+            heights = await asyncio.wait_for(asyncio.gather(*futures), 5)
+        await pool.close()
+        await node.stop()
+        return heights, called, tracker
+    heights, called, tracker = asyncio.run(run())
+    if verbose:
+        print(chain.requests, tracker.confirmed, tracker.missed)
+    assert heights[:-1] == [height for height in range(11, 16) for i in range(60)]
+    assert heights[-1] is None
+    assert sorted(called) == heights[:-1]
+    assert tracker.get_pending() == 0 and tracker.confirmed == 300 and tracker.missed == 1
+    # Requests follow the blocks, not the 301 transactions
+    assert chain.requests < 100
+
+
+def test_already_frozen(verbose=False):
+    chain = PayoutChain(20, payouts(range(12, 14), 2))
+
+    async def run():
+        node = await nodefactory.FakeNode(chain.handler).start()
+        pool = ConnectionPool([('127.0.0.1', node.port)], timeout=1)
+        tracker = tracker_for(pool)
+        # Registered before start: the tracker starts from its block
+        first = tracker.track(chain.transactions[12][0][-64:], 12)
+        await tracker.start()
+        assert await asyncio.wait_for(first, 5) == 12
+        while tracker.follower.get_next_height() <= 20:
+            await asyncio.sleep(0.01)
+        # Registered once the follower is past its block
+        late = await asyncio.wait_for(tracker.track(chain.transactions[13][1][-64:], 13), 5)
+        await tracker.stop()
+        await pool.close()
+        await node.stop()
+        return late
+    late = asyncio.run(run())
+    if verbose:
+        print(late, chain.requests)
+    assert late == 13
+
+
+def test_one_backfill_per_block(verbose=False):
+    chain = PayoutChain(20, payouts(range(13, 14), 5))
+
+    async def run():
+        node = await nodefactory.FakeNode(chain.handler).start()
+        pool = ConnectionPool([('127.0.0.1', node.port)], timeout=1)
+        async with tracker_for(pool) as tracker:
+            while tracker.follower.get_next_height() is None:
+                await asyncio.sleep(0.01)
+            before = len(chain.block_requests)
+            # A whole batch registered once the follower is past its block
+            futures = [tracker.track(transaction[-64:], 13) for transaction in chain.transactions[13]]
+            heights = await asyncio.wait_for(asyncio.gather(*futures), 5)
+            # Room for any other download to go out
+            await asyncio.sleep(0.2)
+            backfills = chain.block_requests[before:]
+        await pool.close()
+        await node.stop()
+        return heights, backfills
+    heights, backfills = asyncio.run(run())
+    if verbose:
+        print(heights, backfills)
+    assert heights == [13] * 5
+    assert backfills == [(13, 13)]
+
+
+def test_registered_before_first_poll(verbose=False):
+    chain = PayoutChain(20, payouts(range(12, 13), 1))
+
+    async def run():
+        node = await nodefactory.FakeNode(chain.handler).start()
+        pool = ConnectionPool([('127.0.0.1', node.port)], timeout=1)
+        async with tracker_for(pool) as tracker:
+            # Started, and waiting for its first poll: the block is frozen already
+            await asyncio.sleep(0)
+            assert tracker.follower.get_frozen_edge() is None
+            height = await asyncio.wait_for(tracker.track(chain.transactions[12][0][-64:], 12), 5)
+        await pool.close()
+        await node.stop()
+        return height
+    height = asyncio.run(run())
+    if verbose:
+        print(height, chain.requests)
+    assert height == 12
+
+
+def test_backfill_failure(verbose=False):
+    chain = PayoutChain(20, payouts(range(13, 14), 1))
+
+    async def run():
+        node = await nodefactory.FakeNode(chain.handler).start()
+        pool = ConnectionPool([('127.0.0.1', node.port)], timeout=1)
+        async with tracker_for(pool) as tracker:
+            while tracker.follower.get_next_height() is None:
+                await asyncio.sleep(0.01)
+            # Late registration, and its block can not be downloaded
+            chain.unavailable.add(13)
+            future = tracker.track(chain.transactions[13][0][-64:], 13)
+            try:
+                await asyncio.wait_for(future, 5)
+                assert False, "RuntimeError expected"
+            except RuntimeError as e:
+                error = e
+        await pool.close()
+        await node.stop()
+        return error, tracker
+    error, tracker = asyncio.run(run())
+    if verbose:
+        print(error)
+    assert tracker.get_pending() == 0 and tracker.failed == 1
+
+
+if __name__ == "__main__":
+    test_resolves_as_blocks_freeze(verbose=True)
+    test_already_frozen(verbose=True)
+    test_one_backfill_per_block(verbose=True)
+    test_registered_before_first_poll(verbose=True)
+    test_backfill_failure(verbose=True)
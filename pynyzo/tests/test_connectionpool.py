@@ -0,0 +1,71 @@
+import asyncio
+import sys
+from time import time
+
+sys.path.append('../')
+from pynyzo.connectionpool import ConnectionPool
+from pynyzo.message import Message
+from pynyzo.messagetype import MessageType
+from pynyzo.messageobject import EmptyMessageObject
+import nodefactory
+
+nodefactory.load_test_keys()
+
+
+def status_request() -> Message:
+    return Message(MessageType.StatusRequest17, EmptyMessageObject())
+
+
+def test_fan_out_groups(verbose=False):
+    async def run():
+        # Same payload signed by different nodes, a dissenting node and a dead port
+        nodes = [await nodefactory.FakeNode(
+                     lambda request, keyword=keyword: nodefactory.status_response(['frozen edge: 100'], keyword)
+                 ).start() for keyword in (b'node1', b'node2', b'node3')]
+        nodes.append(await nodefactory.FakeNode(lambda request: nodefactory.status_response(['frozen edge: 99']))
+                     .start())
+        dead = await nodefactory.FakeNode(lambda request: None).start()
+        await dead.stop()
+        peers = [f"127.0.0.1:{node.port}" for node in nodes] + [('127.0.0.1', dead.port)]
+        async with ConnectionPool(peers, timeout=2) as pool:
+            result = await pool.fan_out(status_request())
+        for node in nodes:
+            await node.stop()
+        if verbose:
+            print(result.to_string())
+        assert result.get_number_of_responses() == 4
+        assert list(result.errors) == [('127.0.0.1', dead.port)]
+        assert [len(peers) for _, peers in result.get_groups()] == [3, 1]
+        content, agreeing = result.get_majority()
+        assert content.get_lines() == ['frozen edge: 100']
+        assert sorted(agreeing) == sorted(('127.0.0.1', node.port) for node in nodes[:3])
+
+    asyncio.run(run())
+
+
+def test_fan_out_quorum_cancels_slow_peers(verbose=False):
+    async def run():
+        fast = [await nodefactory.FakeNode(lambda request: nodefactory.status_response(['ok'])).start()
+                for _ in range(3)]
+        slow = [await nodefactory.FakeNode(lambda request: nodefactory.status_response(['ok']), delay=5).start()
+                for _ in range(2)]
+        async with ConnectionPool([('127.0.0.1', node.port) for node in fast + slow], timeout=10) as pool:
+            start = time()
+            result = await pool.fan_out(status_request(), quorum=3)
+            elapsed = time() - start
+            # Global timeout, the slow peers never make it
+            partial = await pool.fan_out(status_request(), peers=[('127.0.0.1', node.port) for node in slow],
+                                         timeout=0.3)
+        for node in fast + slow:
+            await node.stop()
+        if verbose:
+            print(result.to_string(), partial.to_string(), elapsed)
+        assert result.is_quorum_reached() and elapsed < 2
+        assert sorted(result.cancelled) == sorted(('127.0.0.1', node.port) for node in slow)
+        assert not partial.is_quorum_reached() and len(partial.cancelled) == 2
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_fan_out_groups(True)
@@ -0,0 +1,137 @@
+import asyncio
+import struct
+import sys
+
+sys.path.append('../')
+from pynyzo.block import Block
+from pynyzo.connectionpool import ConnectionPool
+from pynyzo.frozenedgefollower import FrozenEdgeFollower, frozen_edge_from_lines
+from pynyzo.messagetype import MessageType
+import nodefactory
+
+nodefactory.load_test_keys()
+
+
+class FreezingChain(nodefactory.FakeChain):
+    """FakeChain whose frozen edge is moved by the test, answers status and block requests"""
+
+    def __init__(self, edge: int, end_height: int=100):
+        super().__init__(0, end_height)
+        self.edge = edge
+        self.status_requests = 0
+
+    def handler(self, request: bytes) -> bytes:
+        if struct.unpack('>h', request[8:10])[0] == MessageType.StatusRequest17.value:
+            self.status_requests += 1
+            return nodefactory.status_response(["nickname: fake", f"frozen edge: {self.edge} (1.2s ago)"])
+        start_height, end_height = struct.unpack('>QQ', request[10:26])
+        self.requests.append((start_height, end_height))
+        return nodefactory.block_response([self.blocks[height]
+                                           for height in range(start_height, min(end_height, self.edge) + 1)])
+
+
+def follow(chain: FreezingChain, count: int, start_height: int=None, steps: list=()) -> tuple:
+    """(heights, follower) of the first count blocks. steps: (delay, new edge), applied in order."""
+    async def run():
+        node = await nodefactory.FakeNode(chain.handler).start()
+        pool = ConnectionPool([('127.0.0.1', node.port)], timeout=1)
+        follower = FrozenEdgeFollower(pool, start_height=start_height, block_time=0.05, min_interval=0.01,
+                                      max_interval=0.05)
+
+        async def freeze():
+            for delay, edge in steps:
+                await asyncio.sleep(delay)
+                chain.edge = edge
+
+        mover = asyncio.ensure_future(freeze())
+        heights = []
+        async for block in follower:
+            assert isinstance(block, Block)
+            heights.append(block.get_height())
+            if len(heights) == count:
+                follower.stop()
+        await mover
+        await pool.close()
+        await node.stop()
+        return heights, follower
+    return asyncio.run(asyncio.wait_for(run(), 10))
+
+
+def test_frozen_edge_from_lines(verbose=False):
+    assert frozen_edge_from_lines(["nickname: x", "frozen edge: 1234 (3.4s ago)"]) == 1234
+    assert frozen_edge_from_lines(["frozen edge:5678"]) == 5678
+    assert frozen_edge_from_lines(["nickname: x"]) is None
+
+
+def test_follow_new_blocks(verbose=False):
+    chain = FreezingChain(edge=10)
+    heights, follower = follow(chain, 6, steps=[(0.05, 11), (0.05, 12), (0.1, 16)])
+    if verbose:
+        print(heights, chain.requests, chain.status_requests, follower.block_time)
+    # Without start height, only blocks frozen after the first poll
+    assert heights == [11, 12, 13, 14, 15, 16]
+    # Only the new heights were requested
+    assert all(start > 10 for start, end in chain.requests)
+    assert follower.get_next_height() == 17
+
+
+def test_resume(verbose=False):
+    chain = FreezingChain(edge=20)
+    heights, follower = follow(chain, 8, start_height=15, steps=[(0.05, 22)])
+    if verbose:
+        print(heights, chain.requests)
+    assert heights == list(range(15, 23))
+    assert chain.requests[0][0] == 15
+
+
+def test_stop_before_run(verbose=False):
+    chain = FreezingChain(edge=10)
+
+    async def run():
+        node = await nodefactory.FakeNode(chain.handler).start()
+        pool = ConnectionPool([('127.0.0.1', node.port)], timeout=1)
+        follower = FrozenEdgeFollower(pool, start_height=5, min_interval=0.01, max_interval=0.05)
+        # Stopped before the task gets to iterate: run() returns without polling
+        task = asyncio.ensure_future(follower.run(lambda block: None))
+        follower.stop()
+        await task
+        stopped_requests = chain.status_requests
+        # The stop was consumed, a later iteration runs
+        async for block in follower:
+            follower.stop()
+        await pool.close()
+        await node.stop()
+        return stopped_requests, block.get_height()
+    stopped_requests, height = asyncio.run(asyncio.wait_for(run(), 10))
+    if verbose:
+        print(stopped_requests, height, chain.status_requests)
+    assert stopped_requests == 0
+    assert height == 5
+
+
+def test_poll_delay(verbose=False):
+    follower = FrozenEdgeFollower(ConnectionPool(), block_time=7, min_interval=1, max_interval=30)
+    # Unknown edge: poll right away, then back off
+    assert follower.get_poll_delay(0) == 1
+    follower._update(100, now=1000)
+    # Next block expected 7 s after the last one
+    assert follower.get_poll_delay(1002) == 5
+    follower._update(100, now=1007)
+    follower._update(100, now=1008)
+    assert follower.get_poll_delay(1008) == 2
+    for i in range(10):
+        follower._update(None, now=1010 + i)
+    assert follower.get_poll_delay(1020) == 30
+    follower._update(102, now=1021)
+    if verbose:
+        print(follower.block_time)
+    # Two blocks in 21 s moves the estimate up
+    assert 7 < follower.block_time < 9
+
+
+if __name__ == "__main__":
+    test_frozen_edge_from_lines(verbose=True)
+    test_follow_new_blocks(verbose=True)
+    test_resume(verbose=True)
+    test_stop_before_run(verbose=True)
+    test_poll_delay(verbose=True)
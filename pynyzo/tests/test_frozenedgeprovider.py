@@ -0,0 +1,82 @@
+import asyncio
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append('../')
+from pynyzo.block import Block
+from pynyzo.clienthelpers import NyzoClient
+from pynyzo.connection import Connection
+from pynyzo.frozenedgeprovider import FrozenEdgeProvider
+from pynyzo.messagetype import MessageType
+import blockfactory
+import nodefactory
+import webfactory
+
+nodefactory.load_test_keys()
+
+
+def test_ttl_and_single_flight(verbose=False):
+    fake = webfactory.FakeClient(delay=0.1).start()
+    with NyzoClient(fake.url, frozen_ttl=0.5) as client:
+        with ThreadPoolExecutor(max_workers=20) as executor:
+            heights = [frozen["height"] for frozen in executor.map(lambda i: client.get_frozen(), range(20))]
+        cached = client.get_frozen()
+        fake.height += 1
+        # Still cached
+        assert client.get_frozen()["height"] == 1000
+        time.sleep(0.5)
+        fresh = client.get_frozen()
+    fake.stop()
+    if verbose:
+        print(heights, cached, fresh, fake.requests)
+    assert heights == [1000] * 20 and cached["hash"] == 'ab' * 32
+    assert fresh["height"] == 1001
+    assert fake.requests.count('/frozenEdge') == 2
+
+
+def test_async_single_flight(verbose=False):
+    async def run():
+        fake = webfactory.FakeClient(delay=0.1).start()
+        async with NyzoClient(fake.url, use_aiohttp=False) as client:
+            # A provider shared by several clients
+            provider = FrozenEdgeProvider(client=client)
+            senders = [NyzoClient(fake.url, frozen_edge=provider) for i in range(5)]
+            results = await asyncio.gather(*[sender.async_get_frozen() for sender in senders for i in range(10)])
+        fake.stop()
+        if verbose:
+            print(results[0], provider.fetches, fake.requests)
+        assert all(result["height"] == 1000 for result in results)
+        assert provider.fetches == 1 and fake.requests.count('/frozenEdge') == 1
+    asyncio.run(run())
+
+
+def test_from_verifier(verbose=False):
+    block = blockfactory.block(height=1234)
+
+    def handler(request: bytes) -> bytes:
+        if struct.unpack('>h', request[8:10])[0] == MessageType.StatusRequest17.value:
+            return nodefactory.status_response(["nickname: fake", "frozen edge: 1234 (1.2s ago)"])
+        assert struct.unpack('>QQ', request[10:26]) == (1234, 1234)
+        return nodefactory.block_response([block])
+
+    async def run():
+        node = await nodefactory.FakeNode(handler).start()
+        provider = FrozenEdgeProvider(connection=Connection('127.0.0.1', node.port))
+        results = await asyncio.gather(*[provider.async_get_frozen() for i in range(10)])
+        provider.connection.close()
+        await node.stop()
+        return results, provider
+    results, provider = asyncio.run(asyncio.wait_for(run(), 10))
+    if verbose:
+        print(results[0], provider.fetches)
+    assert provider.fetches == 1
+    assert results[0]["height"] == 1234
+    assert results[0]["hash"] == Block(buffer=block).get_hash().hex()
+
+
+if __name__ == "__main__":
+    test_ttl_and_single_flight(verbose=True)
+    test_async_single_flight(verbose=True)
+    test_from_verifier(verbose=True)
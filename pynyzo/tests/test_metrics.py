@@ -0,0 +1,91 @@
+import asyncio
+import sys
+
+sys.path.append('../')
+from pynyzo.asyncconnection import AsyncConnection
+from pynyzo.message import Message
+from pynyzo.messagetype import MessageType
+from pynyzo.messageobject import EmptyMessageObject
+from pynyzo.metrics import Histogram, metrics
+import nodefactory
+
+nodefactory.load_test_keys()
+
+
+def status_request() -> Message:
+    return Message(MessageType.StatusRequest17, EmptyMessageObject())
+
+
+def fetch_statuses(handler, count: int, timeout: float=1) -> tuple:
+    """(responses, errors, peer) of count sequential status requests to a fake node"""
+    async def run():
+        node = await nodefactory.FakeNode(handler).start()
+        responses, errors = [], 0
+        async with AsyncConnection('127.0.0.1', node.port, timeout=timeout) as connection:
+            for i in range(count):
+                try:
+                    responses.append(await connection.fetch(status_request()))
+                except asyncio.TimeoutError:
+                    errors += 1
+        await node.stop()
+        return responses, errors, f"127.0.0.1:{node.port}"
+    return asyncio.run(run())
+
+
+def test_histogram(verbose=False):
+    histogram = Histogram((1, 2, 5))
+    for value in (0.5, 1, 1.5, 3, 10):
+        histogram.observe(value)
+    values = histogram.to_dict()
+    if verbose:
+        print(values)
+    assert values['buckets'] == [(1, 2), (2, 3), (5, 4), (float('inf'), 5)]
+    assert values['count'] == 5 and values['sum'] == 16
+    assert values['p50'] == 2 and histogram.quantile(1) == float('inf')
+
+
+def test_disabled_records_nothing(verbose=False):
+    metrics.disable()
+    metrics.reset()
+    fetch_statuses(lambda request: nodefactory.status_response(['ok']), 3)
+    snapshot = metrics.snapshot()
+    if verbose:
+        print(snapshot)
+    assert snapshot == {'enabled': False, 'message_types': {}, 'peers': {}, 'decode': {}}
+
+
+def test_request_metrics(verbose=False):
+    metrics.reset()
+    metrics.enable()
+    try:
+        buffer = nodefactory.status_response(['ok'])
+        responses, errors, peer = fetch_statuses(lambda request: buffer, 3)
+        _, timeouts, _ = fetch_statuses(lambda request: None, 1, timeout=0.1)
+    finally:
+        metrics.disable()
+    snapshot = metrics.snapshot()
+    if verbose:
+        print(snapshot)
+    assert len(responses) == 3 and timeouts == 1
+    status = snapshot['message_types']['StatusRequest17']
+    assert status['requests'] == 3 and status['errors'] == 1
+    assert status['bytes_in'] == 3 * (len(buffer) + 4)
+    assert status['bytes_out'] == 3 * (len(status_request().get_bytes_for_transmission()) + 4)
+    assert status['latency']['count'] == 3
+    assert snapshot['peers'][peer]['requests'] == 3
+    assert snapshot['decode']['StatusResponse']['count'] == 3
+
+    text = metrics.to_prometheus()
+    if verbose:
+        print(text)
+    assert 'pynyzo_message_type_request_duration_seconds_count{message_type="StatusRequest17"} 3' in text
+    assert f'pynyzo_peer_received_bytes_total{{peer="{peer}"}} {3 * (len(buffer) + 4)}' in text
+    assert 'pynyzo_message_type_errors_total{message_type="StatusRequest17"} 1' in text
+    assert 'pynyzo_decode_duration_seconds_bucket{class="StatusResponse",le="+Inf"} 3' in text
+    metrics.reset()
+
+
+if __name__ == "__main__":
+    test_histogram(verbose=True)
+    test_disabled_records_nothing(verbose=True)
+    test_request_metrics(verbose=True)
@@ -0,0 +1,49 @@
+import sys
+
+sys.path.append('../')
+from pynyzo.keyutil import KeyUtil
+from pynyzo.signaturecache import SignatureCache, signature_cache
+from pynyzo.signatureverifier import SignatureVerifier
+import blockfactory
+
+
+def test_lru_eviction(verbose=False):
+    cache = SignatureCache(max_size=2)
+    keys = [SignatureCache.make_key(b'\x01' * 32, bytes([i]) * 64, b'data') for i in range(3)]
+    cache.put(keys[0], True)
+    cache.put(keys[1], False)
+    assert cache.get(keys[0]) is True  # keys[1] is now the least recently used
+    cache.put(keys[2], True)
+    if verbose:
+        print(cache.get_stats())
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is True
+    assert cache.get_stats() == {'size': 2, 'max_size': 2, 'hits': 2, 'misses': 1, 'evictions': 1,
+                                 'hit_ratio': 2 / 3}
+
+
+def test_key_covers_signed_bytes(verbose=False):
+    key = blockfactory.signing_key()
+    signature = key.sign(b'data')
+    signature_cache.clear()
+    assert KeyUtil.signature_is_valid(signature, b'data', blockfactory.identifier(key))
+    assert KeyUtil.signature_is_valid(signature, b'data', blockfactory.identifier(key))
+    # Same signer and signature, other data: not a hit
+    assert not KeyUtil.signature_is_valid(signature, b'other data', blockfactory.identifier(key))
+    assert (signature_cache.hits, signature_cache.misses) == (1, 2)
+
+
+def test_verifier_only_verifies_misses(verbose=False):
+    key = blockfactory.signing_key()
+    triples = [(blockfactory.identifier(key), b'data %d' % i, key.sign(b'data %d' % i)) for i in range(10)]
+    cache = SignatureCache()
+    with SignatureVerifier(cache=cache) as verifier:
+        assert all(verifier.verify_batch(triples[:6]))
+        assert all(verifier.verify_batch(triples))
+    if verbose:
+        print(cache.get_stats())
+    assert (cache.hits, cache.misses, len(cache)) == (6, 10, 10)
+
+
+if __name__ == "__main__":
+    test_lru_eviction(True)
@@ -0,0 +1,80 @@
+import struct
+import sys
+
+sys.path.append('../')
+from pynyzo.lazyblock import LazyBlock
+from pynyzo.message import Message
+from pynyzo.messages.statusresponse import StatusResponse
+from pynyzo.signatureverifier import SignatureVerifier
+from pynyzo.transaction import Transaction
+import blockfactory
+
+
+def previous_block_hash_for_height(height: int) -> bytes:
+    return blockfactory.PREVIOUS_BLOCK_HASH
+
+
+def signed_block(height: int=100, transactions: int=5) -> LazyBlock:
+    raw = blockfactory.block(height=height, transactions=[
+        blockfactory.standard_transaction(amount=1000 + i, sender_data=b'x' * i) for i in range(transactions)]
+        + [blockfactory.coin_generation_transaction(), blockfactory.cycle_signature_transaction()])
+    return LazyBlock(raw)
+
+
+def test_transaction_signature(verbose=False):
+    transaction = Transaction(buffer=blockfactory.standard_transaction())
+    transaction.set_previous_block_hash(blockfactory.PREVIOUS_BLOCK_HASH)
+    assert transaction.signature_is_valid()
+    transaction.set_previous_block_hash(b'\x00' * 32)
+    assert not transaction.signature_is_valid()
+
+
+def test_verify_batch(verbose=False):
+    key = blockfactory.signing_key()
+    triples = [(blockfactory.identifier(key), b'data %d' % i, key.sign(b'data %d' % i)) for i in range(300)]
+    triples[10] = (triples[10][0], b'tampered', triples[10][2])
+    with SignatureVerifier(max_workers=2, chunk_size=64) as verifier:
+        results = verifier.verify_batch(triples)
+    if verbose:
+        print(results.count(True))
+    assert results == [i != 10 for i in range(300)]
+
+
+def test_verify_block(verbose=False):
+    block = signed_block()
+    assert block.signature_is_valid()
+    with SignatureVerifier(max_workers=2) as verifier:
+        # block signature + 5 standard transactions + the cycle signature transaction, coin generation is not signed
+        assert len(verifier.block_triples(block, previous_block_hash_for_height)) == 7
+        assert verifier.verify_block(block, include_transactions=False)
+        # The dummy cycle signature transaction signature is not valid
+        assert not verifier.verify_block(block, previous_block_hash_for_height)
+        valid = LazyBlock(blockfactory.block(transactions=[blockfactory.standard_transaction()]))
+        tampered = bytearray(blockfactory.block(height=101))
+        tampered[20] ^= 1
+        assert verifier.verify_blocks([valid, LazyBlock(bytes(tampered))], previous_block_hash_for_height) \
+            == [True, False]
+        try:
+            verifier.block_triples(valid)
+            assert False, "Missing previous block hash should raise"
+        except ValueError:
+            pass
+
+
+def test_verify_messages(verbose=False):
+    key = blockfactory.signing_key(b'node')
+    body = struct.pack('>Qh', 1600000000000, 18) + StatusResponse(lines=['frozen edge: 10']).get_bytes() \
+        + blockfactory.identifier(key)
+    buffer = body + key.sign(body)
+    message = Message.from_bytes(buffer, b'127.0.0.1', verify=True)
+    if verbose:
+        print(message.get_content().to_string())
+    assert message.is_valid()
+    tampered = buffer[:13] + b'F' + buffer[14:]  # first char of the line
+    assert not Message.from_bytes(tampered, b'127.0.0.1', verify=True).is_valid()
+    with SignatureVerifier() as verifier:
+        assert verifier.verify_messages([buffer, tampered]) == [True, False]
+
+
+if __name__ == "__main__":
+    test_verify_block(True)
@@ -0,0 +1,53 @@
+import sys
+
+import pytest
+
+sys.path.append('../')
+from pynyzo.block import Block
+import blockfactory
+
+np = pytest.importorskip("numpy")
+from pynyzo.transactioncolumns import TransactionColumns
+
+
+def test_columns_match_transactions(tmp_path, verbose=False):
+    transactions = [blockfactory.standard_transaction(amount=1000 * i + 1, sender_data=b'd' * (i * 7 % 33))
+                    for i in range(6)]
+    # numpy would strip the trailing null of an S32 field
+    transactions[1] = blockfactory.standard_transaction(receiver=b'\x01' * 31 + b'\x00')
+    transactions += [blockfactory.coin_generation_transaction(amount=77),
+                     blockfactory.cycle_transaction(signers=2),
+                     blockfactory.cycle_signature_transaction()]
+    blocks = [blockfactory.block(height=500, transactions=transactions),
+              blockfactory.block(height=501, transactions=[]),
+              blockfactory.block(height=502, transactions=transactions[:2])]
+    filename = tmp_path / "test.nyzoblock"
+    filename.write_bytes(blockfactory.nyzoblock(blocks, {0: blockfactory.balance_list(height=500)}))
+    columns = TransactionColumns.from_nyzoblock(str(filename))
+    if verbose:
+        print(columns)
+    expected = [(block.get_height(), index, tx) for block in Block.from_nyzoblock(str(filename))
+                for index, tx in enumerate(block.get_transactions())]
+    assert len(columns) == len(expected) == 11
+    for row, (height, index, tx) in zip(columns, expected):
+        assert row['height'] == height
+        assert row['index'] == index
+        assert row['type'] == tx.get_type()
+        assert row['timestamp'] == tx.get_timestamp()
+        # Zero filled where there is none, coin generation
+        assert row['signature'].tobytes() == bytes(tx.get_signature()).ljust(64, b'\x00')
+        if tx.get_type() != tx.type_cycle_signature:
+            assert row['receiver_identifier'].tobytes() == bytes(tx.get_receiver_identifier())
+        if tx.get_type() in (tx.type_standard, tx.type_cycle_signature):
+            assert row['sender_identifier'].tobytes() == bytes(tx.get_sender_identifier())
+        if tx.get_type() == tx.type_standard:
+            assert row['amount'] == tx.get_amount()
+            assert row['fee'] == int(tx.get_fee())
+            assert row['sender_data_length'] == len(tx.get_sender_data())
+            assert row['sender_data'] == bytes(tx.get_sender_data())
+    assert columns[6]['amount'] == 77
+    assert columns[7]['fee'] == 0
+
+
+def test_empty_range():
+    assert len(TransactionColumns.from_blocks([])) == 0
@@ -0,0 +1,93 @@
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append('../')
+from pynyzo.block import Block
+from pynyzo.blockstore import BlockStore
+from pynyzo.transactionindex import TransactionIndex, encode_varint, decode_varint
+import blockfactory
+
+ALICE = b'\xa1' * 32
+BOB = b'\xb0' * 32
+SENDER = blockfactory.identifier(blockfactory.signing_key())
+
+
+def fill_store(store: BlockStore, start_height: int, end_height: int) -> None:
+    for height in range(start_height, end_height + 1):
+        transactions = [blockfactory.coin_generation_transaction(receiver=ALICE)]
+        if height % 10 == 0:
+            transactions.append(blockfactory.standard_transaction(receiver=BOB, timestamp=height))
+        transactions.append(blockfactory.cycle_signature_transaction())
+        store.append_buffer(height, blockfactory.block(height=height, transactions=transactions))
+
+
+def test_varint(verbose=False):
+    buffer = bytearray()
+    values = [0, 1, 127, 128, 300, 2 ** 40]
+    for value in values:
+        encode_varint(value, buffer)
+    offset = 0
+    for value in values:
+        decoded, offset = decode_varint(buffer, offset)
+        assert decoded == value
+    assert offset == len(buffer)
+
+
+def test_index_over_store(tmp_path, verbose=False):
+    store = BlockStore(str(tmp_path / 'store'))
+    fill_store(store, 1, 95)
+    with TransactionIndex(str(tmp_path / 'index'), flush_every=20) as index:
+        assert index.update_from_store(store) == 95
+        assert index.get_postings(ALICE) == [(height, 0) for height in range(1, 96)]
+        assert index.get_postings(BOB) == [(height, 1) for height in range(10, 91, 10)]
+        assert index.get_postings(SENDER) == index.get_postings(BOB)
+        assert index.get_postings(b'\x07' * 32) == [(height, 1 + (height % 10 == 0)) for height in range(1, 96)]
+        assert index.get_postings(b'\x00' * 32) == []
+        transactions = list(index.iter_transactions(BOB, store))
+        assert [transaction.get_timestamp() for _, _, transaction in transactions] == list(range(10, 91, 10))
+    # Reopened, appends only the new blocks
+    fill_store(store, 96, 120)
+    with TransactionIndex(str(tmp_path / 'index'), flush_every=20) as index:
+        assert index.get_end_height() == 95
+        assert index.update_from_store(store) == 25
+        assert index.get_postings(BOB) == [(height, 1) for height in range(10, 121, 10)]
+        # Decoded blocks work as well, buffered postings are queried too
+        index.add_block(Block(buffer=blockfactory.block(height=121, transactions=[
+            blockfactory.standard_transaction(receiver=ALICE)])))
+        if verbose:
+            print(index.get_number_of_identifiers(), index.get_postings(ALICE)[-2:])
+        assert index.get_postings(ALICE)[-2:] == [(120, 0), (121, 0)]
+        try:
+            index.add_block(store.get(100))
+            assert False, "Append only"
+        except ValueError:
+            pass
+    store.close()
+
+
+def test_index_decoded_blocks(tmp_path, verbose=False):
+    """Blocks added as Block, not LazyBlock: same postings, no placeholder identifiers, also once reopened"""
+    store = BlockStore(str(tmp_path / 'store'))
+    fill_store(store, 1, 30)
+    with TransactionIndex(str(tmp_path / 'lazy')) as lazy_index:
+        lazy_index.update_from_store(store)
+    with TransactionIndex(str(tmp_path / 'index'), flush_every=7) as index:
+        for block in store.range(1, 30):
+            index.add_block(Block(buffer=block.get_buffer()))
+    with TransactionIndex(str(tmp_path / 'index')) as index, TransactionIndex(str(tmp_path / 'lazy')) as lazy_index:
+        if verbose:
+            print(index.get_number_of_identifiers(), lazy_index.get_number_of_identifiers())
+        assert index.get_end_height() == 30
+        assert index.get_number_of_identifiers() == lazy_index.get_number_of_identifiers() == 4
+        for identifier in (ALICE, BOB, SENDER, b'\x07' * 32):
+            assert index.get_postings(identifier) == lazy_index.get_postings(identifier)
+        assert index.get_postings(bytes(32)) == []
+    store.close()
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        test_index_over_store(Path(directory), True)
+    with tempfile.TemporaryDirectory() as directory:
+        test_index_decoded_blocks(Path(directory), True)
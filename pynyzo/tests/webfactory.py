@@ -0,0 +1,136 @@
+"""
+Local stand in for a Nyzo web client (client.nyzo.co), for the NyzoClient tests - no network needed.
+Serves the same html tables as the real client, from a small in memory chain state.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def table(headers: list, rows: list, notice: str='', error: str='') -> str:
+    """Client style html table"""
+    html = ['<html><body>']
+    if error:
+        html.append(f'<p class="error">{error}</p>')
+    if notice:
+        html.append(f'<p class="notice">{notice}</p>')
+    html.append('<div class="table"><div class="header-row">' + ''.join(f'<div>{h}</div>' for h in headers)
+                + '</div>')
+    for row in rows:
+        html.append('<div class="data-row">' + ''.join(f'<div>{value}</div>' for value in row) + '</div>')
+    html.append('</div></div></body></html>')
+    return ''.join(html)
+
+
+def frozen_edge(height: int, block_hash: str, timestamp: int=1600000000000) -> str:
+    return f'<html><body><div class="table"><div>height</div><div>{height}</div>' \
+           f'<div>hash</div><div class="hash">{block_hash}</div>' \
+           f'<div>verification timestamp (ms)</div><div>{timestamp}</div>' \
+           f'<div>distance from open edge</div><div>2</div></div></body></html>'
+
+
+def page(body: str, title: str='Nyzo client') -> str:
+    """Full page around a body, head and navigation as the client sends them"""
+    return f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title>' \
+           f'<meta name="viewport" content="width=device-width, initial-scale=1">' \
+           f'<link rel="stylesheet" href="/style.css"><script src="/client.js"></script></head>' \
+           f'<body><div class="header"><a href="/"><img src="/logo.png" alt="Nyzo"></a>' \
+           f'<div class="menu"><a href="/frozenEdge">frozen edge</a><a href="/transactionSearch">search</a>' \
+           f'</div></div><div class="content">{body}</div>' \
+           f'<div class="footer"><p>Nyzo client, version 612</p></div></body></html>'
+
+
+def captured_pages() -> dict:
+    """Client pages by name, in the markup of client.nyzo.co"""
+    dashed = '-'.join(['ab12cd34ef56ab78'] * 4)
+    search_headers = ['height', 'index', 'timestamp', 'type', 'amount', 'sender', 'receiver', 'sender data']
+    return {
+        'frozen_edge': page(f'<h1>frozen edge</h1><div class="table"><div>height</div><div>9876543</div>'
+                            f'<div>hash</div><div class="hash">{dashed}</div>'
+                            f'<div>verification timestamp (ms)</div><div>1600000123456</div>'
+                            f'<div>distance from open edge</div><div>3</div></div>'),
+        'forward_ok': page(table(['block height', 'forwarded', 'timestamp', 'amount'],
+                                 [[9876546, 'true', 1600000140000, '&cap;1.000000']],
+                                 notice='transaction forwarded to 12 verifiers')),
+        'forward_error': page(table(['block height', 'forwarded'], [[9876546, 'false']],
+                                    error='the sender balance is insufficient',
+                                    notice='the transaction may not be approved')),
+        'search_found': page(table(search_headers, [[9876546, 12, 1600000140000, 2, '&cap;1.000000',
+                                                     'id__8abcd', 'id__8efgh', 'payout 1']])),
+        'search_not_found': page(table([], [], notice='transaction not found')),
+        'search_200_rows': page(table(search_headers, [[9876000 + i, i % 50, 1600000000000 + i * 7000, 2,
+                                                        f'&cap;{i}.000000', 'id__8abcd', 'id__8efgh',
+                                                        f'payout {i}'] for i in range(200)])),
+    }
+
+
+class FakeClient:
+    """Frozen edge, forwardTransaction and transactionSearch endpoints.
+    Forwarded transactions are included at frozen height + inclusion_delay, and found once the edge gets there."""
+
+    def __init__(self, height: int=1000, block_hash: str='ab' * 32, inclusion_delay: int=3, delay: float=0):
+        """delay: seconds before each answer, as a remote client would take"""
+        self.height = height
+        self.block_hash = block_hash
+        self.inclusion_delay = inclusion_delay
+        self.delay = delay
+        self.forwarded = {}  # tx__ -> block height
+        self.requests = []  # paths, in arrival order
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.server = None
+        self.url = None
+
+    def start(self) -> 'FakeClient':
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive
+
+            def setup(self):
+                with fake.lock:
+                    fake.connections += 1
+                super().setup()
+
+            def do_GET(self):
+                body = fake.handle(self.path).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, path: str) -> str:
+        url = urlparse(path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if self.delay:
+            time.sleep(self.delay)
+        with self.lock:
+            self.requests.append(url.path)
+            if url.path == '/frozenEdge':
+                return frozen_edge(self.height, self.block_hash)
+            if url.path == '/forwardTransaction':
+                block_height = self.height + self.inclusion_delay
+                self.forwarded[query['transaction']] = block_height
+                return table(['block height', 'forwarded'], [[block_height, 'true']])
+            if url.path == '/transactionSearch':
+                block_height = self.forwarded.get(query['string'])
+                if block_height is None or block_height > self.height:
+                    return table([], [], notice='transaction not found')
+                return table(['height', 'index'], [[block_height, 0]])
+        return table([], [], error='unknown endpoint')